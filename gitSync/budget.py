@@ -0,0 +1,155 @@
+import os
+import json
+import time
+from datetime import datetime
+from typing import List, Dict, Any
+
+# Per-repository budgets, enforced while the clone and analysis are running
+REPO_MAX_OBJECTS = int(os.environ.get('REPO_MAX_OBJECTS', 500000))
+REPO_MAX_BYTES = int(os.environ.get('REPO_MAX_BYTES', 1024 * 1024 * 1024))  # 1 GiB
+REPO_MAX_COMMITS = int(os.environ.get('REPO_MAX_COMMITS', 10000))
+REPO_MAX_SECONDS = int(os.environ.get('REPO_MAX_SECONDS', 600))
+
+# Repos that blew their budget this many times in a row are analyzed in summary mode
+REPO_DEGRADE_AFTER = int(os.environ.get('REPO_DEGRADE_AFTER', 2))
+# ...until this long after their last overrun, when a full analysis is tried again
+REPO_DEGRADE_HOURS = int(os.environ.get('REPO_DEGRADE_HOURS', 24))
+
+REPO_COSTS_FILE = os.environ.get('REPO_COSTS_FILE', 'repo_costs.json')
+
+
+class BudgetExceeded(Exception):
+    """Raised as soon as a repository goes over one of its RepoBudget limits."""
+
+
+class RepoBudget:
+    """Tracks what one repository has cost so far and stops work once a limit is hit."""
+
+    def __init__(self, max_objects: int = REPO_MAX_OBJECTS, max_bytes: int = REPO_MAX_BYTES,
+                 max_commits: int = REPO_MAX_COMMITS, max_seconds: float = REPO_MAX_SECONDS):
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.max_commits = max_commits
+        self.max_seconds = max_seconds
+
+        self.started = time.monotonic()
+        self.objects = 0
+        self.bytes = 0
+        self.commits_walked = 0
+        self.exceeded = None
+
+    def _exceed(self, reason: str):
+        self.exceeded = reason
+        raise BudgetExceeded(reason)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def check_time(self):
+        """Raise if the wall-time budget is used up."""
+        if self.elapsed() >= self.max_seconds:
+            self._exceed(f"wall time over {self.max_seconds}s")
+
+    def timeout(self, cap: float) -> float:
+        """Get a subprocess timeout: `cap`, shortened to whatever wall time is left."""
+        self.check_time()
+        return min(cap, self.max_seconds - self.elapsed())
+
+    def commits_left(self) -> int:
+        return max(0, self.max_commits - self.commits_walked)
+
+    def record_objects(self, objects: int):
+        """Record the repository's object count (as reported by the clone)."""
+        self.objects = max(self.objects, objects)
+        if self.objects > self.max_objects:
+            self._exceed(f"{self.objects} objects (max {self.max_objects})")
+
+    def record_bytes(self, total_bytes: int):
+        """Record how many bytes of git data the repository has pulled in so far."""
+        self.bytes = max(self.bytes, total_bytes)
+        if self.bytes > self.max_bytes:
+            self._exceed(f"{self.bytes} bytes (max {self.max_bytes})")
+
+    def record_commits(self, commits: int):
+        """Add commits walked by a git log call."""
+        self.commits_walked += commits
+        if self.commits_walked > self.max_commits:
+            self._exceed(f"{self.commits_walked} commits walked (max {self.max_commits})")
+
+    def usage(self) -> Dict[str, Any]:
+        """Get the costs recorded so far."""
+        return {
+            'seconds': round(self.elapsed(), 3),
+            'objects': self.objects,
+            'bytes': self.bytes,
+            'commits_walked': self.commits_walked,
+            'exceeded': self.exceeded
+        }
+
+
+def repo_pack_bytes(repo_dir: str) -> int:
+    """Get the size of a clone's packfiles, which grows as blobs are fetched on demand."""
+    pack_dir = os.path.join(repo_dir, '.git', 'objects', 'pack')
+    try:
+        return sum(entry.stat().st_size for entry in os.scandir(pack_dir) if entry.is_file())
+    except FileNotFoundError:
+        return 0
+
+
+class RepoCostLedger:
+    """Per-repository cost history, persisted between passes in a JSON file."""
+
+    def __init__(self, path: str = REPO_COSTS_FILE):
+        self.path = path
+        self.costs = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.costs = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"  Warning: could not read repo costs from {path}: {e}")
+
+    def strikes(self, github_url: str) -> int:
+        return self.costs.get(github_url, {}).get('strikes', 0)
+
+    def is_degraded(self, github_url: str) -> bool:
+        """Check whether a repository should get the cheaper summary analysis."""
+        entry = self.costs.get(github_url, {})
+        if entry.get('strikes', 0) < REPO_DEGRADE_AFTER:
+            return False
+
+        last_exceeded = entry.get('last_exceeded')
+        if not last_exceeded:
+            return False
+
+        hours_since = (datetime.now() - datetime.fromisoformat(last_exceeded)).total_seconds() / 3600
+        return hours_since < REPO_DEGRADE_HOURS
+
+    def prioritize(self, groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Order repositories so repeat offenders run after everything else (stable otherwise)."""
+        return sorted(groups, key=lambda group: self.strikes(group['github_url']))
+
+    def record(self, github_url: str, budget: RepoBudget, degraded: bool = False):
+        """Store a repository's costs for this pass and update its strike count."""
+        entry = self.costs.setdefault(github_url, {'strikes': 0, 'runs': 0})
+        entry['runs'] += 1
+        entry['last_run'] = datetime.now().isoformat()
+        entry['last_usage'] = budget.usage()
+        entry['last_mode'] = 'degraded' if degraded else 'full'
+
+        if budget.exceeded:
+            entry['strikes'] += 1
+            entry['last_exceeded'] = entry['last_run']
+        elif not degraded:
+            # Only a clean full analysis earns back trust
+            entry['strikes'] = max(0, entry['strikes'] - 1)
+
+        self.save()
+
+    def save(self):
+        """Write the ledger atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.costs, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,73 @@
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from typing import List, Dict, Any, Callable
+
+
+class SyncEventLog:
+    """Bounded in-memory ring buffer of sync progress events that readers can wait on."""
+
+    def __init__(self, maxlen: int = 1000):
+        self._events = deque(maxlen=maxlen)
+        self._condition = threading.Condition()
+        self._last_id = 0
+        self._listeners = []
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def restore(self, events: List[Dict[str, Any]], last_id: int = 0):
+        """Reload events saved by an earlier process, so new ids continue after theirs."""
+        with self._condition:
+            for event in events:
+                if event['id'] > self._last_id:
+                    self._events.append(event)
+                    self._last_id = event['id']
+            self._last_id = max(self._last_id, last_id)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], Any]):
+        """Call `listener(event)` after every published event."""
+        self._listeners.append(listener)
+
+    def publish(self, event_type: str, **data) -> Dict[str, Any]:
+        """Record an event and wake up every waiting reader."""
+        with self._condition:
+            self._last_id += 1
+            event = {
+                'id': self._last_id,
+                'type': event_type,
+                'timestamp': datetime.now().isoformat(),
+                **data
+            }
+            self._events.append(event)
+            self._condition.notify_all()
+
+        for listener in self._listeners:
+            listener(event)
+        return event
+
+    def since(self, last_id: int) -> List[Dict[str, Any]]:
+        """Get buffered events newer than `last_id` (older ones may have been evicted)."""
+        with self._condition:
+            return [event for event in self._events if event['id'] > last_id]
+
+    def wait_since(self, last_id: int, timeout: float) -> List[Dict[str, Any]]:
+        """Block until events newer than `last_id` exist or the timeout passes."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_id > last_id, timeout=timeout)
+            return [event for event in self._events if event['id'] > last_id]
+
+
+def events_after(events: List[Dict[str, Any]], last_id: int) -> List[Dict[str, Any]]:
+    """Get the events newer than `last_id` from a list ordered by id, scanning only the new ones."""
+    start = len(events)
+    while start > 0 and events[start - 1]['id'] > last_id:
+        start -= 1
+    return events[start:]
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Format an event as a Server-Sent Events message."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
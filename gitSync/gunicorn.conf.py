@@ -0,0 +1,51 @@
+# Production entry point: gunicorn -c gunicorn.conf.py server:app
+#
+# The HTTP API runs in several gunicorn workers while the git-heavy sync loop runs in
+# a separate sync_worker.py process, kept alive by sync_supervisor.py in a process of its
+# own (the master reaps its children with waitpid(-1), so it can't supervise the worker
+# itself). The two share status and progress events through SYNC_STATE_FILE. The master
+# restarts sync_supervisor.py if it dies, and /health reports the supervisor's heartbeat.
+import os
+import sys
+import threading
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SUPERVISOR_SCRIPT = os.path.join(APP_DIR, 'sync_supervisor.py')
+
+sys.path.insert(0, APP_DIR)
+from sync_supervisor import SyncSupervisor
+
+# Must be set before the HTTP workers import server.py, so it is picked up in production mode
+os.environ.setdefault('SYNC_STATE_FILE', '/tmp/gitsync-state.json')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3002)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threads let a worker hold open /api/sync-events streams and still answer health checks
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = 60
+graceful_timeout = 30
+accesslog = '-'
+
+
+def on_starting(server):
+    # Kept on the arbiter rather than in a module global: a HUP reload re-reads this file.
+    # The supervisor restarts sync_supervisor.py with backoff if it exits; the arbiter may
+    # reap it first, so its exit code can read as 0 here, but only the restart matters.
+    server.sync_supervisor = SyncSupervisor(
+        script=SUPERVISOR_SCRIPT,
+        name='sync supervisor',
+        env={'SYNC_WORKER_STOP_TIMEOUT': str(graceful_timeout)}
+    )
+    server.sync_supervisor_thread = threading.Thread(
+        target=server.sync_supervisor.run,
+        kwargs={'stop_timeout': graceful_timeout + 5},
+        daemon=True
+    )
+    server.sync_supervisor_thread.start()
+
+
+def on_exit(server):
+    if getattr(server, 'sync_supervisor', None):
+        server.sync_supervisor.request_stop()
+        server.sync_supervisor_thread.join(timeout=graceful_timeout + 10)
@@ -1,15 +1,24 @@
 import os
+import sys
+import re
+import hashlib
+import threading
 import requests
 import json
 import subprocess
 import shutil
 import tempfile
 import signal
+import time
+import argparse
 import psutil
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable
 from datetime import datetime
 from dotenv import load_dotenv
 
+from output import NdjsonWriter
+from budget import RepoBudget, RepoCostLedger, BudgetExceeded, repo_pack_bytes
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -89,34 +98,88 @@ def fetch_all_posts() -> List[Dict[str, Any]]:
     return all_records
 
 
-def clone_repo(github_url: str, clone_dir: str) -> bool:
-    """Clone a GitHub repository with minimal data (blobless clone for speed)."""
+# "Receiving objects:  45% (450/1000), 1.20 MiB | 2.00 MiB/s" and friends from git clone --progress
+OBJECT_COUNT_PATTERN = re.compile(r'(?:Enumerating|Counting|Receiving) objects:.*?(?:\(\d+/(\d+)\)|(\d+), done)')
+TRANSFER_SIZE_PATTERN = re.compile(r'([\d.]+) (bytes|KiB|MiB|GiB)')
+SIZE_UNITS = {'bytes': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3}
+
+
+class CloneFailed(Exception):
+    """Raised when a repository can't be cloned, so callers don't treat it as processed."""
+
+
+def clone_repo(github_url: str, clone_dir: str, budget: RepoBudget = None) -> bool:
+    """Clone a GitHub repository with minimal data (blobless clone for speed).
+    
+    The clone's progress output is watched so it is aborted as soon as the repository
+    goes over its object, byte or wall-time budget (raises BudgetExceeded).
+    """
+    if budget is None:
+        budget = RepoBudget()
+    
+    print(f"  Cloning {github_url} (blobless for speed)...")
+    # Use --filter=blob:none for blobless clone - gets commit history and tree structure
+    # but not file contents, which are fetched on-demand. Much faster!
+    process = subprocess.Popen(
+        ['git', 'clone', '--filter=blob:none', '--progress', github_url, clone_dir],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True  # Also turns the \r-separated progress updates into lines
+    )
+    
+    # Kill the clone when its wall time runs out, even if git stops printing progress
+    # (5 minute cap, as before)
+    watchdog = threading.Timer(budget.timeout(300), process.kill)
+    watchdog.start()
+    
+    error_lines = []
     try:
-        print(f"  Cloning {github_url} (blobless for speed)...")
-        # Use --filter=blob:none for blobless clone - gets commit history and tree structure
-        # but not file contents, which are fetched on-demand. Much faster!
-        # Add timeout to prevent hanging processes
-        result = subprocess.run(
-            ['git', 'clone', '--filter=blob:none', '--quiet', github_url, clone_dir],
-            check=True,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-        return True
-    except subprocess.TimeoutExpired:
-        print(f"  Timeout cloning repository: {github_url}")
-        return False
-    except subprocess.CalledProcessError as e:
-        print(f"  Error cloning repository: {e.stderr}")
+        for line in process.stderr:
+            objects = OBJECT_COUNT_PATTERN.search(line)
+            if objects:
+                budget.record_objects(int(objects.group(1) or objects.group(2)))
+            
+            size = TRANSFER_SIZE_PATTERN.search(line)
+            if size and 'objects:' in line:
+                budget.record_bytes(int(float(size.group(1)) * SIZE_UNITS[size.group(2)]))
+            
+            if not line.startswith(('remote:', 'Receiving', 'Resolving', 'Updating', 'Cloning')):
+                error_lines.append(line.strip())
+        
+        process.wait()
+    except BudgetExceeded:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        watchdog.cancel()
+    
+    if process.returncode != 0:
+        if budget.elapsed() >= budget.max_seconds or process.returncode == -9:
+            print(f"  Timeout cloning repository: {github_url}")
+            budget.check_time()
+        else:
+            print(f"  Error cloning repository: {' '.join(error_lines)}")
         return False
+    
+    budget.record_bytes(repo_pack_bytes(clone_dir))
+    return True
 
 
-def get_commits_in_timerange(repo_dir: str, start_time: str = None, end_time: str = None) -> List[Dict[str, Any]]:
-    """Get commits within a time range."""
+def get_commits_in_timerange(repo_dir: str, start_time: str = None, end_time: str = None,
+                             budget: RepoBudget = None, all_refs: bool = True) -> List[Dict[str, Any]]:
+    """Get commits within a time range.
+    
+    Walks at most the commits left in the budget and raises BudgetExceeded past that.
+    """
+    if budget is None:
+        budget = RepoBudget()
+    
     try:
         # Build git log command
-        cmd = ['git', 'log', '--all', '--pretty=format:%H|%an|%ae|%ai|%s']
+        cmd = ['git', 'log', f'--max-count={budget.commits_left() + 1}', '--pretty=format:%H|%an|%ae|%ai|%s']
+        if all_refs:
+            cmd.insert(2, '--all')
         
         if start_time and end_time:
             cmd.append(f'--since={start_time}')
@@ -130,7 +193,7 @@ def get_commits_in_timerange(repo_dir: str, start_time: str = None, end_time: st
             capture_output=True,
             text=True,
             check=True,
-            timeout=120  # 2 minute timeout
+            timeout=budget.timeout(120)  # 2 minute timeout
         )
         
         commits = []
@@ -147,28 +210,54 @@ def get_commits_in_timerange(repo_dir: str, start_time: str = None, end_time: st
                     'message': parts[4]
                 })
         
+        budget.record_commits(len(commits))
         return commits
     except subprocess.TimeoutExpired:
         print(f"  Timeout getting commits from {repo_dir}")
+        budget.check_time()
         return []
     except subprocess.CalledProcessError as e:
         print(f"  Error getting commits: {e.stderr}")
         return []
 
 
-def get_commit_changes(repo_dir: str, commit_hash: str, github_url: str) -> List[Dict[str, Any]]:
+def github_diff_anchor(filepath: str, path_table: Dict[str, str] = None) -> str:
+    """Get the GitHub diff anchor for a file path (SHA-256 of the path, as GitHub uses)."""
+    if path_table is not None:
+        anchor = path_table.get(filepath)
+        if anchor is not None:
+            return anchor
+    
+    anchor = hashlib.sha256(filepath.encode('utf-8')).hexdigest()
+    
+    # Intern the path so every commit touching it shares one key and one anchor
+    if path_table is not None:
+        path_table[sys.intern(filepath)] = anchor
+    
+    return anchor
+
+
+def get_commit_changes(repo_dir: str, commit_hash: str, github_url: str, path_table: Dict[str, str] = None,
+                       budget: RepoBudget = None) -> List[Dict[str, Any]]:
     """Get file changes for a specific commit with stats and GitHub links."""
+    if budget is None:
+        budget = RepoBudget()
+    
     try:
         # Get diff stats for the commit
+        # --no-renames keeps paths (and their anchors) independent of the host's diff.renames config
         stats_result = subprocess.run(
-            ['git', 'show', '--numstat', '--pretty=format:', commit_hash],
+            ['git', 'show', '--numstat', '--no-renames', '--pretty=format:', commit_hash],
             cwd=repo_dir,
             capture_output=True,
             text=True,
             check=True,
-            timeout=60  # 1 minute timeout
+            timeout=budget.timeout(60)  # 1 minute timeout
         )
         
+        # Line counts fetch the commit's blobs on demand, so the clone keeps growing
+        budget.record_bytes(repo_pack_bytes(repo_dir))
+        
         # Parse the GitHub URL to get owner/repo
         # Format: https://github.com/owner/repo or https://github.com/owner/repo.git
         github_url = github_url.rstrip('.git')
@@ -194,7 +283,7 @@ def get_commit_changes(repo_dir: str, commit_hash: str, github_url: str) -> List
                     is_binary = False
                 
                 # Generate GitHub link to this specific file change
-                file_link = f"{github_url}/commit/{commit_hash}#diff-{hash(filepath) & 0xffffffff:08x}"
+                file_link = f"{github_url}/commit/{commit_hash}#diff-{github_diff_anchor(filepath, path_table)}"
                 
                 files_changed.append({
                     'filepath': filepath,
@@ -207,23 +296,44 @@ def get_commit_changes(repo_dir: str, commit_hash: str, github_url: str) -> List
         return files_changed
     except subprocess.TimeoutExpired:
         print(f"  Timeout getting commit changes for {commit_hash}")
+        budget.check_time()
         return []
     except subprocess.CalledProcessError as e:
         print(f"  Error getting commit changes: {e.stderr}")
         return []
 
 
-def analyze_repo_for_posts(github_url: str, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Analyze repository and generate git changes for each post."""
+def analyze_repo_for_posts(github_url: str, posts: List[Dict[str, Any]], progress: Callable[..., Any] = None,
+                           budget: RepoBudget = None, degraded: bool = False) -> List[Dict[str, Any]]:
+    """Analyze repository and generate git changes for each post.
+    
+    If given, progress(event_type, **data) is called as the clone and each post finish.
+    Raises CloneFailed if the repository can't be cloned.
+    Work stops once the repository goes over its budget (see budget.exceeded); posts
+    analyzed up to then keep their changes. In degraded mode only the default branch is
+    walked and per-file stats are skipped, for repos that keep blowing their budget.
+    """
+    if progress is None:
+        progress = lambda event_type, **data: None
+    
+    if budget is None:
+        budget = RepoBudget()
+    
+    started = time.monotonic()
     temp_dir = tempfile.mkdtemp()
     repo_dir = os.path.join(temp_dir, 'repo')
     
+    # Interned path -> diff anchor table, shared by every commit in this repo
+    path_table = {}
+    
     try:
         # Clone the repository
-        if not clone_repo(github_url, repo_dir):
+        if not clone_repo(github_url, repo_dir, budget):
             # Clean up temp dir if clone fails
             shutil.rmtree(temp_dir, ignore_errors=True)
-            return posts
+            raise CloneFailed('clone failed')
+        
+        progress('repo_cloned', github_url=github_url, duration=round(time.monotonic() - started, 3))
         
         # Process each post
         for i, post in enumerate(posts):
@@ -234,7 +344,8 @@ def analyze_repo_for_posts(github_url: str, posts: List[Dict[str, Any]]) -> List
             start_time = posts[i-1]['created_at'] if i > 0 else None
             
             # Get commits in this time range
-            commits = get_commits_in_timerange(repo_dir, start_time, end_time)
+            commits = get_commits_in_timerange(repo_dir, start_time, end_time, budget, all_refs=not degraded)
+            progress('commits_found', github_url=github_url, post_id=post['post_id'], commits=len(commits))
             
             if not commits:
                 print(f"    No commits found in timerange")
@@ -249,7 +360,11 @@ def analyze_repo_for_posts(github_url: str, posts: List[Dict[str, Any]]) -> List
             # Get changes for each commit
             commit_changes = []
             for commit in commits:
-                files_changed = get_commit_changes(repo_dir, commit['hash'], github_url)
+                budget.check_time()
+                if degraded:
+                    files_changed = []
+                else:
+                    files_changed = get_commit_changes(repo_dir, commit['hash'], github_url, path_table, budget)
                 
                 # Generate GitHub commit link
                 commit_link = f"{github_url}/commit/{commit['hash']}"
@@ -273,18 +388,28 @@ def analyze_repo_for_posts(github_url: str, posts: List[Dict[str, Any]]) -> List
             total_additions = sum(c['stats']['total_additions'] for c in commit_changes)
             total_deletions = sum(c['stats']['total_deletions'] for c in commit_changes)
             
+            summary = {
+                'total_commits': len(commits),
+                'total_files_changed': total_files,
+                'total_additions': total_additions,
+                'total_deletions': total_deletions
+            }
+            if degraded:
+                # File stats were skipped, so the totals above are not meaningful
+                summary['degraded'] = True
+            
             # Store as JSON string
             post['git_changes'] = json.dumps({
                 'commits': commit_changes,
-                'summary': {
-                    'total_commits': len(commits),
-                    'total_files_changed': total_files,
-                    'total_additions': total_additions,
-                    'total_deletions': total_deletions
-                }
+                'summary': summary
             }, indent=2)
         
         return posts
+    
+    except BudgetExceeded as e:
+        print(f"  Budget exceeded for {github_url}: {e}")
+        progress('budget_exceeded', github_url=github_url, reason=str(e), usage=budget.usage())
+        return posts
         
     finally:
         # Cleanup
@@ -365,8 +490,8 @@ def update_post_git_changes(record_id: str, git_changes: str) -> bool:
         return False
 
 
-def main():
-    """Main function to fetch and display all posts."""
+def main(output_file: str = 'posts_data.ndjson'):
+    """Main function to fetch all posts, analyze their repos and stream results to NDJSON."""
     if not AIRTABLE_API_KEY:
         raise ValueError("AIRTABLE_API_KEY environment variable is not set")
     
@@ -385,39 +510,61 @@ def main():
     
     print(f"\nTotal posts fetched: {len(posts)}")
     
-    # Group posts by GitHub URL
-    grouped_data = group_posts_by_github_url(posts)
+    # Group posts by GitHub URL, with repos that keep blowing their budget last
+    ledger = RepoCostLedger()
+    grouped_data = ledger.prioritize(group_posts_by_github_url(posts))
+    total_repos = len(grouped_data)
     
-    print(f"\nGrouped into {len(grouped_data)} unique GitHub repositories")
+    # The raw records are no longer needed once grouped
+    del posts
+    
+    print(f"\nGrouped into {total_repos} unique GitHub repositories")
     print("\n" + "="*80)
     print("Analyzing repositories and updating git changes...")
     print("="*80 + "\n")
     
-    # Process each repository
-    for i, repo in enumerate(grouped_data, 1):
-        print(f"\nRepository {i}/{len(grouped_data)}: {repo['github_url']}")
-        print(f"  Total posts: {len(repo['posts'])}")
-        
-        # Analyze repo and get git changes
-        repo['posts'] = analyze_repo_for_posts(repo['github_url'], repo['posts'])
-        
-        # Update Airtable with git changes
-        for post in repo['posts']:
-            if post.get('git_changes'):
-                print(f"  Updating Airtable for post {post['post_id']}...")
-                update_post_git_changes(post['record_id'], post['git_changes'])
-    
-    # Save to JSON file
-    output_file = 'posts_data.json'
-    with open(output_file, 'w') as f:
-        json.dump(grouped_data, f, indent=2)
+    # Write one line per repository as soon as it finishes, so a crash keeps finished repos
+    with NdjsonWriter(output_file) as writer:
+        for i in range(total_repos):
+            repo = grouped_data[i]
+            print(f"\nRepository {i + 1}/{total_repos}: {repo['github_url']}")
+            print(f"  Total posts: {len(repo['posts'])}")
+            
+            degraded = ledger.is_degraded(repo['github_url'])
+            if degraded:
+                print(f"  Repeatedly over budget, using summary mode")
+            
+            # Analyze repo and get git changes
+            budget = RepoBudget()
+            try:
+                repo['posts'] = analyze_repo_for_posts(repo['github_url'], repo['posts'], budget=budget,
+                                                       degraded=degraded)
+            except CloneFailed:
+                print(f"  Skipping repository, its posts keep their current git changes")
+            ledger.record(repo['github_url'], budget, degraded)
+            repo['cost'] = budget.usage()
+            
+            # Update Airtable with git changes
+            for post in repo['posts']:
+                if post.get('git_changes'):
+                    print(f"  Updating Airtable for post {post['post_id']}...")
+                    update_post_git_changes(post['record_id'], post['git_changes'])
+            
+            writer.write(repo)
+            
+            # Drop the finished repo so peak memory stays at one repo's worth of GitChanges
+            grouped_data[i] = None
     
     print(f"\n\n{'='*80}")
     print(f"Complete! Data saved to {output_file}")
-    print(f"Processed {len(grouped_data)} repositories")
+    print(f"Processed {total_repos} repositories")
     print(f"{'='*80}")
 
 
 if __name__ == "__main__":
-    main()
-
+    parser = argparse.ArgumentParser(description='Sync git changes for Airtable posts')
+    parser.add_argument('--output', default='posts_data.ndjson',
+                        help='NDJSON output file, one repository per line (.gz or .zst to compress)')
+    args = parser.parse_args()
+    
+    main(output_file=args.output)
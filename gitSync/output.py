@@ -0,0 +1,73 @@
+import gzip
+import json
+from typing import Dict, Any, Iterator
+
+
+def _open_zstd(path: str, mode: str):
+    """Open a zstd-compressed file (requires the optional zstandard package)."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(f"Writing/reading {path} needs the zstandard package: pip install zstandard")
+
+    return zstandard.open(path, mode, encoding='utf-8')
+
+
+# Extensions open_ndjson writes compressed
+COMPRESSED_EXTENSIONS = ('.gz', '.zst')
+
+
+def open_ndjson(path: str, mode: str = 'r'):
+    """Open an NDJSON file in text mode, picking compression from the extension (.gz, .zst)."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        return _open_zstd(path, mode)
+    return open(path, mode, encoding='utf-8')
+
+
+class NdjsonWriter:
+    """Append one JSON record per line and flush it so nothing is lost on a crash."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records_written = 0
+        self._file = open_ndjson(path, 'w')
+
+    def write(self, record: Dict[str, Any]):
+        """Write a single record as one line."""
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self.records_written += 1
+
+    def close(self):
+        """Close the underlying file (finishes the compressed stream, if any)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records one at a time, stopping quietly at a truncated last line."""
+    with open_ndjson(path, 'r') as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves a partial final line
+                    print(f"  Warning: skipping truncated record in {path}")
+                    return
+        except (EOFError, OSError) as e:
+            # Compressed streams that were never closed end without a trailer
+            print(f"  Warning: {path} ends unexpectedly ({e})")
+
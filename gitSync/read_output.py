@@ -0,0 +1,126 @@
+import json
+import time
+import argparse
+from collections import deque
+from typing import Dict, Any
+
+from output import iter_ndjson, open_ndjson, COMPRESSED_EXTENSIONS
+
+
+def summarize_repo(repo: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce one repository record to its post and commit totals."""
+    summary = {
+        'github_url': repo.get('github_url'),
+        'posts': len(repo.get('posts', [])),
+        'posts_with_changes': 0,
+        'total_commits': 0,
+        'total_additions': 0,
+        'total_deletions': 0
+    }
+
+    for post in repo.get('posts', []):
+        if not post.get('git_changes'):
+            continue
+
+        try:
+            git_changes = json.loads(post['git_changes'])
+        except (TypeError, json.JSONDecodeError):
+            continue
+
+        stats = git_changes.get('summary')
+        if not isinstance(stats, dict):
+            continue
+
+        summary['posts_with_changes'] += 1
+        summary['total_commits'] += stats.get('total_commits', 0)
+        summary['total_additions'] += stats.get('total_additions', 0)
+        summary['total_deletions'] += stats.get('total_deletions', 0)
+
+    return summary
+
+
+def print_summary(summary: Dict[str, Any]):
+    """Print one repository summary line."""
+    print(f"{summary['github_url']}: {summary['posts']} posts, "
+          f"{summary['posts_with_changes']} with changes, "
+          f"{summary['total_commits']} commits, "
+          f"+{summary['total_additions']}/-{summary['total_deletions']}")
+
+
+def tail(path: str, count: int):
+    """Show the last `count` repositories without holding the whole file."""
+    last = deque(maxlen=count)
+    for repo in iter_ndjson(path):
+        last.append(summarize_repo(repo))
+
+    for summary in last:
+        print_summary(summary)
+
+
+def follow(path: str, interval: float = 1.0):
+    """Print repositories as a running sync appends them (plain NDJSON only)."""
+    if path.endswith(COMPRESSED_EXTENSIONS):
+        # A compressed stream ends mid-frame while it is being written, so it can't be tailed
+        raise ValueError(f"Can't follow compressed output {path}: write plain .ndjson to follow a running sync")
+
+    with open_ndjson(path, 'r') as f:
+        buffer = ''
+        while True:
+            line = f.readline()
+            if not line:
+                time.sleep(interval)
+                continue
+
+            # Wait for the writer to finish the line before parsing it
+            buffer += line
+            if not buffer.endswith('\n'):
+                continue
+
+            print_summary(summarize_repo(json.loads(buffer)))
+            buffer = ''
+
+
+def aggregate(path: str):
+    """Total every repository in the file in a single streaming pass."""
+    totals = {
+        'repos': 0,
+        'posts': 0,
+        'posts_with_changes': 0,
+        'total_commits': 0,
+        'total_additions': 0,
+        'total_deletions': 0
+    }
+
+    for repo in iter_ndjson(path):
+        summary = summarize_repo(repo)
+        totals['repos'] += 1
+        for key in ('posts', 'posts_with_changes', 'total_commits', 'total_additions', 'total_deletions'):
+            totals[key] += summary[key]
+
+    print(f"Repositories: {totals['repos']}")
+    print(f"Posts: {totals['posts']}")
+    print(f"Posts with changes: {totals['posts_with_changes']}")
+    print(f"Commits: {totals['total_commits']}")
+    print(f"Additions: {totals['total_additions']}")
+    print(f"Deletions: {totals['total_deletions']}")
+
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Inspect a gitSync NDJSON output file without loading it whole')
+    parser.add_argument('path', nargs='?', default='posts_data.ndjson')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--tail', type=int, metavar='N', help='show the last N repositories')
+    group.add_argument('--follow', action='store_true', help='print repositories as they are written')
+    args = parser.parse_args()
+
+    if args.tail:
+        tail(args.path, args.tail)
+    elif args.follow:
+        try:
+            follow(args.path)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        aggregate(args.path)
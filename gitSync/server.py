@@ -4,9 +4,13 @@ import threading
 import signal
 import sys
 from datetime import datetime
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, Response
 from dotenv import load_dotenv
 
+from events import SyncEventLog, events_after, format_sse
+from state import SyncStateFile, supervisor_state_path
+from sync_supervisor import HEARTBEAT_SECONDS
+
 # Import the sync logic from main
 from main import (
     fetch_all_posts,
@@ -14,6 +18,8 @@ from main import (
     analyze_repo_for_posts,
     update_post_git_changes,
     cleanup_git_processes,
+    RepoBudget,
+    RepoCostLedger,
     AIRTABLE_API_KEY,
     AIRTABLE_BASE_ID
 )
@@ -30,6 +36,24 @@ last_sync_result = None
 sync_error = None
 sync_count = 0
 
+# Recent per-repo progress events for /api/sync-events
+sync_events = SyncEventLog(maxlen=int(os.environ.get('SYNC_EVENTS_BUFFER', 1000)))
+SSE_HEARTBEAT_SECONDS = 15
+
+# Every open stream holds an HTTP worker thread until the client goes away, so streams are
+# capped below the thread count to leave threads for /health and the rest of the API
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', max(1, int(os.environ.get('GUNICORN_THREADS', 8)) - 2)))
+sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+# Set by the production entry point (gunicorn.conf.py): sync then runs in sync_worker.py
+# and these HTTP workers serve its status and events from this file
+SYNC_STATE_FILE = os.environ.get('SYNC_STATE_FILE')
+state_file = SyncStateFile(SYNC_STATE_FILE) if SYNC_STATE_FILE else None
+SYNC_STATE_POLL_SECONDS = 1
+# sync_supervisor.py's heartbeat; missing a few beats means nothing is keeping syncs running
+supervisor_file = SyncStateFile(supervisor_state_path(SYNC_STATE_FILE)) if SYNC_STATE_FILE else None
+SUPERVISOR_STALE_SECONDS = HEARTBEAT_SECONDS * 4
+
 
 def signal_handler(signum, frame):
     """Handle shutdown signals to cleanup processes."""
@@ -55,11 +79,14 @@ def perform_full_sync():
     print(f"Starting sync #{sync_count + 1} at {datetime.now().isoformat()}")
     print(f"{'='*80}\n")
     
+    sync_events.publish('sync_started', sync_number=sync_count + 1)
+    
     # Fetch posts
     posts = fetch_all_posts()
     print(f"Total posts fetched: {len(posts)}")
     
     if len(posts) == 0:
+        sync_events.publish('sync_completed', total_posts=0, repos_processed=0, posts_updated=0)
         return {
             'success': True,
             'message': 'No posts to process',
@@ -68,8 +95,9 @@ def perform_full_sync():
             'timestamp': datetime.now().isoformat()
         }
     
-    # Group by GitHub URL
-    grouped_data = group_posts_by_github_url(posts)
+    # Group by GitHub URL, with repos that keep blowing their budget last
+    ledger = RepoCostLedger()
+    grouped_data = ledger.prioritize(group_posts_by_github_url(posts))
     print(f"Grouped into {len(grouped_data)} unique repositories\n")
     
     repos_processed = 0
@@ -80,21 +108,34 @@ def perform_full_sync():
         print(f"Repository {i}/{len(grouped_data)}: {repo['github_url']}")
         print(f"  Posts: {len(repo['posts'])}")
         
+        repo_started = time.monotonic()
+        degraded = ledger.is_degraded(repo['github_url'])
+        sync_events.publish('repo_started', github_url=repo['github_url'], posts=len(repo['posts']), degraded=degraded)
+        
         try:
             # Analyze repo and get git changes
-            repo['posts'] = analyze_repo_for_posts(repo['github_url'], repo['posts'])
+            budget = RepoBudget()
+            repo['posts'] = analyze_repo_for_posts(repo['github_url'], repo['posts'], progress=sync_events.publish,
+                                                   budget=budget, degraded=degraded)
+            ledger.record(repo['github_url'], budget, degraded)
             
             # Update Airtable with git changes
+            repo_posts_updated = 0
             for post in repo['posts']:
                 if post.get('git_changes'):
                     print(f"  Updating Airtable for post {post['post_id']}...")
                     if update_post_git_changes(post['record_id'], post['git_changes']):
-                        posts_updated += 1
+                        repo_posts_updated += 1
             
+            posts_updated += repo_posts_updated
             repos_processed += 1
+            sync_events.publish('posts_updated', github_url=repo['github_url'], posts_updated=repo_posts_updated,
+                                duration=round(time.monotonic() - repo_started, 3), cost=budget.usage())
             
         except Exception as e:
             print(f"  Error processing repo: {e}")
+            sync_events.publish('repo_failed', github_url=repo['github_url'], error=str(e),
+                                duration=round(time.monotonic() - repo_started, 3))
             continue
     
     result = {
@@ -105,6 +146,9 @@ def perform_full_sync():
         'timestamp': datetime.now().isoformat()
     }
     
+    sync_events.publish('sync_completed', total_posts=len(posts), repos_processed=repos_processed,
+                        posts_updated=posts_updated)
+    
     print(f"\n{'='*80}")
     print(f"Sync complete: {repos_processed} repos, {posts_updated} posts updated")
     print(f"{'='*80}\n")
@@ -115,10 +159,28 @@ def perform_full_sync():
     return result
 
 
-def run_continuous_sync():
-    """Run continuous sync loop."""
+def current_status():
+    """Get the sync status fields served by /api/sync-status."""
+    return {
+        'is_running': is_sync_running,
+        'last_sync_time': last_sync_time.isoformat() if last_sync_time else None,
+        'last_sync_result': last_sync_result,
+        'last_error': sync_error,
+        'sync_count': sync_count
+    }
+
+
+def run_continuous_sync(on_state_change=None, wait=time.sleep):
+    """Run continuous sync loop.
+    
+    on_state_change() is called whenever the status changes, and wait(seconds) is used
+    between passes so the sync worker can cut the wait short on a manual trigger.
+    """
     global is_sync_running, last_sync_time, last_sync_result, sync_error, sync_count
     
+    if on_state_change is None:
+        on_state_change = lambda: None
+    
     while True:
         if is_sync_running:
             time.sleep(1)
@@ -126,22 +188,26 @@ def run_continuous_sync():
         
         is_sync_running = True
         sync_count += 1
+        on_state_change()
         
         try:
             result = perform_full_sync()
             last_sync_result = result
             last_sync_time = datetime.now()
             sync_error = None
+            on_state_change()
             
             # Wait before next sync
             print(f"Waiting 60 seconds before next sync...\n")
-            time.sleep(60)
+            wait(60)
             
         except Exception as error:
             sync_error = str(error)
+            sync_events.publish('sync_failed', sync_number=sync_count, error=sync_error)
+            on_state_change()
             print(f"❌ Sync #{sync_count} failed: {error}")
             print(f"Retrying in 30 seconds...\n")
-            time.sleep(30)
+            wait(30)
         
         finally:
             is_sync_running = False
@@ -150,31 +216,121 @@ def run_continuous_sync():
 # Routes
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint."""
-    return jsonify({
+    """Health check endpoint.
+
+    In production mode this also reports whether sync_supervisor.py is alive, and answers
+    503 when its heartbeat is stale so the container health check catches stopped syncs.
+    """
+    body = {
         'status': 'healthy',
         'timestamp': datetime.now().isoformat()
-    })
+    }
+    if not supervisor_file:
+        return jsonify(body)
+
+    heartbeat = supervisor_file.read()
+    alive = False
+    if heartbeat.get('updated_at'):
+        age = (datetime.now() - datetime.fromisoformat(heartbeat['updated_at'])).total_seconds()
+        alive = age < SUPERVISOR_STALE_SECONDS
+
+    body['sync_supervisor'] = {
+        'alive': alive,
+        'pid': heartbeat.get('supervisor_pid'),
+        'worker_pid': heartbeat.get('worker_pid'),
+        'worker_running': alive and heartbeat.get('worker_running', False),
+        'last_heartbeat': heartbeat.get('updated_at')
+    }
+    if not alive:
+        body['status'] = 'unhealthy'
+        return jsonify(body), 503
+    return jsonify(body)
 
 
 @app.route('/api/sync-status', methods=['GET'])
 def sync_status():
     """Get sync status."""
+    status = state_file.read().get('status', {}) if state_file else current_status()
     return jsonify({
-        'is_running': is_sync_running,
-        'last_sync_time': last_sync_time.isoformat() if last_sync_time else None,
-        'last_sync_result': last_sync_result,
-        'last_error': sync_error,
-        'sync_count': sync_count,
+        **status,
         'timestamp': datetime.now().isoformat()
     })
 
 
+@app.route('/api/sync-events', methods=['GET'])
+def sync_events_stream():
+    """Stream sync progress events as Server-Sent Events."""
+    # Resume after the last event the client saw, or replay whatever is still buffered
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('since') or 0
+    try:
+        last_id = int(last_id)
+    except ValueError:
+        last_id = 0
+    
+    def wait_for_events(cursor):
+        if not state_file:
+            return sync_events.wait_since(cursor, timeout=SSE_HEARTBEAT_SECONDS)
+        
+        # The sync worker is another process, so poll the events it mirrors into the state file
+        deadline = time.monotonic() + SSE_HEARTBEAT_SECONDS
+        while time.monotonic() < deadline:
+            events = events_after(state_file.read().get('events', []), cursor)
+            if events:
+                return events
+            time.sleep(SYNC_STATE_POLL_SECONDS)
+        return []
+    
+    def newest_event_id():
+        if not state_file:
+            return sync_events.last_id
+        state = state_file.read()
+        return max([state.get('last_event_id', 0)] + [e['id'] for e in state.get('events', [])[-1:]])
+    
+    def generate():
+        cursor = last_id
+        while True:
+            if cursor > newest_event_id():
+                # Ids started over (the sync worker lost its state file), so replay what is buffered
+                cursor = 0
+            events = wait_for_events(cursor)
+            if not events:
+                # Comment line keeps proxies from closing an idle connection
+                yield ': heartbeat\n\n'
+                continue
+            
+            for event in events:
+                yield format_sse(event)
+            cursor = events[-1]['id']
+    
+    if not sse_slots.acquire(blocking=False):
+        return jsonify({
+            'error': 'Too many open event streams',
+            'timestamp': datetime.now().isoformat()
+        }), 503, {'Retry-After': str(SSE_HEARTBEAT_SECONDS)}
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Called by the WSGI server when the stream ends or the client disconnects
+    response.call_on_close(sse_slots.release)
+    return response
+
+
 @app.route('/api/sync', methods=['POST'])
 def trigger_sync():
     """Manually trigger a sync."""
     global is_sync_running
     
+    if state_file:
+        # Production mode: hand the request to the sync worker instead of blocking this HTTP worker.
+        # It starts a pass as soon as the current one (if any) finishes.
+        state_file.request_sync()
+        return jsonify({
+            'message': 'Sync requested',
+            'timestamp': datetime.now().isoformat()
+        }), 202
+    
     if is_sync_running:
         return jsonify({
             'message': 'Sync already running',
@@ -201,6 +357,7 @@ def root():
         'endpoints': {
             'health': '/health',
             'sync_status': '/api/sync-status',
+            'sync_events': '/api/sync-events (SSE)',
             'trigger_sync': '/api/sync (POST)'
         }
     })
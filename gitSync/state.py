@@ -0,0 +1,63 @@
+import os
+import json
+import threading
+from typing import Dict, Any
+
+
+def supervisor_state_path(state_path: str) -> str:
+    """Where sync_supervisor.py writes its heartbeat, next to the sync worker's state file."""
+    return f"{state_path}.supervisor"
+
+
+class SyncStateFile:
+    """Small JSON file the sync worker writes and the HTTP workers read.
+
+    Writes go to a temp file and are renamed into place, so readers never see a
+    partial file. Reads are cached until the file's mtime changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.trigger_path = f"{path}.trigger"
+        self._lock = threading.Lock()
+        self._cached_mtime = None
+        self._cached_state = {}
+
+    def write(self, state: Dict[str, Any]):
+        """Atomically replace the state file."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+
+    def read(self) -> Dict[str, Any]:
+        """Get the latest state, or an empty dict if the worker hasn't written one yet."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+
+        with self._lock:
+            if mtime != self._cached_mtime:
+                try:
+                    with open(self.path) as f:
+                        self._cached_state = json.load(f)
+                    self._cached_mtime = mtime
+                except (OSError, json.JSONDecodeError):
+                    # Keep serving the previous state if the read raced a replace
+                    pass
+            return self._cached_state
+
+    def request_sync(self):
+        """Ask the sync worker to start a pass without waiting for its next interval."""
+        with open(self.trigger_path, 'w') as f:
+            f.write('1')
+
+    def take_sync_request(self) -> bool:
+        """Consume a pending sync request, if there is one."""
+        try:
+            os.remove(self.trigger_path)
+            return True
+        except FileNotFoundError:
+            return False
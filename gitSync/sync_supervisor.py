@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+from datetime import datetime
+
+from state import SyncStateFile, supervisor_state_path
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sync_worker.py')
+
+# Restart backoff for a crashing sync worker
+MIN_RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+# A worker that stayed up this long resets the backoff
+STABLE_RUN_SECONDS = 600
+# How long a stopping worker gets to finish before it is killed
+WORKER_STOP_TIMEOUT = float(os.environ.get('SYNC_WORKER_STOP_TIMEOUT', 30))
+# How often the supervisor records that it is alive, for /health
+HEARTBEAT_SECONDS = 5
+
+
+def exit_with_parent(on_orphaned):
+    """Call on_orphaned once if this process's parent dies.
+
+    A supervisor killed with SIGKILL can't stop its child, and a restarted one would then
+    run a second sync worker next to the orphaned one, so children watch for that themselves.
+    """
+    parent_pid = os.getppid()
+
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        print(f"Parent process {parent_pid} exited, stopping")
+        on_orphaned()
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+class SyncSupervisor:
+    """Keep a script running as a child process, restarting it with backoff if it exits.
+
+    By default this supervises sync_worker.py and is meant to run in a process of its own
+    (python sync_supervisor.py): the gunicorn arbiter reaps every child with waitpid(-1),
+    which can take the worker's exit status before the supervisor sees it. The gunicorn
+    master only uses it to restart sync_supervisor.py itself, where the exit status
+    doesn't matter.
+    """
+
+    def __init__(self, script: str = WORKER_SCRIPT, name: str = 'sync worker', env: dict = None,
+                 heartbeat=None):
+        self.script = script
+        self.name = name
+        self.env = env or {}
+        # Called every HEARTBEAT_SECONDS while the child runs, and on every (re)start
+        self.heartbeat = heartbeat
+        self.process = None
+        self._stopping = threading.Event()
+
+    def run(self, stop_timeout: float = WORKER_STOP_TIMEOUT):
+        """Supervise the child in the foreground until request_stop() is called."""
+        delay = MIN_RESTART_DELAY
+
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            self.process = subprocess.Popen(
+                [sys.executable, self.script],
+                cwd=os.path.dirname(self.script),
+                env={**os.environ, 'PYTHONUNBUFFERED': '1', **self.env}
+            )
+            print(f"Started {self.name} (pid {self.process.pid})")
+
+            exit_code = self._wait()
+            if self._stopping.is_set():
+                break
+
+            if time.monotonic() - started > STABLE_RUN_SECONDS:
+                delay = MIN_RESTART_DELAY
+
+            print(f"{self.name.capitalize()} exited with code {exit_code}, restarting in {delay}s")
+            self._stopping.wait(delay)
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+        self._stop_worker(stop_timeout)
+
+    def _wait(self) -> int:
+        """Wait for the child to exit, beating the heartbeat while it runs."""
+        while True:
+            if self.heartbeat:
+                self.heartbeat(self)
+            try:
+                return self.process.wait(timeout=HEARTBEAT_SECONDS)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def request_stop(self):
+        """Stop restarting the child and ask it to exit (safe to call from a signal handler)."""
+        self._stopping.set()
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def _stop_worker(self, timeout: float):
+        """Wait for the child to exit after SIGTERM, killing it after `timeout`."""
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                print(f"{self.name.capitalize()} did not stop in time, killing it")
+                self.process.kill()
+                self.process.wait()
+
+
+def write_heartbeat(state_file: SyncStateFile, supervisor: SyncSupervisor):
+    """Record that the supervisor is alive and which worker it is running."""
+    worker = supervisor.process
+    state_file.write({
+        'supervisor_pid': os.getpid(),
+        'worker_pid': worker.pid if worker else None,
+        'worker_running': bool(worker) and worker.poll() is None,
+        'updated_at': datetime.now().isoformat()
+    })
+
+
+def main():
+    state_path = os.environ.get('SYNC_STATE_FILE')
+    heartbeat = None
+    if state_path:
+        heartbeat_file = SyncStateFile(supervisor_state_path(state_path))
+        heartbeat = lambda supervisor: write_heartbeat(heartbeat_file, supervisor)
+
+    supervisor = SyncSupervisor(heartbeat=heartbeat)
+
+    def handle_signal(signum, frame):
+        print(f"Received signal {signum}, stopping sync worker...")
+        supervisor.request_stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    exit_with_parent(supervisor.request_stop)
+
+    supervisor.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import os
+import time
+import signal
+import threading
+
+import server
+from server import run_continuous_sync, current_status, sync_events, signal_handler
+from state import SyncStateFile
+from sync_supervisor import exit_with_parent
+
+# Progress events are mirrored to the state file at most this often (the HTTP workers poll it once a second)
+EVENT_WRITE_INTERVAL = 1.0
+
+
+def main():
+    """Run the continuous sync loop, publishing status and events to the shared state file."""
+    if not server.SYNC_STATE_FILE:
+        raise ValueError("SYNC_STATE_FILE environment variable is not set")
+
+    state_file = SyncStateFile(server.SYNC_STATE_FILE)
+
+    write_lock = threading.Lock()
+    pending_write = None
+    last_write = 0.0
+
+    def write_state():
+        nonlocal pending_write, last_write
+        with write_lock:
+            if pending_write:
+                pending_write.cancel()
+                pending_write = None
+            last_write = time.monotonic()
+            state_file.write({
+                'status': current_status(),
+                'events': sync_events.since(0),
+                'last_event_id': sync_events.last_id,
+                'worker_pid': os.getpid(),
+                'updated_at': time.time()
+            })
+
+    def persist_state(event=None):
+        # Status changes are written right away; a burst of progress events becomes one write per interval
+        nonlocal pending_write
+        if event is not None:
+            with write_lock:
+                if pending_write:
+                    return
+                delay = last_write + EVENT_WRITE_INTERVAL - time.monotonic()
+                if delay > 0:
+                    pending_write = threading.Timer(delay, write_state)
+                    pending_write.daemon = True
+                    pending_write.start()
+                    return
+        write_state()
+
+    def wait_or_trigger(seconds):
+        # Sleep in short steps so a manual POST /api/sync starts the next pass right away
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if state_file.take_sync_request():
+                print("Manual sync requested, starting now")
+                return
+            time.sleep(1)
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    # Stop the same way as on SIGTERM, so git subprocesses are cleaned up
+    exit_with_parent(lambda: os.kill(os.getpid(), signal.SIGTERM))
+
+    # Continue the previous worker's event ids, so open SSE streams and Last-Event-ID resumes don't stall
+    previous_state = state_file.read()
+    sync_events.restore(previous_state.get('events', []), last_id=previous_state.get('last_event_id', 0))
+
+    sync_events.add_listener(persist_state)
+
+    # A request left over from before this worker started is served by the first pass anyway
+    state_file.take_sync_request()
+    persist_state()
+
+    print(f"Sync worker started (pid {os.getpid()}), state file: {state_file.path}")
+
+    run_continuous_sync(on_state_change=persist_state, wait=wait_or_trigger)
+
+
+if __name__ == '__main__':
+    main()
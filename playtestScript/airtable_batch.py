@@ -0,0 +1,231 @@
+"""
+Batched Airtable writes and deletes
+Sends records 10 at a time (Airtable's per-request maximum) from a few worker
+threads while staying under the base's rate limit, retrying failed batches
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import requests
+import urllib3
+
+from http_session import get_session
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Environment Variables
+AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
+AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
+
+# Airtable configuration
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
+MAX_RECORDS_PER_REQUEST = 10
+REQUESTS_PER_SECOND = 5  # Airtable's per-base rate limit
+# Sending these twice has the same effect as sending them once (a PATCH upsert merges on its
+# key), so they are retried after any failure; a POST only when it never reached Airtable
+IDEMPOTENT_METHODS = ('GET', 'PATCH', 'DELETE')
+# Airtable asks clients to wait 30s after a 429
+RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("AIRTABLE_RATE_LIMIT_BACKOFF_SECONDS", 30))
+
+def chunked(items, size=MAX_RECORDS_PER_REQUEST):
+    """Split a list into lists of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class RateLimiter:
+    """Thread-safe limiter that spaces requests evenly at a fixed rate"""
+
+    def __init__(self, requests_per_second=REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        """Block until the caller may send its next request"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Hold every worker back, e.g. after the server answered 429"""
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+def request_never_sent(error):
+    """Whether a failed request certainly didn't reach the server (the connection was never made)"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # requests wraps urllib3's MaxRetryError, whose reason is the underlying error
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return False
+
+class BatchError(Exception):
+    """A batch request failed; `retryable` tells whether sending it again may help"""
+
+    def __init__(self, message, retryable):
+        super().__init__(message)
+        self.retryable = retryable
+
+class AirtableBatchWriter:
+    """Write or delete records in one Airtable table in 10-record batches with bounded concurrency"""
+
+    def __init__(self, table, max_workers=3, requests_per_second=REQUESTS_PER_SECOND, max_retries=3):
+        self.table = table
+        self.url = f"{AIRTABLE_API_BASE}/{AIRTABLE_BASE_ID}/{requests.utils.quote(table)}"
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self.headers = {
+            'Authorization': f'Bearer {AIRTABLE_API_KEY}',
+            'Content-Type': 'application/json'
+        }
+
+    def _send(self, method, **kwargs):
+        """Send one rate-limited request and raise BatchError on failure
+
+        A POST that may have reached Airtable isn't retryable: a timeout or a 5xx can come
+        after the records were created, and sending them again would duplicate them.
+        """
+        idempotent = method in IDEMPOTENT_METHODS
+        self.rate_limiter.wait()
+        with self._count_lock:
+            self.request_count += 1
+
+        try:
+            response = get_session().request(method, self.url, headers=self.headers, timeout=60, **kwargs)
+        except requests.RequestException as e:
+            raise BatchError(f"Request failed: {e}", retryable=idempotent or request_never_sent(e))
+
+        if response.status_code == 429:
+            self.rate_limiter.pause(RATE_LIMIT_BACKOFF_SECONDS)
+            raise BatchError("Rate limited (429)", retryable=True)
+        if not response.ok:
+            raise BatchError(f"Airtable error {response.status_code}: {response.text}",
+                             retryable=idempotent and response.status_code >= 500)
+
+        return response.json()
+
+    def _run_batches(self, batches, send_batch):
+        """Send every batch, re-queueing retryable failures for up to max_retries more rounds
+
+        Returns:
+            tuple: (list of (batch, response) successes, list of {'batch', 'error', 'attempts'} failures)
+        """
+        succeeded = []
+        failed = []
+        queue = [(batch, 1) for batch in batches]
+
+        while queue:
+            retry_queue = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [(batch, attempts, executor.submit(send_batch, batch)) for batch, attempts in queue]
+
+                for batch, attempts, future in futures:
+                    try:
+                        succeeded.append((batch, future.result()))
+                    except BatchError as e:
+                        if e.retryable and attempts <= self.max_retries:
+                            retry_queue.append((batch, attempts + 1))
+                        else:
+                            failed.append({'batch': batch, 'error': str(e), 'attempts': attempts})
+
+            if retry_queue:
+                print(f"  🔁 Retrying {len(retry_queue)} failed batches...")
+                time.sleep(2 ** min(retry_queue[0][1], 5))
+            queue = retry_queue
+
+        return succeeded, failed
+
+    def create(self, field_sets, typecast=False):
+        """Create one record per fields dict
+
+        Returns:
+            dict: 'created' (created records), 'failed' (field sets with their error)
+                  and 'requests' (HTTP requests sent)
+        """
+        def send_batch(batch):
+            body = {'records': [{'fields': fields} for fields in batch]}
+            if typecast:
+                body['typecast'] = True
+            return self._send('POST', json=body)
+
+        succeeded, failed = self._run_batches(chunked(field_sets), send_batch)
+
+        created = []
+        for _, response in succeeded:
+            created.extend(response.get('records', []))
+
+        return {
+            'created': created,
+            'failed': [{'fields': fields, 'error': failure['error'], 'attempts': failure['attempts']}
+                       for failure in failed for fields in failure['batch']],
+            'requests': self.request_count
+        }
+
+    def upsert(self, field_sets, merge_on, typecast=False):
+        """Create records, or update the existing ones that match on the `merge_on` fields
+
+        With a deterministic key in `merge_on`, sending the same records twice
+        (e.g. a rerun after a crash) never creates duplicates.
+
+        Returns:
+            dict: 'created' and 'updated' records, 'failed' field sets and 'requests'
+        """
+        def send_batch(batch):
+            body = {
+                'performUpsert': {'fieldsToMergeOn': merge_on},
+                'records': [{'fields': fields} for fields in batch]
+            }
+            if typecast:
+                body['typecast'] = True
+            return self._send('PATCH', json=body)
+
+        succeeded, failed = self._run_batches(chunked(field_sets), send_batch)
+
+        created = []
+        updated = []
+        for _, response in succeeded:
+            created_ids = set(response.get('createdRecords', []))
+            for record in response.get('records', []):
+                (created if record.get('id') in created_ids else updated).append(record)
+
+        return {
+            'created': created,
+            'updated': updated,
+            'failed': [{'fields': fields, 'error': failure['error'], 'attempts': failure['attempts']}
+                       for failure in failed for fields in failure['batch']],
+            'requests': self.request_count
+        }
+
+    def delete(self, record_ids):
+        """Delete records by ID
+
+        Returns:
+            dict: 'deleted' (record IDs), 'failed' (record IDs with their error) and 'requests'
+        """
+        def send_batch(batch):
+            return self._send('DELETE', params={'records[]': batch})
+
+        succeeded, failed = self._run_batches(chunked(record_ids), send_batch)
+
+        deleted = []
+        for _, response in succeeded:
+            deleted.extend(record['id'] for record in response.get('records', []) if record.get('deleted'))
+
+        return {
+            'deleted': deleted,
+            'failed': [{'record_id': record_id, 'error': failure['error'], 'attempts': failure['attempts']}
+                       for failure in failed for record_id in failure['batch']],
+            'requests': self.request_count
+        }
@@ -0,0 +1,394 @@
+"""
+Playtest assignment engine
+Solvers that decide which players playtest which games, independent of Airtable
+"""
+
+import heapq
+import random
+from collections import defaultdict, deque
+from models import Assignment, EligibleRecord, GameSlots, PlayerSlots
+
+class AssignmentState:
+    """Hashed bookkeeping for the assignments made so far.
+    
+    Keeps a set of (player, game) pairs plus per-player and per-game load counters,
+    so checking a candidate is O(1) instead of a scan over every assignment.
+    """
+    
+    def __init__(self, existing_pairs=None):
+        self.assignments = []
+        self.assigned_pairs = set()
+        # (player, game) pairs that already have a ticket from an earlier run
+        self.existing_pairs = existing_pairs or set()
+        self.player_load = defaultdict(int)
+        self.game_load = defaultdict(int)
+        # game_id -> ticket slots the solver could not fill
+        self.unfilled = defaultdict(int)
+    
+    def is_assigned(self, player_user_id, game_id):
+        """Check if this player already has this game (now or from an earlier run)"""
+        pair = (player_user_id, game_id)
+        return pair in self.assigned_pairs or pair in self.existing_pairs
+    
+    def add(self, game, player):
+        """Record an assignment of player to game and return it"""
+        assignment = Assignment(game.game_id, game.game_name, game.owner_email, player.email, player.user_id)
+        self.assignments.append(assignment)
+        self.assigned_pairs.add((player.user_id, game.game_id))
+        self.player_load[player.user_id] += 1
+        self.game_load[game.game_id] += 1
+        return assignment
+
+def get_eligible_records(records):
+    """Pick the Active YSWS records that still need tickets"""
+    # Filter records with TicketsNeeded > 0
+    return [EligibleRecord.from_airtable(record) for record in records
+            if record.get('fields', {}).get('TicketsNeeded', 0) > 0]
+
+def build_assignment_pools(eligible_records):
+    """Expand eligible records into the game and player pools for circular assignment
+    
+    Each record becomes one GameSlots and one PlayerSlots object carrying its ticket count;
+    the pools repeat references to it once per ticket, so big pools don't copy a dict per slot.
+    """
+    # Create circular lists
+    games_needing_playtests = []
+    players_available = []
+    
+    for record in eligible_records:
+        # Add games to the pool
+        game = GameSlots(record.game_id, record.game_name, record.user_id, record.email, record.tickets_needed)
+        games_needing_playtests.extend([game] * game.count)
+        
+        # Add players to the pool (each person should play tickets_needed games)
+        player = PlayerSlots(record.user_id, record.email, record.tickets_needed)
+        players_available.extend([player] * player.count)
+    
+    return games_needing_playtests, players_available
+
+def circular_assignment(games_needing_playtests, players_available, on_assign=None, verbose=True,
+                        existing_pairs=None):
+    """Run the circular assignment over already-shuffled pools
+    
+    Args:
+        games_needing_playtests (list): One GameSlots reference per ticket a game needs
+        players_available (list): One PlayerSlots reference per ticket a player should play
+        on_assign (callable): Called as on_assign(game, player) for each assignment
+        verbose (bool): Print every step of the search
+        existing_pairs (set): (player, game) pairs that already have tickets
+    
+    Returns:
+        tuple: (AssignmentState, games processed, attempts)
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    state = AssignmentState(existing_pairs)
+    
+    def is_suitable(player, game):
+        return (player.user_id != game.owner_user_id and
+                player.user_id is not None)
+    
+    def assign(game, player, player_index, found_text):
+        state.add(game, player)
+        log(f"   ✅ {found_text}: {player.email}")
+        log(f"   📍 Player index: {player_index}")
+        if on_assign:
+            on_assign(game, player)
+    
+    game_index = 0
+    player_index = 0
+    attempts = 0
+    max_attempts = len(players_available) * 2  # Prevent infinite loops
+    
+    while game_index < len(games_needing_playtests) and attempts < max_attempts:
+        current_game = games_needing_playtests[game_index]
+        attempts += 1
+        
+        # Find next available player in circular fashion
+        original_player_index = player_index
+        found_player = False
+        
+        log(f"\n🎮 Game {game_index + 1}: {current_game.game_name} (by {current_game.owner_email})")
+        log(f"   Looking for player...")
+        
+        # Try to find a suitable player by moving through the circle
+        while player_index < len(players_available) and not found_player:
+            current_player = players_available[player_index]
+            
+            # Check if this player is suitable
+            if is_suitable(current_player, current_game):
+                # Check if this player already has this game assigned
+                if not state.is_assigned(current_player.user_id, current_game.game_id):
+                    # Found a suitable player!
+                    assign(current_game, current_player, player_index, "Found")
+                    found_player = True
+                    game_index += 1
+                    player_index += 1  # Move to next player for next game
+                else:
+                    log(f"   ⚠️  {current_player.email} already has this game")
+                    player_index += 1
+            else:
+                if current_player.user_id == current_game.owner_user_id:
+                    log(f"   ❌ {current_player.email} is the owner (skip)")
+                else:
+                    log(f"   ❌ {current_player.email} has no user_id (skip)")
+                player_index += 1
+        
+        # If we went through all players and didn't find one, wrap around
+        if not found_player:
+            if player_index >= len(players_available):
+                log(f"   🔄 Wrapping around to start of player list")
+                player_index = 0
+                
+                # Try one more time through the list
+                while player_index < original_player_index and not found_player:
+                    current_player = players_available[player_index]
+                    
+                    if (is_suitable(current_player, current_game) and
+                            not state.is_assigned(current_player.user_id, current_game.game_id)):
+                        assign(current_game, current_player, player_index, "Found on wrap-around")
+                        found_player = True
+                        game_index += 1
+                        player_index += 1
+                    else:
+                        player_index += 1
+                
+                if not found_player:
+                    log(f"   ❌ Could not find suitable player after full circle")
+                    game_index += 1  # Skip this game
+                    player_index = original_player_index + 1  # Try next player for next game
+    
+    return state, game_index, attempts
+
+def circular_solver(eligible_records, rng, verbose=True, existing_pairs=None):
+    """Original shuffle-and-scan assignment; skips a game slot when no player fits"""
+    games_needing_playtests, players_available = build_assignment_pools(eligible_records)
+    
+    # Shuffle both lists
+    rng.shuffle(games_needing_playtests)
+    rng.shuffle(players_available)
+    
+    state, game_index, attempts = circular_assignment(games_needing_playtests, players_available, verbose=verbose,
+                                                      existing_pairs=existing_pairs)
+    
+    # Anything the circular search skipped or never reached stays unfilled
+    demand = defaultdict(int)
+    for game in games_needing_playtests:
+        demand[game.game_id] += 1
+    for game_id, needed in demand.items():
+        if needed > state.game_load[game_id]:
+            state.unfilled[game_id] = needed - state.game_load[game_id]
+    
+    return state
+
+def matching_solver(eligible_records, rng, verbose=True, existing_pairs=None):
+    """Maximum, load-balanced assignment of game slots to player slots
+    
+    Games need TicketsNeeded playtests each and players play TicketsNeeded games each.
+    Nobody plays their own game and no (player, game) pair repeats, including pairs in
+    existing_pairs that already have a ticket from an earlier run. Slots are filled
+    greedily, always giving the next game the players with the most slots left (which
+    balances load), then any slot still open is filled along augmenting paths that move
+    players between games, as in max-flow / Hopcroft-Karp. When no augmenting path is
+    left the assignment is maximum.
+    
+    Works on per-game and per-player counts rather than one entry per ticket, and never
+    materializes the game x player graph, so tens of thousands of slots solve quickly.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    
+    # Aggregate demand per game and capacity per player
+    game_demand = defaultdict(int)
+    game_info = {}
+    game_owners = defaultdict(set)
+    capacity = defaultdict(int)
+    players = {}
+    
+    for record in eligible_records:
+        if record.game_id is not None:
+            game_demand[record.game_id] += record.tickets_needed
+            game_owners[record.game_id].add(record.user_id)
+            game_info.setdefault(record.game_id, GameSlots(record.game_id, record.game_name, record.user_id,
+                                                           record.email))
+        if record.user_id is not None:
+            capacity[record.user_id] += record.tickets_needed
+            players[record.user_id] = PlayerSlots(record.user_id, record.email)
+    
+    # Random tie-breaks (fixed per player/game) make seeded runs reproducible
+    player_order = {user_id: rng.random() for user_id in capacity}
+    game_order = {game_id: rng.random() for game_id in game_demand}
+    
+    remaining = dict(capacity)
+    # Players with slots left (a dict keeps iteration order deterministic)
+    free_players = dict.fromkeys(sorted(capacity, key=lambda p: player_order[p]), True)
+    player_games = defaultdict(set)
+    game_players = defaultdict(set)
+    
+    existing_pairs = existing_pairs or set()
+    
+    def allowed(user_id, game_id):
+        return (user_id not in game_owners[game_id] and game_id not in player_games[user_id] and
+                (user_id, game_id) not in existing_pairs)
+    
+    def link(user_id, game_id):
+        player_games[user_id].add(game_id)
+        game_players[game_id].add(user_id)
+        remaining[user_id] -= 1
+        if remaining[user_id] == 0:
+            free_players.pop(user_id, None)
+    
+    def unlink(user_id, game_id):
+        player_games[user_id].discard(game_id)
+        game_players[game_id].discard(user_id)
+        remaining[user_id] += 1
+        free_players[user_id] = True
+    
+    # Greedy phase: biggest games first, each taking the distinct players with the most slots left
+    heap = [(-remaining[user_id], player_order[user_id], user_id) for user_id in capacity]
+    heapq.heapify(heap)
+    
+    for game_id in sorted(game_demand, key=lambda g: (-game_demand[g], game_order[g])):
+        taken = []
+        skipped = []
+        while len(taken) < game_demand[game_id] and heap:
+            entry = heapq.heappop(heap)
+            if allowed(entry[2], game_id):
+                taken.append(entry)
+            else:
+                skipped.append(entry)
+        
+        for _, order, user_id in taken:
+            link(user_id, game_id)
+            if remaining[user_id] > 0:
+                heapq.heappush(heap, (-remaining[user_id], order, user_id))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+    
+    greedy_filled = sum(len(players) for players in game_players.values())
+    log(f"   Greedy phase filled {greedy_filled} slots")
+    
+    # Augmenting phase: for each open slot, look for a chain
+    # game -> player (reassigned from another game) -> that game -> ... -> player with spare slots
+    players_by_order = sorted(capacity, key=lambda p: player_order[p])
+    # Games and players a failed search reached; nothing can augment through them later
+    dead_games = set()
+    dead_players = set()
+    augmented = 0
+    
+    def find_augmenting_path(start_game):
+        came_from_game = {}   # player -> game that takes them over
+        dropped_by = {}       # game -> player that leaves it
+        visited_players = set()
+        queue = deque([start_game])
+        visited_games = {start_game}
+        
+        while queue:
+            game_id = queue.popleft()
+            
+            # A player with a spare slot ends the chain right here
+            for user_id in free_players:
+                if user_id not in dead_players and allowed(user_id, game_id):
+                    visited_players.add(user_id)
+                    came_from_game[user_id] = game_id
+                    return user_id, came_from_game, dropped_by, visited_games, visited_players
+            
+            for user_id in players_by_order:
+                if user_id in visited_players or not allowed(user_id, game_id):
+                    continue
+                visited_players.add(user_id)
+                came_from_game[user_id] = game_id
+                
+                for other_game in player_games[user_id]:
+                    if other_game not in visited_games and other_game not in dead_games:
+                        visited_games.add(other_game)
+                        dropped_by[other_game] = user_id
+                        queue.append(other_game)
+        
+        return None, came_from_game, dropped_by, visited_games, visited_players
+    
+    for game_id in sorted(game_demand, key=lambda g: game_order[g]):
+        if not free_players:
+            break  # Every player slot is used, nothing left to augment with
+        while len(game_players[game_id]) < game_demand[game_id] and game_id not in dead_games:
+            end_player, came_from_game, dropped_by, visited_games, visited_players = find_augmenting_path(game_id)
+            if end_player is None:
+                # No augmenting path through any of these games or players now, and none will appear later
+                dead_games.update(visited_games)
+                dead_players.update(visited_players)
+                players_by_order = [user_id for user_id in players_by_order if user_id not in dead_players]
+                break
+            
+            # Walk the chain back: each player takes over the game before it and leaves its old one
+            user_id = end_player
+            target_game = came_from_game[user_id]
+            link(user_id, target_game)
+            while target_game != game_id:
+                user_id = dropped_by[target_game]
+                unlink(user_id, target_game)
+                target_game = came_from_game[user_id]
+                link(user_id, target_game)
+            augmented += 1
+    
+    log(f"   Augmenting paths filled {augmented} more slots")
+    
+    # Record the final assignment in a stable order
+    state = AssignmentState(existing_pairs)
+    for game_id in sorted(game_demand, key=lambda g: game_order[g]):
+        for user_id in sorted(game_players[game_id], key=lambda p: player_order[p]):
+            state.add(game_info[game_id], players[user_id])
+        if game_demand[game_id] > len(game_players[game_id]):
+            state.unfilled[game_id] = game_demand[game_id] - len(game_players[game_id])
+    
+    return state
+
+# Assignment solvers by name: solver(eligible_records, rng, verbose, existing_pairs) -> AssignmentState
+SOLVERS = {
+    'matching': matching_solver,
+    'circular': circular_solver
+}
+
+def solve_assignment(eligible_records, solver='matching', seed=None, verbose=True, existing_pairs=None):
+    """Assign players to games with the named solver; a seed makes the result reproducible
+    
+    Pairs in existing_pairs (player_user_id, game_id) are never assigned again.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown assignment solver '{solver}' (choose from {', '.join(SOLVERS)})")
+    
+    rng = random.Random(seed)
+    return SOLVERS[solver](eligible_records, rng, verbose=verbose, existing_pairs=existing_pairs)
+
+
+def assignment_report(eligible_records, state):
+    """Summarize how well an assignment filled the pool
+    
+    Returns:
+        dict: slot totals, fill rate, unfilled slots/games, per-player load statistics
+              (mean, variance, min, max over every player who had slots to play) and
+              over_capacity_slots, the assignments beyond a player's own TicketsNeeded
+    """
+    total_slots = sum(record.tickets_needed for record in eligible_records if record.game_id is not None)
+    
+    capacity = defaultdict(int)
+    for record in eligible_records:
+        if record.user_id is not None:
+            capacity[record.user_id] += record.tickets_needed
+    
+    loads = [state.player_load.get(user_id, 0) for user_id in capacity]
+    mean_load = sum(loads) / len(loads) if loads else 0.0
+    load_variance = sum((load - mean_load) ** 2 for load in loads) / len(loads) if loads else 0.0
+    
+    return {
+        'total_slots': total_slots,
+        'assigned': len(state.assignments),
+        'fill_rate': len(state.assignments) / total_slots if total_slots else 1.0,
+        'unfilled_slots': sum(state.unfilled.values()),
+        'unfilled_games': len(state.unfilled),
+        'players': len(capacity),
+        'missing_user_records': sum(1 for record in eligible_records if record.user_id is None),
+        'player_load_mean': mean_load,
+        'player_load_variance': load_variance,
+        'player_load_min': min(loads) if loads else 0,
+        'player_load_max': max(loads) if loads else 0,
+        'over_capacity_slots': sum(max(0, load - capacity.get(user_id, 0))
+                                   for user_id, load in state.player_load.items())
+    }
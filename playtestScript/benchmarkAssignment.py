@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark and simulate the playtest assignment solvers on synthetic YSWS pools
+No Airtable access is needed, nothing is prompted for and no tickets are created
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from assignment import get_eligible_records, solve_assignment, assignment_report, SOLVERS
+
+DISTRIBUTIONS = ('uniform', 'skewed')
+
+def draw_tickets_needed(rng, distribution, max_tickets_per_record):
+    """Draw one record's TicketsNeeded
+    
+    'uniform' picks 1..max evenly; 'skewed' follows a Pareto tail, so most records
+    need one or two tickets and a few need many.
+    """
+    if distribution == 'skewed':
+        return min(int(rng.paretovariate(1.5)), max_tickets_per_record)
+    return rng.randint(1, max_tickets_per_record)
+
+def generate_ysws_records(total_tickets, max_tickets_per_record=5, seed=None, distribution='uniform',
+                          missing_user_rate=0.0):
+    """Generate fake Active YSWS records whose TicketsNeeded add up to total_tickets
+    
+    Args:
+        total_tickets (int): Sum of TicketsNeeded over all records
+        max_tickets_per_record (int): Cap on one record's TicketsNeeded
+        seed (int): Seed for a reproducible pool
+        distribution (str): 'uniform' or 'skewed' TicketsNeeded (see draw_tickets_needed)
+        missing_user_rate (float): Fraction of records with no linked User
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution '{distribution}' (choose from {', '.join(DISTRIBUTIONS)})")
+
+    rng = random.Random(seed)
+    records = []
+    tickets_left = total_tickets
+
+    while tickets_left > 0:
+        index = len(records)
+        tickets_needed = min(draw_tickets_needed(rng, distribution, max_tickets_per_record), tickets_left)
+        tickets_left -= tickets_needed
+        fields = {
+            'Game': [f"recGame{index:08d}"],
+            'Game Name': [f"Game {index}"],
+            'Email': f"player{index}@example.com",
+            'TicketsNeeded': tickets_needed
+        }
+        if rng.random() >= missing_user_rate:
+            fields['User'] = [f"recUser{index:08d}"]
+        records.append({'id': f"recYSWS{index:08d}", 'fields': fields})
+
+    return records
+
+def run_benchmark(total_tickets, solver, seed=None, distribution='uniform', missing_user_rate=0.0,
+                  measure_memory=True):
+    """Run one solver on one synthetic pool and print its report
+    
+    Memory is measured in a second, traced run so tracing doesn't skew the runtime.
+    
+    Returns:
+        dict: assignment_report() plus 'solver', 'tickets', 'records', 'seconds' and 'peak_mb'
+    """
+    eligible_records = get_eligible_records(generate_ysws_records(
+        total_tickets, seed=seed, distribution=distribution, missing_user_rate=missing_user_rate
+    ))
+
+    start = time.perf_counter()
+    state = solve_assignment(eligible_records, solver=solver, seed=seed, verbose=False)
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        solve_assignment(eligible_records, solver=solver, seed=seed, verbose=False)
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    report = assignment_report(eligible_records, state)
+    report.update({
+        'solver': solver,
+        'tickets': total_tickets,
+        'records': len(eligible_records),
+        'seconds': seconds,
+        'peak_mb': peak_mb
+    })
+
+    memory_text = f"{peak_mb:7.1f}MB" if peak_mb is not None else "      -"
+    print(f"  {solver:<9} Tickets: {total_tickets:>8}  Records: {len(eligible_records):>7}  "
+          f"Fill: {report['fill_rate']:6.1%}  Unfilled: {report['unfilled_slots']:>6}  "
+          f"Over cap: {report['over_capacity_slots']:>6}  Load var: {report['player_load_variance']:6.2f}  Time: {seconds:6.2f}s  Peak: {memory_text}")
+
+    return report
+
+def main():
+    """Benchmark assignment across increasing pool sizes"""
+    parser = argparse.ArgumentParser(description="Benchmark and simulate the playtest assignment algorithm offline")
+    parser.add_argument('--tickets', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Total TicketsNeeded per synthetic pool")
+    parser.add_argument('--solver', choices=list(SOLVERS), nargs='+', default=list(SOLVERS),
+                        help="Solvers to compare")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for reproducible pools")
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform',
+                        help="TicketsNeeded distribution of the synthetic records")
+    parser.add_argument('--missing-user-rate', type=float, default=0.0,
+                        help="Fraction of records without a linked User (0-1)")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced run that measures peak memory")
+    parser.add_argument('--json', metavar='FILE', help="Also write every report to this JSON file")
+    args = parser.parse_args()
+
+    print("⏱️  Assignment Benchmark")
+    print(f"  Distribution: {args.distribution}  Missing users: {args.missing_user_rate:.0%}  Seed: {args.seed}")
+    print("=" * 60)
+    reports = []
+    for total_tickets in args.tickets:
+        for solver in args.solver:
+            reports.append(run_benchmark(total_tickets, solver, seed=args.seed, distribution=args.distribution,
+                                         missing_user_rate=args.missing_user_rate,
+                                         measure_memory=not args.no_memory))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n💾 Saved reports to: {args.json}")
+
+if __name__ == "__main__":
+    main()
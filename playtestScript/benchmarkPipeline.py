@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Benchmark the playtest tools end to end against local fake Airtable and OpenAI servers
+Each entry point runs through playtestCli on a fresh synthetic base, in its own empty
+working directory (so state files and the LLM cache start cold); nothing leaves the machine
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarkAssignment import draw_tickets_needed
+from fake_services import FakeAirtable, FakeChat
+
+ENTRY_POINTS = ('dedupe', 'assign', 'challenges', 'audit', 'slack-export', 'slack-delta')
+
+FIRST_NAMES = ['Ada', 'Linus', 'Grace', 'Ken', 'Margaret', 'Dennis', 'Barbara', 'Guido', 'Doe, "Jane"', "O'Brien"]
+LAST_NAMES = ['Lovelace', 'Torvalds', 'Hopper', 'Thompson', 'Hamilton', 'Ritchie', 'Liskov', 'van Rossum']
+
+# Feedback is built from these; praise alone should come back as "No challenge found"
+FEEDBACK_PRAISE = ['Fun game!', 'Loved the art style.', 'Great music.', 'Really cool idea.', 'Nice work overall.']
+FEEDBACK_ISSUES = [
+    'The jump felt floaty and I kept missing the second platform.', 'I got stuck behind the crate in level 2.',
+    "I couldn't figure out the controls without a tutorial.", 'The boss was way too hard compared to the rest.',
+    'Sound effects were too loud next to the music.', 'The camera lagged behind when running.',
+    'Collision on the moving platforms is broken.', 'Would be nice to have a restart button.',
+]
+CHALLENGE_STATUSES = ['Not Submitted', 'Not Submitted', 'Submitted', 'Approved']
+
+def timestamp(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def generate_dataset(players, games, tickets, seed=None, duplicate_rate=0.05, complete_rate=0.6,
+                     slack_id_rate=0.8, challenge_rate=0.2):
+    """Generate a linked synthetic base: Users, Active YSWS Record, PlaytestTickets and Challenges
+
+    Args:
+        players (int): Users, who both own the games and playtest them
+        games (int): Active YSWS records, each owned by a random user
+        tickets (int): Playtest tickets, duplicate_rate of them repeating an earlier (Player, GameToTest) pair
+        seed (int): Seed for a reproducible base
+        duplicate_rate (float): Fraction of tickets that duplicate an earlier pair
+        complete_rate (float): Fraction of tickets with status 'Complete'
+        slack_id_rate (float): Fraction of users with a Slack ID
+        challenge_rate (float): Fraction of complete tickets that already have a challenge
+
+    Returns:
+        dict: table name -> list of raw Airtable records ('id', 'createdTime', 'fields')
+    """
+    rng = random.Random(seed)
+    started = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+    users = []
+    for index in range(players):
+        fields = {
+            'email': f"player{index}@example.com",
+            'First Name': rng.choice(FIRST_NAMES),
+            'Last Name': rng.choice(LAST_NAMES),
+            'github username': f"player{index}"
+        }
+        if rng.random() < slack_id_rate:
+            fields['Slack ID'] = f"U{rng.randrange(16 ** 9):09X}"
+        users.append({'id': f"recUser{index:08d}", 'fields': fields})
+
+    ysws_records = []
+    owners = []
+    for index in range(games):
+        owner = rng.randrange(players)
+        owners.append(owner)
+        ysws_records.append({'id': f"recYSWS{index:08d}", 'fields': {
+            'User': [f"recUser{owner:08d}"],
+            'Game': [f"recGame{index:08d}"],
+            'Game Name': [f"Game {index}"],
+            'Email': f"player{owner}@example.com",
+            'TicketsNeeded': draw_tickets_needed(rng, 'skewed', 5)
+        }})
+
+    playtests = []
+    challenges = []
+    pairs = []
+    for index in range(tickets):
+        if pairs and rng.random() < duplicate_rate:
+            game, player = rng.choice(pairs)
+        else:
+            game = rng.randrange(games)
+            player = rng.randrange(players)
+            pairs.append((game, player))
+
+        created = started + timedelta(minutes=index)
+        record_id = f"recTicket{index:08d}"
+        fields = {
+            'PlaytestId': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'GameToTest': [f"recGame{game:08d}"],
+            'Player': [f"recUser{player:08d}"],
+            'Game Name': [f"Game {game}"],
+            'PlayerEmail': [f"player{player}@example.com"],
+            'ownerEmail': [f"player{owners[game]}@example.com"],
+            'Created At': timestamp(created),
+            'status': 'Complete' if rng.random() < complete_rate else 'Pending'
+        }
+        if fields['status'] == 'Complete':
+            feedback = [rng.choice(FEEDBACK_PRAISE)]
+            feedback += rng.sample(FEEDBACK_ISSUES, rng.randint(0, 2))
+            fields.update({
+                'Feedback': ' '.join(feedback),
+                'Fun Score': rng.randint(1, 5),
+                'Art Score': rng.randint(1, 5),
+                'Creativity Score': rng.randint(1, 5),
+                'Audio Score': rng.randint(1, 5),
+                'Mood Score': rng.randint(1, 5),
+                'SSSAwarded': rng.randint(0, 25),
+                'Playtime Seconds': rng.randint(30, 1800)
+            })
+            if rng.random() < challenge_rate:
+                challenge_id = f"recChallenge{len(challenges):08d}"
+                fields['Challenges'] = [challenge_id]
+                challenges.append({'id': challenge_id, 'createdTime': timestamp(created), 'fields': {
+                    'recipientEmail': f"player{owners[game]}@example.com",
+                    'Challenge': f"Fix {rng.choice(FEEDBACK_ISSUES).lower()}",
+                    'Status': rng.choice(CHALLENGE_STATUSES),
+                    'Earnable SSS': rng.randint(0, 25),
+                    'SSS Earned': 0,
+                    'AssignedGame': [f"recGame{game:08d}"],
+                    'FromPlaytest': [record_id],
+                    'Created At': timestamp(created)
+                }})
+        playtests.append({'id': record_id, 'createdTime': timestamp(created), 'fields': fields})
+
+    return {
+        'Users': users,
+        'Active YSWS Record': ysws_records,
+        'PlaytestTickets': playtests,
+        'Challenges': challenges
+    }
+
+def load_dataset(airtable, dataset):
+    airtable.clear()
+    for table, records in dataset.items():
+        airtable.load(table, records)
+
+def entry_point_runs(dataset, touch_rate=0.01, seed=None):
+    """(setup, run, items) per entry point
+
+    setup(airtable) runs unmeasured before run(); items is what the entry point works
+    through, for throughput.
+    """
+    from playtestCli import COMMANDS
+
+    complete = sum(1 for record in dataset['PlaytestTickets'] if record['fields']['status'] == 'Complete')
+    touched = max(1, int(len(dataset['Users']) * touch_rate))
+
+    def sync_then_touch(airtable):
+        COMMANDS['slack-ids'](argparse.Namespace(delta=True, full_refresh=False, export=None, gzip=False,
+                                                 display=None))
+        rng = random.Random(seed)
+        for record in rng.sample(dataset['Users'], touched):
+            airtable.touch('Users', record['id'], {'Slack ID': f"U{rng.randrange(16 ** 9):09X}"})
+
+    return {
+        'dedupe': (None, lambda: COMMANDS['dedupe'](argparse.Namespace(apply=None, yes=False, live=True)),
+                   len(dataset['PlaytestTickets'])),
+        'assign': (None, lambda: COMMANDS['assign'](argparse.Namespace(solver='matching', seed=seed, live=True)),
+                   sum(record['fields']['TicketsNeeded'] for record in dataset['Active YSWS Record'])),
+        'challenges': (None, lambda: COMMANDS['challenges'](argparse.Namespace(
+                           sequential=False, prefilter_threshold=None, mode='generate')),
+                       complete),
+        'audit': (None, lambda: COMMANDS['audit'](argparse.Namespace(
+                      max_not_submitted=3, full=True, json='audit.json', csv='violations.csv')),
+                  len(dataset['Challenges'])),
+        'slack-export': (None, lambda: COMMANDS['slack-ids'](argparse.Namespace(
+                             delta=False, full_refresh=False, export=['csv', 'ndjson'], gzip=True, display=None)),
+                         len(dataset['Users'])),
+        'slack-delta': (sync_then_touch, lambda: COMMANDS['slack-ids'](argparse.Namespace(
+                            delta=True, full_refresh=False, export=None, gzip=False, display=None)),
+                        touched),
+    }
+
+def run_entry_point(name, setup, run, items, airtable, chat, dataset, work_dir, measure_memory=True, verbose=False):
+    """Run one entry point on a freshly loaded base and measure it
+
+    Peak memory is traced over the whole process, so it includes the fake servers
+    answering on their own threads.
+
+    Returns:
+        dict: 'entry_point', 'items', 'seconds', 'items_per_second', 'peak_mb', 'error',
+              and the 'airtable' and 'chat' request summaries
+    """
+    load_dataset(airtable, dataset)
+    run_dir = os.path.join(work_dir, name)
+    os.makedirs(run_dir, exist_ok=True)
+    previous_dir = os.getcwd()
+    os.chdir(run_dir)
+
+    output = sys.stdout if verbose else open(os.devnull, 'w')
+    error = None
+    peak_mb = None
+    try:
+        with contextlib.redirect_stdout(output):
+            if setup:
+                setup(airtable)
+            airtable.log.reset()
+            chat.log.reset()
+
+            if measure_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                run()
+            except Exception as e:
+                error = str(e)
+            seconds = time.perf_counter() - start
+            if measure_memory:
+                peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+    finally:
+        if not verbose:
+            output.close()
+        os.chdir(previous_dir)
+
+    return {
+        'entry_point': name,
+        'items': items,
+        'seconds': seconds,
+        'items_per_second': items / seconds if seconds else None,
+        'peak_mb': peak_mb,
+        'error': error,
+        'airtable': airtable.log.summary(),
+        'chat': chat.log.summary()
+    }
+
+def print_report(report):
+    airtable = report['airtable']
+    memory_text = f"{report['peak_mb']:7.1f}MB" if report['peak_mb'] is not None else "      -"
+    print(f"  {report['entry_point']:<13} Items: {report['items']:>7}  Time: {report['seconds']:7.2f}s  "
+          f"Rate: {report['items_per_second'] or 0:9.1f}/s  Airtable: {airtable['requests']:>5} req "
+          f"p50 {airtable['latency_ms'].get('p50', 0):6.1f}ms p99 {airtable['latency_ms'].get('p99', 0):6.1f}ms  "
+          f"LLM: {report['chat']['requests']:>4} req  Peak: {memory_text}")
+    throttled = airtable['by_status'].get(429, 0)
+    if throttled:
+        print(f"  {'':<13} ⚠️  {throttled} Airtable requests answered 429")
+    if report['error']:
+        print(f"  {'':<13} ❌ {report['error']}")
+
+def main():
+    """Benchmark every entry point against the fake servers"""
+    parser = argparse.ArgumentParser(description="Benchmark the playtest tools offline against fake Airtable and OpenAI servers")
+    parser.add_argument('--players', type=int, default=2000, help="Users in the synthetic base")
+    parser.add_argument('--games', type=int, default=500, help="Active YSWS records in the synthetic base")
+    parser.add_argument('--tickets', type=int, default=5000, help="Playtest tickets in the synthetic base")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the base, the assignment and the fake servers")
+    parser.add_argument('--entry-points', nargs='+', choices=ENTRY_POINTS, default=list(ENTRY_POINTS),
+                        help="Entry points to benchmark, in order")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Fake Airtable latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="Extra random latency per request (0..jitter)")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Fraction of Airtable writes answered 429 (0-1)")
+    parser.add_argument('--chat-latency-ms', type=float, default=300.0, help="Fake OpenAI latency per request")
+    parser.add_argument('--no-memory', action='store_true', help="Don't trace peak memory (tracing slows runs down)")
+    parser.add_argument('--keep-files', action='store_true', help="Keep each entry point's working directory")
+    parser.add_argument('--verbose', action='store_true', help="Show the tools' own output")
+    parser.add_argument('--json', metavar='FILE', help="Also write every report to this JSON file")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    airtable = FakeAirtable(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                            seed=args.seed).start()
+    chat = FakeChat(latency_ms=args.chat_latency_ms, seed=args.seed).start()
+
+    # Set before any tool is imported: the tools and openai read these at import time
+    os.environ.update({
+        'AIRTABLE_API_KEY': 'keyBenchmark',
+        'AIRTABLE_BASE_ID': airtable.base_id,
+        'AIRTABLE_API_BASE': airtable.api_base,
+        'AIRTABLE_RATE_LIMIT_BACKOFF_SECONDS': '1',
+        'OPENAI': 'sk-benchmark',
+        'OPENAI_API_BASE': chat.api_base
+    })
+
+    print("⏱️  Pipeline Benchmark")
+    print(f"  Players: {args.players}  Games: {args.games}  Tickets: {args.tickets}  Seed: {args.seed}")
+    print(f"  Airtable latency: {args.latency_ms:.0f}ms (+{args.jitter_ms:.0f}ms jitter)  "
+          f"429 rate: {args.error_rate:.0%}  LLM latency: {args.chat_latency_ms:.0f}ms")
+    print("=" * 60)
+
+    dataset = generate_dataset(args.players, args.games, args.tickets, seed=args.seed)
+    runs = entry_point_runs(dataset, seed=args.seed)
+    work_dir = tempfile.mkdtemp(prefix='playtest_benchmark_')
+    reports = []
+    try:
+        for name in args.entry_points:
+            setup, run, items = runs[name]
+            report = run_entry_point(name, setup, run, items, airtable, chat, dataset, work_dir,
+                                     measure_memory=not args.no_memory, verbose=args.verbose)
+            print_report(report)
+            reports.append(report)
+    finally:
+        airtable.stop()
+        chat.stop()
+        if args.keep_files:
+            print(f"\n📁 Working files kept in: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n💾 Saved reports to: {json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Per-recipient challenge status counts, kept up to date incrementally
+Only recipientEmail and Status are fetched, and after the first full load only
+challenges modified since the last sync are, so limit checks don't rescan the table
+"""
+
+import json
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from http_session import get_session
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Environment Variables
+AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
+AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
+
+# Airtable configuration
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
+CHALLENGES_TABLE = 'Challenges'
+
+CHALLENGE_COUNTS_FILE = os.getenv("CHALLENGE_COUNTS_FILE", "challenge_counts.json")
+
+# Incremental syncs can't see deleted challenges, so reload everything this often
+FULL_REFRESH_HOURS = 24
+
+# Overlap between syncs, in case Airtable's clock and ours disagree
+SYNC_OVERLAP_SECONDS = 120
+
+def airtable_request(path, options=None):
+    """Make a request to the Airtable API"""
+    if options is None:
+        options = {}
+
+    url = f"{AIRTABLE_API_BASE}/{AIRTABLE_BASE_ID}/{path}"
+
+    headers = {
+        'Authorization': f'Bearer {AIRTABLE_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+
+    # Add any additional headers from options
+    if 'headers' in options:
+        headers.update(options['headers'])
+
+    response = get_session().request(
+        method=options.get('method', 'GET'),
+        url=url,
+        headers=headers,
+        json=options.get('json'),
+        params=options.get('params')
+    )
+
+    if not response.ok:
+        raise Exception(f"Airtable error {response.status_code}: {response.text}")
+
+    return response.json()
+
+class ChallengeStatusStore:
+    """recipientEmail -> Status -> count, persisted between runs and refreshed by LAST_MODIFIED_TIME()
+
+    Each challenge's (recipientEmail, Status) is kept by record ID, so a status that
+    changed since the last sync moves its count instead of adding a second one.
+    """
+
+    def __init__(self, path=CHALLENGE_COUNTS_FILE):
+        self.path = path
+        self.records = {}  # record_id -> [recipientEmail, Status]
+        self.counts = defaultdict(Counter)
+        self.last_sync = None
+        self.last_full_sync = None
+
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                self.records = data.get('records', {})
+                self.last_sync = data.get('last_sync')
+                self.last_full_sync = data.get('last_full_sync')
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"  Warning: could not read challenge counts from {path}: {e}")
+
+        for recipient_email, status in self.records.values():
+            self.counts[recipient_email][status] += 1
+
+    def _set(self, record_id, recipient_email, status):
+        previous = self.records.get(record_id)
+        if previous:
+            self.counts[previous[0]][previous[1]] -= 1
+        self.records[record_id] = [recipient_email, status]
+        self.counts[recipient_email][status] += 1
+
+    def _needs_full_refresh(self):
+        if not self.last_sync or not self.last_full_sync:
+            return True
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(self.last_full_sync)
+        return age > timedelta(hours=FULL_REFRESH_HOURS)
+
+    def refresh(self, full=False):
+        """Fetch challenges changed since the last sync (or all of them when due)
+
+        Returns:
+            int: Challenge records fetched
+        """
+        full = full or self._needs_full_refresh()
+        sync_started = datetime.now(timezone.utc)
+
+        params = {'pageSize': 100, 'fields[]': ['recipientEmail', 'Status']}
+        if not full:
+            since = datetime.fromisoformat(self.last_sync) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            params['filterByFormula'] = (
+                f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since.strftime('%Y-%m-%dT%H:%M:%S.000Z')}'))"
+            )
+
+        fetched = {}
+        offset = None
+        while True:
+            if offset:
+                params['offset'] = offset
+            page = airtable_request(CHALLENGES_TABLE, {'method': 'GET', 'params': params})
+
+            for record in page.get('records', []):
+                fields = record.get('fields', {})
+                fetched[record['id']] = (fields.get('recipientEmail', 'Unknown'), fields.get('Status', 'Unknown'))
+
+            offset = page.get('offset')
+            if not offset:
+                break
+
+        if full:
+            self.records = {}
+            self.counts = defaultdict(Counter)
+            self.last_full_sync = sync_started.isoformat()
+        for record_id, (recipient_email, status) in fetched.items():
+            self._set(record_id, recipient_email, status)
+
+        self.last_sync = sync_started.isoformat()
+        self.save()
+
+        kind = "full" if full else "incremental"
+        print(f"📊 Challenge counts refreshed ({kind}): {len(fetched)} fetched, {len(self.records)} tracked")
+        return len(fetched)
+
+    def record_created(self, record_id, recipient_email, status='Not Submitted'):
+        """Count a challenge this run just created, without refetching"""
+        self._set(record_id, recipient_email, status)
+
+    def count(self, recipient_email, status='Not Submitted'):
+        return self.counts.get(recipient_email, Counter())[status]
+
+    def can_receive(self, recipient_email, max_not_submitted):
+        """Check if a recipient is still under the 'Not Submitted' limit"""
+        return self.count(recipient_email) < max_not_submitted
+
+    def users_at_limit(self, max_not_submitted):
+        """Recipients with at least max_not_submitted 'Not Submitted' challenges"""
+        return {email for email, counts in self.counts.items() if counts['Not Submitted'] >= max_not_submitted}
+
+    def status_totals(self):
+        """Challenge count per status across every recipient"""
+        totals = Counter()
+        for counts in self.counts.values():
+            totals.update(counts)
+        return totals
+
+    def user_status_counts(self):
+        """recipientEmail -> {status: count}, without statuses whose count dropped to zero"""
+        return {email: {status: count for status, count in counts.items() if count}
+                for email, counts in self.counts.items() if any(counts.values())}
+
+    def save(self):
+        """Write the store atomically"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_sync': self.last_sync,
+                'last_full_sync': self.last_full_sync,
+                'records': self.records
+            }, f)
+        os.replace(tmp_path, self.path)
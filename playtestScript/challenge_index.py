@@ -0,0 +1,116 @@
+"""
+Local similarity index for generated challenges
+Embeds challenges as sparse hashed word and character n-gram vectors and compares them
+with NumPy cosine similarity, so near-duplicates are caught without an external service
+"""
+
+import re
+import threading
+import zlib
+from collections import Counter
+import numpy as np
+
+VECTOR_DIMENSIONS = 4096
+DUPLICATE_THRESHOLD = 0.75
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def challenge_features(text):
+    """Words, word pairs and character 3-grams of a challenge"""
+    words = WORD_PATTERN.findall(text.lower())
+    features = list(words)
+    features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+    joined = f" {' '.join(words)} "
+    features.extend(joined[i:i + 3] for i in range(len(joined) - 2))
+    return features
+
+def embed(text, dimensions=VECTOR_DIMENSIONS):
+    """Unit-length hashed feature vector as sparse (indices, values) arrays
+
+    Only the buckets a challenge hits are stored (a few hundred, not `dimensions`);
+    crc32 keeps the buckets stable across processes.
+    """
+    counts = Counter(zlib.crc32(feature.encode('utf-8')) % dimensions for feature in challenge_features(text))
+    indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    norm = np.linalg.norm(values)
+    return indices, (values / norm if norm else values)
+
+class ChallengeIndex:
+    """Per-game sparse challenge vectors for near-duplicate checks
+
+    Adding a challenge only appends its sparse vector to the game's list. The list is
+    concatenated into flat row/index/value arrays the next time the game is queried, and
+    kept until the game gets another challenge, so checking a new challenge is a single
+    vectorized pass over that game's challenges.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD, dimensions=VECTOR_DIMENSIONS):
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self.vectors = {}  # game_id -> sparse (indices, values) vectors
+        self.stacked = {}  # game_id -> (rows, indices, values), dropped when the game changes
+        self.texts = {}    # game_id -> challenge texts, in vector order
+        self.lock = threading.Lock()
+        self.stats = {'checked': 0, 'duplicates': 0}
+
+    def __len__(self):
+        return sum(len(texts) for texts in self.texts.values())
+
+    def clear(self):
+        """Drop every indexed challenge (before reloading them from Airtable)"""
+        with self.lock:
+            self.vectors = {}
+            self.stacked = {}
+            self.texts = {}
+
+    def add(self, game_id, text):
+        """Add a challenge to a game's index"""
+        vector = embed(text, self.dimensions)
+        with self.lock:
+            self.vectors.setdefault(game_id, []).append(vector)
+            self.texts.setdefault(game_id, []).append(text)
+            self.stacked.pop(game_id, None)
+
+    def _stack(self, game_id):
+        """Flat (rows, indices, values) arrays of a game's vectors, built once per change"""
+        stacked = self.stacked.get(game_id)
+        if stacked is None:
+            vectors = self.vectors[game_id]
+            rows = np.repeat(np.arange(len(vectors)), [len(indices) for indices, _ in vectors])
+            stacked = (rows,
+                       np.concatenate([indices for indices, _ in vectors]),
+                       np.concatenate([values for _, values in vectors]))
+            self.stacked[game_id] = stacked
+        return stacked
+
+    def most_similar(self, game_id, text):
+        """Get (challenge, similarity) of the game's closest challenge, or (None, 0.0)"""
+        with self.lock:
+            if game_id not in self.vectors:
+                return None, 0.0
+            rows, indices, values = self._stack(game_id)
+            texts = self.texts[game_id]
+
+        query = np.zeros(self.dimensions, dtype=np.float32)
+        query_indices, query_values = embed(text, self.dimensions)
+        query[query_indices] = query_values
+        similarities = np.bincount(rows, weights=query[indices] * values, minlength=len(texts))
+        best = int(np.argmax(similarities))
+        return texts[best], float(similarities[best])
+
+    def find_duplicate(self, game_id, text):
+        """Get the game's challenge that `text` nearly duplicates, or None"""
+        match, similarity = self.most_similar(game_id, text)
+        duplicate = match is not None and similarity >= self.threshold
+        with self.lock:
+            self.stats['checked'] += 1
+            if duplicate:
+                self.stats['duplicates'] += 1
+        return match if duplicate else None
+
+    def print_stats(self):
+        """Print how many challenges were checked and rejected as near-duplicates"""
+        print(f"\n🧭 Challenge Similarity Index (threshold {self.threshold}):")
+        print(f"  Indexed: {len(self)} challenges across {len(self.texts)} games")
+        print(f"  Checked: {self.stats['checked']}  Near-duplicates rejected: {self.stats['duplicates']}")
@@ -0,0 +1,276 @@
+"""
+Rate-limited, cached OpenAI chat completions for challenge generation
+Lets several threads share one request and token budget, retries calls the API
+rejects for being rate limited or temporarily unavailable, and keeps replies on
+disk so reruns never pay for the same prompt twice
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import openai
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+# Account rate limits (they depend on the OpenAI usage tier)
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500))
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 60000))
+MAX_CONCURRENT_REQUESTS = 4
+
+# On-disk response cache
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+LLM_CACHE_TTL_DAYS = 30
+LLM_CACHE_MAX_MB = 50
+
+# USD per 1K tokens (prompt, completion), used to report what the cache saved
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+# Errors worth retrying; anything else (bad request, auth) fails right away
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,
+    openai.error.Timeout,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+)
+
+def estimate_tokens(text):
+    """Rough token count for rate limiting (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+class PerMinuteLimiter:
+    """Thread-safe token bucket refilled continuously at `per_minute` units a minute"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Block until `amount` units are available, then take them"""
+        # A single request bigger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.per_minute)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.per_minute,
+                                     self.available + (now - self.updated) * self.per_minute / 60.0)
+                self.updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) * 60.0 / self.per_minute
+            time.sleep(wait)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server answered 429"""
+        with self.lock:
+            self.available = 0.0
+            self.updated = time.monotonic()
+
+def usage_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of a call (0 for models without a known price)"""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0, 0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+class ResponseCache:
+    """Chat replies stored one JSON file per request hash, with TTL and size-based eviction
+
+    Entries older than ttl_days are ignored and removed. When the cache is opened
+    and the directory is over max_mb, the least recently used entries are removed first.
+    """
+
+    def __init__(self, path=LLM_CACHE_DIR, ttl_days=LLM_CACHE_TTL_DAYS, max_mb=LLM_CACHE_MAX_MB):
+        self.path = path
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.max_bytes = max_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0, 'saved_tokens': 0, 'saved_cost': 0.0}
+        self.evict()
+
+    @staticmethod
+    def key(model, prompt_version, messages, temperature, max_tokens):
+        """Hash everything that shapes the reply (the messages hold feedback, scores and existing challenges)"""
+        payload = json.dumps([model, prompt_version, messages, temperature, max_tokens], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key):
+        """Get a cached entry, or None when missing or expired"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+
+        if time.time() - entry.get('created', 0) > self.ttl_seconds:
+            self._remove(entry_path)
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+
+        # Touch the file so size eviction drops the least recently used entries first
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        with self.lock:
+            self.stats['hits'] += 1
+            self.stats['saved_tokens'] += entry.get('prompt_tokens', 0) + entry.get('completion_tokens', 0)
+            self.stats['saved_cost'] += usage_cost(entry.get('model'), entry.get('prompt_tokens', 0),
+                                                   entry.get('completion_tokens', 0))
+        return entry
+
+    def put(self, key, model, content, prompt_tokens=0, completion_tokens=0):
+        """Store a reply (written atomically, so a crash never leaves half an entry)"""
+        entry = {
+            'created': time.time(),
+            'model': model,
+            'content': content,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens
+        }
+        os.makedirs(self.path, exist_ok=True)
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+
+    def _remove(self, entry_path):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            return
+        with self.lock:
+            self.stats['evicted'] += 1
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones until under max_mb"""
+        if not os.path.isdir(self.path):
+            return
+
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.json'):
+                continue
+            stat = entry.stat()
+            # mtime is the last write or hit, so an entry untouched for ttl_days has certainly expired
+            if now - stat.st_mtime > self.ttl_seconds:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(entry_path)
+            total_bytes -= size
+
+    def print_stats(self):
+        """Print hit/miss counts and what the hits saved"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / lookups * 100 if lookups else 0
+        print(f"\n💾 LLM Cache ({self.path}):")
+        print(f"  Hits: {self.stats['hits']}  Misses: {self.stats['misses']}  Hit rate: {hit_rate:.1f}%")
+        print(f"  Saved: {self.stats['saved_tokens']} tokens (~${self.stats['saved_cost']:.4f})")
+        if self.stats['evicted']:
+            print(f"  Evicted: {self.stats['evicted']} entries")
+
+class ChatClient:
+    """Chat completions with bounded concurrency, request/token rate limits, retries and an optional cache"""
+
+    def __init__(self, model=DEFAULT_MODEL, max_concurrent=MAX_CONCURRENT_REQUESTS,
+                 requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE, max_retries=5,
+                 cache=None):
+        self.model = model
+        self.cache = cache
+        self.max_retries = max_retries
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.request_limiter = PerMinuteLimiter(requests_per_minute)
+        self.token_limiter = PerMinuteLimiter(tokens_per_minute)
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def _count(self, **amounts):
+        with self.stats_lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+    def complete(self, messages, max_tokens=200, temperature=0.7, prompt_version=None):
+        """Send one chat completion and return the reply text
+
+        With a cache, an identical request (same model, prompt_version, messages,
+        temperature and max_tokens) is answered from disk instead of the API.
+        Raises the last OpenAI error once retries are used up.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key(self.model, prompt_version, messages, temperature, max_tokens)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                return entry['content']
+
+        prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+
+        for attempt in range(self.max_retries + 1):
+            self.request_limiter.acquire()
+            self.token_limiter.acquire(prompt_tokens + max_tokens)
+
+            try:
+                with self.slots:
+                    self._count(requests=1)
+                    response = openai.ChatCompletion.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    )
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self._count(failures=1)
+                    raise
+                if isinstance(e, openai.error.RateLimitError):
+                    # Everyone backs off, not just this thread
+                    self.request_limiter.drain()
+                delay = min(60, 2 ** attempt) + random.uniform(0, 1)
+                print(f"   🔁 OpenAI {type(e).__name__}, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                self._count(retries=1)
+                time.sleep(delay)
+                continue
+            except Exception:
+                self._count(failures=1)
+                raise
+
+            usage = response.get('usage', {})
+            self._count(prompt_tokens=usage.get('prompt_tokens', 0),
+                        completion_tokens=usage.get('completion_tokens', 0))
+            content = response.choices[0].message.content.strip()
+
+            if cache_key is not None:
+                self.cache.put(cache_key, self.model, content, usage.get('prompt_tokens', 0),
+                               usage.get('completion_tokens', 0))
+            return content
+
+    def print_stats(self):
+        """Print request, retry and token totals for the run"""
+        print(f"\n🤖 OpenAI Usage:")
+        print(f"  Requests: {self.stats['requests']} ({self.stats['retries']} retries, "
+              f"{self.stats['failures']} failed)")
+        print(f"  Tokens: {self.stats['prompt_tokens']} prompt + {self.stats['completion_tokens']} completion "
+              f"(~${usage_cost(self.model, self.stats['prompt_tokens'], self.stats['completion_tokens']):.4f})")
+        if self.cache is not None:
+            self.cache.print_stats()
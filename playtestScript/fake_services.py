@@ -0,0 +1,364 @@
+"""
+Local stand-ins for Airtable and the OpenAI chat API, for offline benchmarks
+FakeAirtable serves in-memory tables with Airtable's paging, 10-record batch writes,
+upserts, the filter formulas these scripts use, injected latency and 429s; FakeChat
+answers chat completions deterministically from a hash of the prompt
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+MAX_RECORDS_PER_REQUEST = 10
+MAX_PAGE_SIZE = 100
+
+def percentiles_ms(seconds, percentiles=(50, 90, 99)):
+    """Latency percentiles in milliseconds ({} when there are no samples)"""
+    if not seconds:
+        return {}
+    values = np.percentile(np.asarray(seconds) * 1000, percentiles)
+    return {f"p{p}": round(float(value), 2) for p, value in zip(percentiles, values)}
+
+class RequestLog:
+    """Thread-safe record of every request a fake service answered"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []  # (kind, status, seconds)
+
+    def record(self, kind, status, seconds):
+        with self.lock:
+            self.entries.append((kind, status, seconds))
+
+    def reset(self):
+        with self.lock:
+            self.entries = []
+
+    def summary(self):
+        """Request counts by kind and status, and latency percentiles"""
+        with self.lock:
+            entries = list(self.entries)
+        return {
+            'requests': len(entries),
+            'by_kind': dict(Counter(kind for kind, _, _ in entries)),
+            'by_status': dict(Counter(status for _, status, _ in entries)),
+            'latency_ms': percentiles_ms([seconds for _, _, seconds in entries])
+        }
+
+class FakeService:
+    """Serves handle(method, path, query, body) from a ThreadingHTTPServer on a background thread
+
+    Args:
+        latency_ms (float): Delay added to every response
+        jitter_ms (float): Extra uniformly random delay (0..jitter_ms) per response
+        error_rate (float): Fraction of requests answered with 429 (see error_methods)
+        error_methods (tuple): HTTP methods that may get an injected 429
+        seed (int): Seed for the jitter and 429 draws
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_methods=('POST', 'PATCH', 'DELETE'),
+                 seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_methods = error_methods
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.log = RequestLog()
+        self.server = None
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                started = time.perf_counter()
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                url = urlsplit(self.path)
+                status, payload, kind = service.dispatch(self.command, unquote(url.path), parse_qs(url.query), body)
+
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                service.log.record(kind, status, time.perf_counter() - started)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _serve
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def dispatch(self, method, path, query, body):
+        """Apply latency and 429 injection, then handle()"""
+        with self.rng_lock:
+            delay = self.latency_ms + self.rng.random() * self.jitter_ms
+            throttle = method in self.error_methods and self.rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay / 1000)
+        if throttle:
+            return 429, {'error': {'type': 'RATE_LIMIT_REACHED', 'message': 'Injected rate limit'}}, f"{method} 429"
+        return self.handle(method, path, query, body)
+
+    def handle(self, method, path, query, body):
+        raise NotImplementedError
+
+class FakeAirtable(FakeService):
+    """In-memory Airtable base at {url}/v0/{base_id}/{table}
+
+    Supports listing with pageSize/offset/fields[]/filterByFormula, batch create (POST),
+    update and performUpsert (PATCH) and delete (DELETE with records[]), each limited to
+    10 records per request. Formulas other than OR({field} = '...', ...) and
+    IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('...')) get a 422, as a typo would.
+    """
+
+    def __init__(self, base_id='appBenchmark', **kwargs):
+        super().__init__(**kwargs)
+        self.base_id = base_id
+        self.tables = {}  # table -> record_id -> record
+        self.modified = {}  # record_id -> last modified time
+        self.field_names = defaultdict(set)  # table -> every field name seen, for UNKNOWN_FIELD_NAME
+        self.lock = threading.Lock()
+        self.next_id = 0
+
+    @property
+    def api_base(self):
+        """Value for AIRTABLE_API_BASE"""
+        return f"{self.url}/v0"
+
+    def _new_record(self, table, fields, record_id=None, created_time=None):
+        self.next_id += 1
+        self.field_names[table].update(fields)
+        record = {
+            'id': record_id or f"rec{self.next_id:014d}",
+            'createdTime': created_time or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'fields': dict(fields)
+        }
+        self.modified[record['id']] = datetime.now(timezone.utc)
+        return record
+
+    def load(self, table, records):
+        """Add records (raw Airtable dicts with 'fields', optionally 'id' and 'createdTime') without HTTP"""
+        with self.lock:
+            rows = self.tables.setdefault(table, {})
+            for record in records:
+                new = self._new_record(table, record.get('fields', {}), record.get('id'), record.get('createdTime'))
+                rows[new['id']] = new
+
+    def touch(self, table, record_id, fields):
+        """Change a record's fields and its LAST_MODIFIED_TIME(), as an edit in the UI would"""
+        with self.lock:
+            self.tables[table][record_id]['fields'].update(fields)
+            self.field_names[table].update(fields)
+            self.modified[record_id] = datetime.now(timezone.utc)
+
+    def clear(self):
+        """Drop every table and reset the request log"""
+        with self.lock:
+            self.tables = {}
+            self.modified = {}
+            self.field_names = defaultdict(set)
+        self.log.reset()
+
+    def records(self, table):
+        with self.lock:
+            return [dict(record, fields=dict(record['fields'])) for record in self.tables.get(table, {}).values()]
+
+    def _formula(self, formula):
+        """Predicate for the supported filterByFormula expressions"""
+        since = re.fullmatch(r"IS_AFTER\(LAST_MODIFIED_TIME\(\), DATETIME_PARSE\('([^']+)'\)\)", formula)
+        if since:
+            after = datetime.strptime(since.group(1), '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+            return lambda record: self.modified[record['id']] > after
+
+        any_of = re.fullmatch(r"OR\((.*)\)", formula, re.S)
+        if any_of:
+            conditions = [(field, value.replace("\\'", "'"))
+                          for field, value in re.findall(r"\{([^}]+)\} = '((?:[^'\\]|\\.)*)'", any_of.group(1))]
+            if conditions:
+                return lambda record: any(record['fields'].get(field) == value for field, value in conditions)
+
+        raise ValueError(formula)
+
+    def handle(self, method, path, query, body):
+        parts = path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'v0' or parts[1] != self.base_id:
+            return 404, {'error': 'NOT_FOUND'}, f"{method} 404"
+        table = parts[2]
+
+        with self.lock:
+            rows = self.tables.setdefault(table, {})
+            if method == 'GET':
+                return self._list(table, rows, query)
+            if method == 'DELETE':
+                return self._delete(rows, query.get('records[]', []))
+
+            records = (body or {}).get('records', [])
+            if len(records) > MAX_RECORDS_PER_REQUEST:
+                return 422, {'error': {'type': 'INVALID_RECORDS',
+                                       'message': f"At most {MAX_RECORDS_PER_REQUEST} records per request"}}, \
+                    f"{method} 422"
+            if method == 'POST':
+                created = [self._new_record(table, record.get('fields', {})) for record in records]
+                rows.update((record['id'], record) for record in created)
+                return 200, {'records': created}, "POST batch"
+            if method == 'PATCH':
+                return self._update(table, rows, records, (body or {}).get('performUpsert'))
+
+        return 405, {'error': 'METHOD_NOT_ALLOWED'}, f"{method} 405"
+
+    def _list(self, table, rows, query):
+        page_size = min(int(query.get('pageSize', [MAX_PAGE_SIZE])[0]), MAX_PAGE_SIZE)
+        offset = int(query.get('offset', [0])[0])
+        fields = query.get('fields[]')
+
+        matching = list(rows.values())
+        if 'filterByFormula' in query:
+            try:
+                predicate = self._formula(query['filterByFormula'][0])
+            except ValueError:
+                return 422, {'error': {'type': 'INVALID_FILTER_BY_FORMULA',
+                                       'message': 'The formula for filtering records is invalid'}}, "GET 422"
+            matching = [record for record in matching if predicate(record)]
+
+        page = matching[offset:offset + page_size]
+        if fields:
+            unknown = [name for name in fields if name not in self.field_names[table]]
+            if unknown and rows:
+                return 422, {'error': {'type': 'UNKNOWN_FIELD_NAME',
+                                       'message': f'Unknown field name: "{unknown[0]}"'}}, "GET 422"
+            page = [dict(record, fields={name: value for name, value in record['fields'].items() if name in fields})
+                    for record in page]
+
+        payload = {'records': page}
+        if offset + page_size < len(matching):
+            payload['offset'] = str(offset + page_size)
+        return 200, payload, "GET page"
+
+    def _update(self, table, rows, records, upsert):
+        updated = []
+        created_ids = []
+        merge_on = (upsert or {}).get('fieldsToMergeOn')
+        index = {}
+        if merge_on:
+            index = {tuple(record['fields'].get(field) for field in merge_on): record for record in rows.values()}
+
+        for record in records:
+            existing = None
+            if merge_on:
+                existing = index.get(tuple(record.get('fields', {}).get(field) for field in merge_on))
+            elif record.get('id') in rows:
+                existing = rows[record['id']]
+            elif record.get('id'):
+                return 404, {'error': {'type': 'MODEL_ID_NOT_FOUND'}}, "PATCH 404"
+
+            if existing is None:
+                existing = self._new_record(table, record.get('fields', {}))
+                rows[existing['id']] = existing
+                created_ids.append(existing['id'])
+            else:
+                existing['fields'].update(record.get('fields', {}))
+                self.field_names[table].update(record.get('fields', {}))
+                self.modified[existing['id']] = datetime.now(timezone.utc)
+            updated.append(existing)
+
+        payload = {'records': updated}
+        if merge_on:
+            payload['createdRecords'] = created_ids
+            payload['updatedRecords'] = [record['id'] for record in updated if record['id'] not in created_ids]
+        return 200, payload, "PATCH batch"
+
+    def _delete(self, rows, record_ids):
+        if len(record_ids) > MAX_RECORDS_PER_REQUEST:
+            return 422, {'error': {'type': 'INVALID_RECORDS'}}, "DELETE 422"
+        missing = [record_id for record_id in record_ids if record_id not in rows]
+        if missing:
+            return 404, {'error': {'type': 'MODEL_ID_NOT_FOUND', 'message': missing[0]}}, "DELETE 404"
+        for record_id in record_ids:
+            del rows[record_id]
+        return 200, {'records': [{'id': record_id, 'deleted': True} for record_id in record_ids]}, "DELETE batch"
+
+# Building blocks of the fake challenges, combined by prompt hash
+CHALLENGE_ACTIONS = ['Add', 'Rework', 'Tighten', 'Show', 'Fix', 'Balance', 'Explain', 'Polish']
+CHALLENGE_TARGETS = [
+    'a checkpoint before the hardest section', 'the jump timing so landings feel fair',
+    'an on-screen hint for the controls', 'the collision on moving platforms', 'enemy difficulty in the first level',
+    'sound feedback when the player takes damage', 'a short tutorial for the main mechanic',
+    'the camera so it stays ahead of the player', 'a visible timer for timed levels', 'a restart button in the pause menu',
+]
+
+class FakeChat(FakeService):
+    """Deterministic /v1/chat/completions
+
+    The same prompt always gets the same reply. About no_challenge_rate of feedback gets
+    "No challenge found"; batched prompts (with "Playtest ID:" lines) get a JSON array.
+    """
+
+    def __init__(self, no_challenge_rate=0.3, **kwargs):
+        kwargs.setdefault('error_methods', ())
+        super().__init__(**kwargs)
+        self.no_challenge_rate = no_challenge_rate
+
+    @property
+    def api_base(self):
+        """Value for OPENAI_API_BASE"""
+        return f"{self.url}/v1"
+
+    def challenge_for(self, text):
+        digest = hashlib.sha256(text.encode('utf-8')).digest()
+        if digest[0] / 256 < self.no_challenge_rate:
+            return "No challenge found"
+        return f"{CHALLENGE_ACTIONS[digest[1] % len(CHALLENGE_ACTIONS)]} {CHALLENGE_TARGETS[digest[2] % len(CHALLENGE_TARGETS)]}"
+
+    def handle(self, method, path, query, body):
+        if method != 'POST' or not path.endswith('/chat/completions'):
+            return 404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}}, f"{method} 404"
+
+        prompt = body['messages'][-1]['content']
+        playtest_sections = re.split(r"^Playtest ID: (\S+)$", prompt, flags=re.M)
+        if len(playtest_sections) > 1:
+            ids = playtest_sections[1::2]
+            content = json.dumps([{'playtest_id': playtest_id, 'challenge': self.challenge_for(section)}
+                                  for playtest_id, section in zip(ids, playtest_sections[2::2])])
+        else:
+            content = self.challenge_for(prompt)
+
+        prompt_tokens = sum(len(message['content']) for message in body['messages']) // 4
+        completion_tokens = len(content) // 4
+        return 200, {
+            'id': f"chatcmpl-{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens}
+        }, "POST completion"
@@ -0,0 +1,168 @@
+"""
+Local actionability check for playtest feedback
+Predicts whether feedback is specific enough to become a challenge, so feedback
+like "fun game!" can skip the OpenAI call that would only answer "No challenge found"
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+# Every LLM outcome (feedback, challenge found or not) is appended here to train the model
+FEEDBACK_OUTCOMES_FILE = os.getenv("FEEDBACK_OUTCOMES_FILE", "feedback_outcomes.jsonl")
+
+# Feedback below this predicted probability of being actionable skips the LLM
+SKIP_THRESHOLD = 0.2
+
+# The bag-of-words model is only used once it has seen this many outcomes of each kind
+MIN_TRAINING_OUTCOMES = 25
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Words that tend to come with something concrete to fix or add
+ACTIONABLE_WORDS = {
+    'bug', 'bugs', 'glitch', 'crash', 'crashed', 'crashes', 'broken', 'stuck', 'fix', 'fell', 'falls',
+    'add', 'adding', 'should', 'could', 'would', 'wish', 'needs', 'need', 'missing', 'maybe', 'instead',
+    'hard', 'difficult', 'easy', 'confusing', 'confused', 'unclear', 'slow', 'fast', 'laggy', 'lag',
+    'controls', 'control', 'jump', 'jumping', 'movement', 'camera', 'collision', 'hitbox', 'level', 'levels',
+    'enemy', 'enemies', 'boss', 'sound', 'sounds', 'music', 'audio', 'volume', 'loud', 'quiet',
+    'tutorial', 'instructions', 'menu', 'ui', 'button', 'score', 'checkpoint', 'health', 'timer',
+    'feedback', 'animation', 'animations', 'sprite', 'sprites', 'text', 'font', 'restart', 'respawn',
+    'but', 'except', 'though', 'however', 'more', 'less', 'too', 'not', "didn't", "couldn't", "wasn't",
+}
+
+# Words of plain praise that alone never lead to a challenge
+GENERIC_WORDS = {
+    'fun', 'great', 'good', 'nice', 'cool', 'awesome', 'amazing', 'love', 'loved', 'liked', 'like',
+    'enjoyed', 'fantastic', 'excellent', 'perfect', 'wow', 'gg', 'ok', 'okay', 'fine', 'neat',
+}
+
+def tokenize(text):
+    """Lowercase words and numbers in a piece of feedback"""
+    return WORD_PATTERN.findall(text.lower())
+
+def heuristic_score(feedback):
+    """Rule-based probability (0-1) that feedback holds an actionable suggestion
+
+    Longer feedback and words about bugs, controls, difficulty or missing features
+    raise the score; short praise-only feedback drops it to zero.
+    """
+    words = tokenize(feedback)
+    if not words:
+        return 0.0
+
+    actionable = sum(1 for word in words if word in ACTIONABLE_WORDS)
+    generic = sum(1 for word in words if word in GENERIC_WORDS)
+
+    score = 0.15 + 0.45 * min(len(words), 40) / 40 + 0.15 * min(actionable, 3)
+    if not actionable and generic and len(words) <= 8:
+        score -= 0.4
+    return max(0.0, min(1.0, score))
+
+def is_no_challenge(challenge):
+    """Check if a model reply is too generic or says there is no challenge (the outcome the filter learns)"""
+    return (challenge.lower().startswith("no challenge") or
+            challenge.lower().startswith("no specific") or
+            len(challenge) < 20 or
+            "no challenge found" in challenge.lower())
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over feedback words, trained on past LLM outcomes"""
+
+    def __init__(self, outcomes):
+        self.word_counts = {True: Counter(), False: Counter()}
+        self.doc_counts = {True: 0, False: 0}
+
+        for feedback, actionable in outcomes:
+            self.word_counts[actionable].update(tokenize(feedback))
+            self.doc_counts[actionable] += 1
+
+        self.vocabulary = set(self.word_counts[True]) | set(self.word_counts[False])
+        self.totals = {label: sum(counts.values()) for label, counts in self.word_counts.items()}
+
+    def is_trained(self):
+        return min(self.doc_counts.values()) >= MIN_TRAINING_OUTCOMES
+
+    def probability(self, feedback):
+        """Probability that feedback is actionable, with add-one smoothing"""
+        log_scores = {}
+        total_docs = sum(self.doc_counts.values())
+        for label in (True, False):
+            log_score = math.log(self.doc_counts[label] / total_docs)
+            denominator = self.totals[label] + len(self.vocabulary)
+            for word in tokenize(feedback):
+                if word in self.vocabulary:
+                    log_score += math.log((self.word_counts[label][word] + 1) / denominator)
+            log_scores[label] = log_score
+
+        # Normalize in log space so long feedback doesn't underflow
+        top = max(log_scores.values())
+        actionable = math.exp(log_scores[True] - top)
+        return actionable / (actionable + math.exp(log_scores[False] - top))
+
+class ActionabilityFilter:
+    """Decides which feedback is worth an LLM call and records how the calls turned out
+
+    Uses heuristic_score alone until enough outcomes are recorded, then the average
+    of the heuristic and a NaiveBayesModel trained on those outcomes.
+    """
+
+    def __init__(self, threshold=SKIP_THRESHOLD, outcomes_file=FEEDBACK_OUTCOMES_FILE):
+        self.threshold = threshold
+        self.outcomes_file = outcomes_file
+        self.lock = threading.Lock()
+        self.stats = {'checked': 0, 'skipped': 0}
+        self.seen = set()
+
+        outcomes = []
+        if os.path.exists(outcomes_file):
+            with open(outcomes_file) as f:
+                for line in f:
+                    try:
+                        outcome = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    outcomes.append((outcome['feedback'], outcome['actionable']))
+                    self.seen.add(self._feedback_hash(outcome['feedback']))
+
+        self.model = NaiveBayesModel(outcomes)
+
+    @staticmethod
+    def _feedback_hash(feedback):
+        return hashlib.sha256(feedback.strip().lower().encode('utf-8')).hexdigest()
+
+    def probability(self, feedback):
+        """Predicted probability (0-1) that feedback leads to a challenge"""
+        score = heuristic_score(feedback)
+        if self.model.is_trained():
+            score = (score + self.model.probability(feedback)) / 2
+        return score
+
+    def should_skip(self, feedback):
+        """Check if feedback is confidently non-actionable and the LLM call can be skipped"""
+        skip = self.probability(feedback) < self.threshold
+        with self.lock:
+            self.stats['checked'] += 1
+            if skip:
+                self.stats['skipped'] += 1
+        return skip
+
+    def record(self, feedback, actionable):
+        """Append an LLM outcome for future training (each distinct feedback once)"""
+        feedback_hash = self._feedback_hash(feedback)
+        with self.lock:
+            if feedback_hash in self.seen:
+                return
+            self.seen.add(feedback_hash)
+            with open(self.outcomes_file, 'a') as f:
+                f.write(json.dumps({'feedback': feedback, 'actionable': actionable}) + "\n")
+
+    def print_stats(self):
+        """Print how many LLM calls the filter avoided"""
+        mode = "heuristic + bag-of-words" if self.model.is_trained() else "heuristic"
+        print(f"\n🧹 Feedback Pre-filter ({mode}, threshold {self.threshold}):")
+        print(f"  Checked: {self.stats['checked']}  LLM calls avoided: {self.stats['skipped']}")
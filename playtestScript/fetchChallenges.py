@@ -1,8 +1,13 @@
 import os
+import argparse
+import csv
+import json
+from collections import Counter, defaultdict
+from datetime import datetime
 from dotenv import load_dotenv
-import requests
-import time
-from collections import defaultdict
+
+from challenge_counts import ChallengeStatusStore
+from http_session import get_session
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,7 +17,7 @@ AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
 AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
 
 # Airtable configuration
-AIRTABLE_API_BASE = 'https://api.airtable.com/v0'
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
 CHALLENGES_TABLE = 'Challenges'
 
 def airtable_request(path, options=None):
@@ -31,7 +36,7 @@ def airtable_request(path, options=None):
     if 'headers' in options:
         headers.update(options['headers'])
     
-    response = requests.request(
+    response = get_session().request(
         method=options.get('method', 'GET'),
         url=url,
         headers=headers,
@@ -44,65 +49,83 @@ def airtable_request(path, options=None):
     
     return response.json()
 
-def fetch_all_challenges():
-    """Fetch all challenges in batches of 100"""
-    print("🔍 Fetching all challenges from Airtable...")
-    print("=" * 60)
-    
-    all_challenges = []
+def iter_challenges(params=None):
+    """Yield challenge records page by page, without holding the whole table"""
+    params = dict(params or {}, pageSize=100)
     offset = None
-    batch_count = 0
     
     while True:
-        batch_count += 1
-        params = {'pageSize': 100}
         if offset:
             params['offset'] = offset
-        
-        try:
-            print(f"📦 Fetching batch {batch_count} (100 records per batch)...")
-            page = airtable_request(f"{CHALLENGES_TABLE}?{requests.compat.urlencode(params)}", {
-                'method': 'GET'
-            })
-            
-            page_records = page.get('records', [])
-            all_challenges.extend(page_records)
-            offset = page.get('offset')
-            
-            print(f"   ✅ Fetched {len(page_records)} challenges in batch {batch_count}")
-            print(f"   📊 Total challenges so far: {len(all_challenges)}")
-            
-            if not offset:
-                break
-                
-            # Small delay to avoid rate limiting
-            time.sleep(0.1)
-                
-        except Exception as e:
-            print(f"❌ Error fetching batch {batch_count}: {e}")
+        page = airtable_request(CHALLENGES_TABLE, {'method': 'GET', 'params': params})
+        yield from page.get('records', [])
+        offset = page.get('offset')
+        if not offset:
             break
+
+def iter_challenges_for_users(emails):
+    """Yield the full challenge records of just these recipients"""
+    emails = sorted(emails)
+    
+    # Keep each filter formula (and so the request URL) reasonably short
+    for i in range(0, len(emails), 20):
+        email_group = emails[i:i + 20]
+        conditions = ", ".join("{recipientEmail} = '" + email.replace("'", "\\'") + "'" for email in email_group)
+        yield from iter_challenges({'filterByFormula': f"OR({conditions})"})
+
+def challenge_details(challenge):
+    """The fields of a challenge shown in the violation drill-down"""
+    fields = challenge.get('fields', {})
+    return {
+        'id': challenge.get('id'),
+        'challenge': fields.get('Challenge', 'No challenge text'),
+        'status': fields.get('Status', 'Unknown'),
+        'earnable_sss': fields.get('Earnable SSS', 0),
+        'sss_earned': fields.get('SSS Earned', 0),
+        'assigned_game': fields.get('AssignedGame', []),
+        'from_playtest': fields.get('FromPlaytest', []),
+        'created_time': fields.get('Created At', 'Unknown')
+    }
+
+def index_challenges_by_recipient(challenges):
+    """recipientEmail -> challenge details, built in one pass over (streamed) challenge records"""
+    index = defaultdict(list)
+    for challenge in challenges:
+        index[challenge.get('fields', {}).get('recipientEmail', 'Unknown')].append(challenge_details(challenge))
+    return index
+
+def audit_all_challenges(challenges, max_not_submitted=3):
+    """One pass over every challenge: per-recipient status counts, plus details for over-limit recipients
+    
+    Details are indexed for every recipient while streaming (whether they end up over the
+    limit is only known at the end), then everyone within the limit is dropped.
     
-    print(f"\n🎯 Fetch Complete:")
-    print(f"   Total batches: {batch_count}")
-    print(f"   Total challenges fetched: {len(all_challenges)}")
+    Returns:
+        tuple: (recipientEmail -> {status: count}, recipientEmail -> challenge details of violators)
+    """
+    user_status_counts = defaultdict(Counter)
+    index = defaultdict(list)
     
-    return all_challenges
+    for challenge in challenges:
+        details = challenge_details(challenge)
+        email = challenge.get('fields', {}).get('recipientEmail', 'Unknown')
+        user_status_counts[email][details['status']] += 1
+        index[email].append(details)
+    
+    for email, status_counts in user_status_counts.items():
+        if status_counts['Not Submitted'] <= max_not_submitted:
+            del index[email]
+    
+    return {email: dict(counts) for email, counts in user_status_counts.items()}, index
 
-def analyze_challenge_status_distribution(challenges):
+def analyze_challenge_status_distribution(user_status_counts):
     """Analyze the distribution of challenge statuses"""
     print("\n📊 Challenge Status Analysis")
     print("=" * 60)
     
-    status_counts = defaultdict(int)
-    user_status_counts = defaultdict(lambda: defaultdict(int))
-    
-    for challenge in challenges:
-        fields = challenge.get('fields', {})
-        status = fields.get('Status', 'Unknown')
-        recipient_email = fields.get('recipientEmail', 'Unknown')
-        
-        status_counts[status] += 1
-        user_status_counts[recipient_email][status] += 1
+    status_counts = Counter()
+    for counts in user_status_counts.values():
+        status_counts.update(counts)
     
     print("Overall Status Distribution:")
     for status, count in sorted(status_counts.items()):
@@ -110,7 +133,7 @@ def analyze_challenge_status_distribution(challenges):
     
     print(f"\nTotal challenges: {sum(status_counts.values())}")
     
-    return user_status_counts
+    return status_counts
 
 def check_user_challenge_limits(user_status_counts, max_not_submitted=3):
     """Check if any users have more than the allowed 'Not Submitted' challenges"""
@@ -154,37 +177,27 @@ def check_user_challenge_limits(user_status_counts, max_not_submitted=3):
     
     return violations, compliant_users
 
-def get_challenge_details_for_violations(violations, all_challenges):
-    """Get detailed information about challenges for users with violations"""
+def get_challenge_details_for_violations(violations, challenges_by_email):
+    """Print the challenges of users with violations
+    
+    Args:
+        violations (list): Violations from check_user_challenge_limits
+        challenges_by_email (dict): recipientEmail -> challenge details (index_challenges_by_recipient)
+    """
     if not violations:
         return
     
     print(f"\n📋 Detailed Challenge Information for Violations")
     print("=" * 60)
     
-    violation_emails = [v['email'] for v in violations]
-    
-    for email in violation_emails:
+    for violation in violations:
+        email = violation['email']
         print(f"\n👤 User: {email}")
         print("-" * 40)
         
-        user_challenges = []
-        for challenge in all_challenges:
-            fields = challenge.get('fields', {})
-            if fields.get('recipientEmail') == email:
-                user_challenges.append({
-                    'id': challenge.get('id'),
-                    'challenge': fields.get('Challenge', 'No challenge text'),
-                    'status': fields.get('Status', 'Unknown'),
-                    'earnable_sss': fields.get('Earnable SSS', 0),
-                    'sss_earned': fields.get('SSS Earned', 0),
-                    'assigned_game': fields.get('AssignedGame', []),
-                    'from_playtest': fields.get('FromPlaytest', []),
-                    'created_time': fields.get('Created At', 'Unknown')
-                })
-        
         # Sort by status (Not Submitted first) then by created time
-        user_challenges.sort(key=lambda x: (x['status'] != 'Not Submitted', x['created_time']))
+        user_challenges = sorted(challenges_by_email.get(email, []),
+                                 key=lambda x: (x['status'] != 'Not Submitted', x['created_time']))
         
         for i, challenge in enumerate(user_challenges, 1):
             print(f"   {i}. [{challenge['status']}] {challenge['challenge'][:60]}...")
@@ -195,44 +208,113 @@ def get_challenge_details_for_violations(violations, all_challenges):
                 print(f"      Game: {challenge['assigned_game']}")
             print()
 
-def main():
-    """Main function to fetch and analyze all challenges"""
+def build_audit_report(status_counts, violations, compliant_users, challenges_by_email, max_not_submitted):
+    """Audit results as one JSON-serializable dict for dashboards"""
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'max_not_submitted': max_not_submitted,
+        'total_challenges': sum(status_counts.values()),
+        'total_users': len(violations) + len(compliant_users),
+        'status_distribution': dict(status_counts),
+        'compliant_users': len(compliant_users),
+        'violations': [dict(violation, challenges=challenges_by_email.get(violation['email'], []))
+                       for violation in violations]
+    }
+
+def write_report_json(report, path):
+    """Write the audit report as JSON"""
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Audit report written to {path}")
+
+def write_violations_csv(report, path):
+    """Write one CSV row per challenge of every user over the limit"""
+    columns = ['email', 'not_submitted', 'total_challenges', 'id', 'status', 'challenge',
+               'earnable_sss', 'sss_earned', 'assigned_game', 'from_playtest', 'created_time']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for violation in report['violations']:
+            for challenge in violation['challenges']:
+                row = dict(challenge, email=violation['email'], not_submitted=violation['not_submitted'],
+                           total_challenges=violation['total_challenges'],
+                           assigned_game=";".join(challenge['assigned_game']),
+                           from_playtest=";".join(challenge['from_playtest']))
+                writer.writerow([row[column] for column in columns])
+    print(f"💾 Violation details written to {path}")
+
+def main(max_not_submitted=3, full_audit=False, json_path=None, csv_path=None):
+    """Main function to fetch and analyze all challenges
+    
+    Args:
+        max_not_submitted (int): 'Not Submitted' challenges allowed per user
+        full_audit (bool): Stream the whole table once instead of using the incremental counts
+        json_path (str): Write the audit report as JSON here
+        csv_path (str): Write the violators' challenges as CSV here
+    """
     print("🚀 Challenge Analysis Tool")
     print("=" * 60)
     
     try:
-        # Fetch all challenges
-        all_challenges = fetch_all_challenges()
+        if full_audit:
+            # Counts and drill-down in a single pass over the table
+            print("🔍 Streaming all challenges for a full audit...")
+            user_status_counts, challenges_by_email = audit_all_challenges(iter_challenges(), max_not_submitted)
+        else:
+            # Per-recipient status counts (only changes since the last run are fetched)
+            status_store = ChallengeStatusStore()
+            status_store.refresh()
+            user_status_counts = status_store.user_status_counts()
+            challenges_by_email = None
         
-        if not all_challenges:
+        if not user_status_counts:
             print("❌ No challenges found in the database")
             return
         
         # Analyze status distribution
-        user_status_counts = analyze_challenge_status_distribution(all_challenges)
+        status_counts = analyze_challenge_status_distribution(user_status_counts)
+        
+        # Check for violations
+        violations, compliant_users = check_user_challenge_limits(user_status_counts,
+                                                                  max_not_submitted=max_not_submitted)
         
-        # Check for violations (more than 3 'Not Submitted' per user)
-        violations, compliant_users = check_user_challenge_limits(user_status_counts, max_not_submitted=3)
+        # Show detailed information for violations (only their challenges are fetched in full)
+        if violations and challenges_by_email is None:
+            challenges_by_email = index_challenges_by_recipient(
+                iter_challenges_for_users([v['email'] for v in violations]))
+        get_challenge_details_for_violations(violations, challenges_by_email or {})
         
-        # Show detailed information for violations
-        get_challenge_details_for_violations(violations, all_challenges)
+        report = build_audit_report(status_counts, violations, compliant_users, challenges_by_email or {},
+                                    max_not_submitted)
+        if json_path:
+            write_report_json(report, json_path)
+        if csv_path:
+            write_violations_csv(report, csv_path)
         
         # Summary
         print(f"\n🎯 Final Summary:")
-        print(f"   Total challenges in database: {len(all_challenges)}")
+        print(f"   Total challenges in database: {report['total_challenges']}")
         print(f"   Total users with challenges: {len(user_status_counts)}")
         print(f"   Users with violations: {len(violations)}")
         print(f"   Compliant users: {len(compliant_users)}")
         
         if violations:
             print(f"\n⚠️  Action Required:")
-            print(f"   {len(violations)} users have more than 3 'Not Submitted' challenges")
+            print(f"   {len(violations)} users have more than {max_not_submitted} 'Not Submitted' challenges")
             print(f"   Consider running the script with limit enforcement")
         else:
-            print(f"\n✅ All users are within the 3 'Not Submitted' limit")
+            print(f"\n✅ All users are within the {max_not_submitted} 'Not Submitted' limit")
             
     except Exception as e:
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Audit challenges against the per-user 'Not Submitted' limit")
+    parser.add_argument('--max-not-submitted', type=int, default=3,
+                        help="'Not Submitted' challenges allowed per user (default 3)")
+    parser.add_argument('--full', action='store_true',
+                        help="Stream the whole Challenges table in one pass instead of using incremental counts")
+    parser.add_argument('--json', metavar='FILE', help="Write the audit report as JSON")
+    parser.add_argument('--csv', metavar='FILE', help="Write every violator's challenges as CSV")
+    args = parser.parse_args()
+    main(max_not_submitted=args.max_not_submitted, full_audit=args.full, json_path=args.json, csv_path=args.csv)
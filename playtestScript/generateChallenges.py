@@ -1,8 +1,22 @@
 import os
+import argparse
+import json
+import time
+import uuid
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import requests
 import openai
 
+from challenge_llm import ChatClient, ResponseCache
+from feedback_filter import ActionabilityFilter, is_no_challenge
+from challenge_index import ChallengeIndex
+from playtest_dataset import PlaytestDataset, SCORE_FIELDS
+from airtable_batch import AirtableBatchWriter
+from models import PlaytestRecord
+from http_session import get_session
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -15,10 +29,29 @@ OPENAI_API_KEY = os.getenv("OPENAI")
 openai.api_key = OPENAI_API_KEY
 
 # Airtable configuration
-AIRTABLE_API_BASE = 'https://api.airtable.com/v0'
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
 PLAYTEST_TICKETS_TABLE = 'PlaytestTickets'
 CHALLENGES_TABLE = 'Challenges'
 
+# Namespace for deterministic ChallengeIds (see challenge_idempotency_key)
+CHALLENGE_ID_NAMESPACE = uuid.UUID('2b8e4f3a-7c1d-4e59-b6a0-93d5c8e1f047')
+
+# Games are generated in parallel; challenges within one game stay sequential
+GAME_WORKERS = 4
+
+# Bump when a prompt below changes, so cached replies to the old prompt aren't reused
+PROMPT_VERSION = 1
+BATCH_PROMPT_VERSION = 1
+
+# Shared by every worker thread so they stay under one rate limit together
+chat_client = ChatClient(cache=ResponseCache())
+
+# Skips the LLM for feedback that is confidently not actionable
+feedback_filter = ActionabilityFilter()
+
+# Every challenge per game, from earlier runs and this one, for near-duplicate checks
+challenge_index = ChallengeIndex()
+
 def airtable_request(path, options=None):
     """Make a request to the Airtable API"""
     if options is None:
@@ -35,7 +68,7 @@ def airtable_request(path, options=None):
     if 'headers' in options:
         headers.update(options['headers'])
     
-    response = requests.request(
+    response = get_session().request(
         method=options.get('method', 'GET'),
         url=url,
         headers=headers,
@@ -76,11 +109,56 @@ def fetch_all_playtests():
     
     return all_records
 
-def generate_challenge_from_feedback(feedback, game_name, scores, existing_challenges=None):
+def challenge_idempotency_key(playtest_record_id):
+    """Deterministic ChallengeId for the challenge generated from one playtest, the same on every run"""
+    return str(uuid.uuid5(CHALLENGE_ID_NAMESPACE, playtest_record_id))
+
+def load_existing_challenges(index, game_ids=None):
+    """Load challenges already in the Challenges table into the similarity index
+    
+    Args:
+        index (ChallengeIndex): Index to reload
+        game_ids (iterable): Only index challenges for these games (every game when None)
+    """
+    game_ids = set(game_ids) if game_ids is not None else None
+    index.clear()
+    offset = None
+    loaded = 0
+    
+    while True:
+        params = {'pageSize': 100, 'fields[]': ['Challenge', 'AssignedGame']}
+        if offset:
+            params['offset'] = offset
+        
+        try:
+            page = airtable_request(CHALLENGES_TABLE, {'method': 'GET', 'params': params})
+        except Exception as e:
+            print(f"Error fetching existing challenges: {e}")
+            break
+        
+        for record in page.get('records', []):
+            fields = record.get('fields', {})
+            if not fields.get('Challenge') or not fields.get('AssignedGame'):
+                continue
+            if game_ids is None or fields['AssignedGame'][0] in game_ids:
+                index.add(fields['AssignedGame'][0], fields['Challenge'])
+                loaded += 1
+        
+        offset = page.get('offset')
+        if not offset:
+            break
+    
+    print(f"📚 Indexed {loaded} existing challenges for duplicate checks")
+    return loaded
+
+def generate_challenge_from_feedback(feedback, game_name, scores, existing_challenges=None, client=None):
     """Generate a specific challenge from playtest feedback using OpenAI"""
     if not feedback or not feedback.strip():
         return "No challenge found"
     
+    if feedback_filter.should_skip(feedback):
+        return "No challenge found"
+    
     # Prepare existing challenges context
     existing_context = ""
     if existing_challenges:
@@ -115,23 +193,20 @@ Instructions:
 Challenge:"""
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        challenge = (client or chat_client).complete(
             messages=[
                 {"role": "system", "content": "You are a helpful game development mentor who creates specific, actionable challenges from playtest feedback."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=200,
-            temperature=0.7
+            temperature=0.7,
+            prompt_version=PROMPT_VERSION
         )
         
-        challenge = response.choices[0].message.content.strip()
+        feedback_filter.record(feedback, not is_no_challenge(challenge))
         
         # If the response is too generic or indicates no challenge, return "No challenge found"
-        if (challenge.lower().startswith("no challenge") or 
-            challenge.lower().startswith("no specific") or
-            len(challenge) < 20 or
-            "no challenge found" in challenge.lower()):
+        if is_no_challenge(challenge):
             return "No challenge found"
             
         return challenge
@@ -140,6 +215,99 @@ Challenge:"""
         print(f"Error generating challenge: {e}")
         return "No challenge found"
 
+def score_text(score):
+    """A score for the prompt, 'N/A' only when it is missing (a score of 0 stays 0)"""
+    return 'N/A' if score is None or score == '' else score
+
+def generate_challenges_batch(playtests, game_name, client=None):
+    """Generate distinct challenges for several playtests of one game in a single request
+    
+    The model sees every selected playtest at once and answers with a JSON array
+    mapping each playtest ID to its challenge, so the challenges are kept apart
+    without resending a growing existing-challenges list per playtest.
+    
+    Args:
+        playtests (list): Playtests (as from get_complete_playtests) for one game
+        game_name: Game name shown in the prompt
+        client (ChatClient): Client to send through (the module's by default)
+    
+    Returns:
+        dict: playtest record_id -> challenge (or "No challenge found"), or None when
+              the reply could not be parsed and the caller should fall back to one call per playtest
+    """
+    challenges = {playtest.record_id: "No challenge found" for playtest in playtests}
+    with_feedback = [playtest for playtest in playtests
+                     if playtest.feedback and playtest.feedback.strip()
+                     and not feedback_filter.should_skip(playtest.feedback)]
+    if not with_feedback:
+        return challenges
+    
+    playtest_sections = ""
+    for playtest in with_feedback:
+        playtest_sections += f"""
+Playtest ID: {playtest.record_id}
+Scores: Fun={score_text(playtest.fun_score)}, Art={score_text(playtest.art_score)}, Creativity={score_text(playtest.creativity_score)}, Audio={score_text(playtest.audio_score)}, Mood={score_text(playtest.mood_score)}
+Feedback:
+{playtest.feedback}
+"""
+    
+    prompt = f"""
+You are a game development mentor. Based on each of the following playtests of one game, generate ONE specific, actionable challenge per playtest that the game developer can implement to improve their game.
+
+Game: {game_name}
+{playtest_sections}
+Instructions:
+- Generate ONE specific, measurable, testable challenge per playtest that is achievable within 2 hours (but don't mention the time constraint in your response)
+- Start directly with the action (e.g., "Add...", "Implement...", "Fix...", "Create...")
+- Be concise and direct - no explanations or context
+- The challenge must be something concrete the developer can implement AND easily verify completion
+- Make it specific with clear success criteria and realistic scope (e.g., "Add 3 visual cues", "Fix 2 audio bugs", "Add 1 new enemy type", "Create 1 new level")
+- Avoid vague concepts like "improve gameplay", "enhance creativity", "make it more fun" - focus on concrete features
+- If a playtest's feedback is too vague or doesn't contain actionable suggestions, use "No challenge found" for it
+- Keep each challenge under 20 words
+- Make each challenge directly address its own playtest's feedback
+- IMPORTANT: Every challenge must be different from the others
+- CRITICAL: Each challenge must be measurable/testable and achievable within 2 hours - someone should be able to clearly determine if it's completed
+- DO NOT include time constraints like "within 2 hours" or "in 2 hours" in your challenges
+
+Respond with only a JSON array, one object per playtest, like:
+[{{"playtest_id": "<Playtest ID>", "challenge": "<challenge>"}}]"""
+
+    try:
+        reply = (client or chat_client).complete(
+            messages=[
+                {"role": "system", "content": "You are a helpful game development mentor who creates specific, actionable challenges from playtest feedback. You answer in JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=80 * len(with_feedback) + 50,
+            temperature=0.7,
+            prompt_version=BATCH_PROMPT_VERSION
+        )
+        items = json.loads(reply.strip().removeprefix("```json").strip("`").strip())
+    except Exception as e:
+        print(f"Error generating batched challenges: {e}")
+        return None
+    
+    if not isinstance(items, list):
+        return None
+    
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        playtest_id = str(item.get('playtest_id'))
+        challenge = str(item.get('challenge', '')).strip()
+        # Only the first answer per playtest counts, and repeats the model returned despite the instructions are dropped
+        if challenges.get(playtest_id) != "No challenge found" or is_no_challenge(challenge) or challenge.lower() in seen:
+            continue
+        seen.add(challenge.lower())
+        challenges[playtest_id] = challenge
+    
+    for playtest in with_feedback:
+        feedback_filter.record(playtest.feedback, challenges[playtest.record_id] != "No challenge found")
+    
+    return challenges
+
 def calculate_sss_earnable(sss_awarded):
     """Calculate how much SSS can still be earned (up to 25 - current SSS)"""
     try:
@@ -150,24 +318,6 @@ def calculate_sss_earnable(sss_awarded):
     except (ValueError, TypeError):
         return 0
 
-def create_challenge_record(challenge_data):
-    """Create a record in the 'Challenges' Airtable table"""
-    print(f"📝 Creating challenge record in '{CHALLENGES_TABLE}' table...")
-    try:
-        response = airtable_request(CHALLENGES_TABLE, {
-            'method': 'POST',
-            'json': {'fields': challenge_data}
-        })
-        if response and response.get('id'):
-            print(f"✅ Challenge record created: {response['id']}")
-            return response['id']
-        else:
-            print(f"❌ Failed to create challenge record: {response}")
-            return None
-    except Exception as e:
-        print(f"🚨 Error creating challenge record: {e}")
-        return None
-
 def get_schema():
     """Get the schema for the PlaytestTickets table"""
     print("🔍 Fetching PlaytestTickets Table Schema")
@@ -194,13 +344,19 @@ def get_schema():
         print(f"Error fetching schema: {e}")
         return {}
 
-def get_complete_playtests(show_details=False):
-    """Get all playtests with status 'Complete' and their content for feedback"""
+def get_complete_playtests(show_details=False, all_playtests=None):
+    """Get all playtests with status 'Complete' and their content for feedback
+    
+    Args:
+        show_details (bool): Print every complete playtest
+        all_playtests (list): Already fetched PlaytestTickets records (fetched when None)
+    """
     print("\n🎯 Fetching Complete Playtests for Challenge Generation")
     print("=" * 60)
     
     # Fetch all playtest records
-    all_playtests = fetch_all_playtests()
+    if all_playtests is None:
+        all_playtests = fetch_all_playtests()
     
     print(f"📊 Total playtests found: {len(all_playtests)}")
     
@@ -211,31 +367,7 @@ def get_complete_playtests(show_details=False):
         status = fields.get('status', '')
         
         if status == 'Complete':
-            # Check if this playtest already has challenges
-            existing_challenges = fields.get('Challenges', [])
-            has_existing_challenges = existing_challenges and len(existing_challenges) > 0
-            
-            complete_playtests.append({
-                'record_id': record.get('id'),
-                'playtest_id': fields.get('PlaytestId', 'Unknown'),
-                'game_to_test': fields.get('GameToTest', []),
-                'player': fields.get('Player', []),
-                'status': status,
-                'feedback': fields.get('Feedback', ''),
-                'fun_score': fields.get('Fun Score', ''),
-                'art_score': fields.get('Art Score', ''),
-                'creativity_score': fields.get('Creativity Score', ''),
-                'audio_score': fields.get('Audio Score', ''),
-                'mood_score': fields.get('Mood Score', ''),
-                'sss_awarded': fields.get('SSSAwarded', ''),
-                'playtime_seconds': fields.get('Playtime Seconds', ''),
-                'created_time': fields.get('Created At', ''),
-                'game_name': fields.get('Game Name', []),
-                'player_email': fields.get('PlayerEmail', []),
-                'owner_email': fields.get('ownerEmail', []),
-                'has_existing_challenges': has_existing_challenges,
-                'all_fields': fields  # Include all fields for comprehensive view
-            })
+            complete_playtests.append(PlaytestRecord.from_airtable(record))
     
     print(f"📊 Found {len(complete_playtests)} complete playtests")
     
@@ -245,31 +377,225 @@ def get_complete_playtests(show_details=False):
         for i, playtest in enumerate(complete_playtests, 1):
             print(f"🎮 Playtest #{i}")
             print("-" * 40)
-            print(f"Record ID: {playtest['record_id']}")
-            print(f"Playtest ID: {playtest['playtest_id']}")
-            print(f"Status: {playtest['status']}")
-            print(f"Game to Test: {playtest['game_to_test']}")
-            print(f"Game Name: {playtest['game_name']}")
-            print(f"Player: {playtest['player']}")
-            print(f"Player Email: {playtest['player_email']}")
-            print(f"Owner Email: {playtest['owner_email']}")
-            print(f"Fun Score: {playtest['fun_score']}")
-            print(f"Art Score: {playtest['art_score']}")
-            print(f"Creativity Score: {playtest['creativity_score']}")
-            print(f"Audio Score: {playtest['audio_score']}")
-            print(f"Mood Score: {playtest['mood_score']}")
-            print(f"SSS Awarded: {playtest['sss_awarded']}")
-            print(f"Playtime: {playtest['playtime_seconds']} seconds")
-            print(f"Created: {playtest['created_time']}")
-            print(f"Feedback: {playtest['feedback']}")
+            print(f"Record ID: {playtest.record_id}")
+            print(f"Playtest ID: {playtest.playtest_id}")
+            print(f"Status: {playtest.status}")
+            print(f"Game to Test: {playtest.game_to_test}")
+            print(f"Game Name: {playtest.game_name}")
+            print(f"Player: {playtest.player}")
+            print(f"Player Email: {playtest.player_email}")
+            print(f"Owner Email: {playtest.owner_email}")
+            print(f"Fun Score: {playtest.fun_score}")
+            print(f"Art Score: {playtest.art_score}")
+            print(f"Creativity Score: {playtest.creativity_score}")
+            print(f"Audio Score: {playtest.audio_score}")
+            print(f"Mood Score: {playtest.mood_score}")
+            print(f"SSS Awarded: {playtest.sss_awarded}")
+            print(f"Playtime: {playtest.playtime_seconds} seconds")
+            print(f"Created: {playtest.created_time}")
+            print(f"Feedback: {playtest.feedback}")
             print()
             print("=" * 60)
             print()
     
     return complete_playtests
 
-def main():
-    """Main function to get complete playtests and their feedback content"""
+def generate_game_challenges(game_id, game_playtests, client=None, batched=True):
+    """Generate the challenges for one game's playtests
+    
+    In batched mode all selected playtests go to the model in one request (see
+    generate_challenges_batch). Otherwise they are sent one after another. Either
+    way each challenge is checked against the game's challenges in challenge_index
+    (earlier runs included) and a near-duplicate is regenerated once. Output is
+    collected and returned rather than printed, so games running in parallel
+    don't interleave their logs.
+    
+    Returns:
+        dict: 'game_name', 'lines' (log output), 'records' (Challenges fields to create)
+              and 'no_challenge_count'
+    """
+    lines = []
+    log = lines.append
+    records = []
+    no_challenge_count = 0
+    
+    game_name = game_playtests[0].game_name[0] if game_playtests[0].game_name else "Unknown"
+    log(f"   Playtests for this game: {len(game_playtests)}")
+    log("-" * 50)
+    
+    # Sort playtests by "Created At" field (most recent first) and limit to 5
+    sorted_playtests = sorted(game_playtests, key=lambda x: x.created_time, reverse=True)
+    recent_playtests = sorted_playtests[:5]  # Get 5 most recent playtests
+    
+    # Sort by SSS earnable (highest first) and take top 3
+    recent_playtests.sort(key=lambda playtest: calculate_sss_earnable(playtest.sss_awarded), reverse=True)
+    limited_playtests = recent_playtests[:3]  # Top 3 by SSS earnable
+    
+    log(f"   Processing {len(limited_playtests)} playtests (top 3 by SSS earnable from 5 most recent)")
+    
+    batch_challenges = None
+    if batched:
+        batch_challenges = generate_challenges_batch(limited_playtests, game_name, client=client)
+        if batch_challenges is None:
+            log(f"   ⚠️  Batched reply could not be used, generating one playtest at a time")
+    
+    game_challenges = []  # Challenges generated for this game so far
+    
+    for playtest_index, playtest in enumerate(limited_playtests, 1):
+        log(f"\n   📝 Playtest #{playtest_index}/{len(limited_playtests)}")
+        log(f"   Player: {playtest.player_email[0] if playtest.player_email else 'Unknown'}")
+        log(f"   Created: {playtest.created_time or 'Unknown'}")
+        
+        # Calculate SSS earnable for this playtest
+        sss_earnable = calculate_sss_earnable(playtest.sss_awarded)
+        log(f"   SSS Earnable: {sss_earnable} (from {playtest.sss_awarded} awarded)")
+        
+        # Prepare scores for the challenge generation
+        scores = playtest.scores()
+        
+        if batch_challenges is not None:
+            challenge = batch_challenges[playtest.record_id]
+        else:
+            challenge = generate_challenge_from_feedback(playtest.feedback, playtest.game_name, scores,
+                                                         client=client)
+        
+        # Near-duplicates of this game's challenges get one retry told what to avoid
+        duplicate = challenge != "No challenge found" and challenge_index.find_duplicate(game_id, challenge)
+        if duplicate:
+            log(f"   ♻️  Too close to existing challenge: {duplicate}")
+            challenge = generate_challenge_from_feedback(playtest.feedback, playtest.game_name, scores,
+                                                         existing_challenges=[duplicate], client=client)
+            if challenge != "No challenge found" and challenge_index.find_duplicate(game_id, challenge):
+                log(f"   ♻️  Regenerated challenge is still a near-duplicate: {challenge}")
+                challenge = "No challenge found"
+        
+        log(f"   Challenge: {challenge}")
+        
+        if challenge != "No challenge found":
+            challenge_index.add(game_id, challenge)
+            game_challenges.append(challenge)
+            records.append({
+                "ChallengeId": challenge_idempotency_key(playtest.record_id),
+                "recipientEmail": playtest.owner_email[0] if playtest.owner_email else "Unknown",
+                "Challenge": challenge,
+                "Earnable SSS": sss_earnable,
+                "AssignedGame": playtest.game_to_test,  # This is a list of game IDs
+                "Status": "Not Submitted",
+                "SSS Earned": 0,
+                "FromPlaytest": [playtest.record_id]  # Link to the original PlaytestTicket record
+            })
+        else:
+            no_challenge_count += 1
+    
+    log(f"   ✅ Completed game: {game_name} ({len(game_challenges)} challenges generated)")
+    
+    return {
+        'game_name': game_name,
+        'lines': lines,
+        'records': records,
+        'no_challenge_count': no_challenge_count
+    }
+
+def generate_all_game_challenges(games_dict, max_workers=GAME_WORKERS, client=None, batched=True, writer=None):
+    """Run generate_game_challenges for every game, several games at a time
+    
+    Args:
+        games_dict (dict): game_id -> playtests for that game
+        max_workers (int): Games generated in parallel
+        client (ChatClient): Shared rate-limited client (the module's by default)
+        batched (bool): One request per game instead of one per playtest
+        writer (AirtableBatchWriter): Writes each game's challenge records as soon as the
+            game is done, so a crash or Ctrl-C keeps the challenges of finished games. Records
+            are upserted on ChallengeId, so a retried batch or a rerun never duplicates one
+    
+    Returns:
+        list: One generate_game_challenges result per game, in games_dict order, with
+              'created', 'updated' and 'failed' from the writer when one is given
+    """
+    start = time.time()
+    results = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(generate_game_challenges, game_id, game_playtests, client, batched): game_id
+            for game_id, game_playtests in games_dict.items()
+        }
+        
+        for done_count, future in enumerate(as_completed(futures), 1):
+            game_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'game_name': game_id, 'lines': [f"   ❌ Error: {e}"], 'records': [], 'no_challenge_count': 0}
+            results[game_id] = result
+            
+            print(f"\n🎮 Game #{done_count}/{len(games_dict)}: {result['game_name']}")
+            print("\n".join(result['lines']))
+            
+            if writer and result['records']:
+                report = writer.upsert(result['records'], merge_on=['ChallengeId'])
+                result['created'] = report['created']
+                result['updated'] = report['updated']
+                result['failed'] = report['failed']
+                print(f"   📝 Created {len(report['created'])} and updated {len(report['updated'])} "
+                      f"challenge records in '{CHALLENGES_TABLE}'")
+                for failure in report['failed']:
+                    print(f"   🚨 Failed to create {failure['fields']['Challenge']}: {failure['error']}")
+    
+    print(f"\n⏱️  Generated challenges for {len(games_dict)} games in {time.time() - start:.1f}s")
+    return [results[game_id] for game_id in games_dict]
+
+def print_score_analytics(dataset, top_games=15):
+    """Print per-game scores, completion rates and the playtime distribution"""
+    complete = dataset.status_mask('Complete')
+    
+    print(f"\n📈 Score Analytics ({len(dataset)} playtests, {int(complete.sum())} complete)")
+    print("=" * 60)
+    
+    print(f"\n🎮 Fun Score by game (top {top_games} by playtests, complete only):")
+    fun = dataset.per_game_score_stats('fun', percentiles=(25, 50, 75), mask=complete)
+    for code in fun['count'].argsort()[::-1][:top_games]:
+        if not fun['count'][code]:
+            break
+        p25, p50, p75 = fun['percentiles'][code]
+        name = dataset.game_names[code]
+        print(f"  {name[:30]:<30} n={fun['count'][code]:<4} mean={fun['mean'][code]:.2f} "
+              f"p25={p25:.1f} median={p50:.1f} p75={p75:.1f}")
+    
+    print(f"\n🎨 Mean scores across complete playtests:")
+    for name in SCORE_FIELDS:
+        values = getattr(dataset, name)[complete]
+        if (~np.isnan(values)).any():
+            print(f"  {name.capitalize():<11} {np.nanmean(values):.2f}")
+    
+    rates = dataset.completion_rates()
+    with_tickets = rates['total'] > 0
+    print(f"\n✅ Completion:")
+    print(f"  Overall: {rates['completed'].sum()}/{rates['total'].sum()} tickets complete")
+    if with_tickets.any():
+        print(f"  Per-game rate: median {np.median(rates['rate'][with_tickets]):.0%}, "
+              f"{int((rates['rate'][with_tickets] == 0).sum())} games with none complete")
+    
+    playtime = dataset.playtime_distribution(mask=complete)
+    print(f"\n⏱️  Playtime ({playtime['count']} complete playtests with a playtime):")
+    for count, low, high in zip(playtime['histogram'], playtime['edges'][:-1], playtime['edges'][1:]):
+        label = f"{int(low)}s+" if np.isinf(high) else f"{int(low)}-{int(high)}s"
+        print(f"  {label:<12} {count}")
+    for percentile, value in playtime['percentiles'].items():
+        print(f"  p{percentile}: {value:.0f}s")
+
+# Menu choices by mode name, for running without the prompt
+MODES = {'summary': '1', 'details': '2', 'generate': '3', 'analytics': '4'}
+
+def main(batched=True, prefilter_threshold=None, mode=None):
+    """Main function to get complete playtests and their feedback content
+    
+    Args:
+        mode (str): One of MODES to skip the menu prompt
+    """
+    if prefilter_threshold is not None:
+        feedback_filter.threshold = prefilter_threshold
+    
     print("🚀 Generate Challenges - Complete Playtests Analysis")
     print("=" * 60)
     
@@ -278,20 +604,33 @@ def main():
     print("1. Show summary only (quick overview)")
     print("2. Show detailed playtest data (full feedback content)")
     print("3. Generate challenges from feedback (using OpenAI)")
-    response = input("Enter your choice (1, 2, or 3): ")
+    print("4. Show score analytics (per-game scores, completion rates, playtime)")
+    if mode:
+        response = MODES[mode]
+        print(f"Mode: {mode}")
+    else:
+        response = input("Enter your choice (1, 2, 3, or 4): ")
     
     show_details = response.strip() == '2'
     generate_challenges = response.strip() == '3'
+    show_analytics = response.strip() == '4'
     
     if show_details:
         print("📋 Running detailed analysis - this may take a moment...")
     elif generate_challenges:
         print("🤖 Generating challenges from feedback using OpenAI...")
+    elif show_analytics:
+        print("📈 Running score analytics...")
     else:
         print("📊 Running summary analysis...")
     
     try:
-        complete_playtests = get_complete_playtests(show_details=show_details)
+        all_playtests = fetch_all_playtests()
+        dataset = PlaytestDataset(all_playtests)
+        complete_playtests = get_complete_playtests(show_details=show_details, all_playtests=all_playtests)
+        
+        if show_analytics:
+            print_score_analytics(dataset)
         
         # Generate challenges if requested
         if generate_challenges and complete_playtests:
@@ -299,8 +638,8 @@ def main():
             print("=" * 60)
             
             # Filter out playtests that already have challenges
-            playtests_without_challenges = [p for p in complete_playtests if not p['has_existing_challenges']]
-            playtests_with_challenges = [p for p in complete_playtests if p['has_existing_challenges']]
+            playtests_without_challenges = [p for p in complete_playtests if not p.has_existing_challenges]
+            playtests_with_challenges = [p for p in complete_playtests if p.has_existing_challenges]
             
             print(f"📊 Playtests already with challenges: {len(playtests_with_challenges)}")
             print(f"📊 Playtests needing challenges: {len(playtests_without_challenges)}")
@@ -308,106 +647,29 @@ def main():
             # Group playtests by game (only those without challenges)
             games_dict = {}
             for playtest in playtests_without_challenges:
-                game_id = playtest['game_to_test'][0] if playtest['game_to_test'] else 'unknown'
+                game_id = playtest.game_to_test[0] if playtest.game_to_test else 'unknown'
                 if game_id not in games_dict:
                     games_dict[game_id] = []
                 games_dict[game_id].append(playtest)
             
             print(f"📊 Found {len(games_dict)} unique games to process")
+            load_existing_challenges(challenge_index, games_dict)
             print("=" * 60)
             
-            challenges_generated = 0
-            no_challenge_count = 0
-            game_challenges = {}  # Track challenges per game
+            # Each game's records are created in the Challenges table as soon as the game is done
+            results = generate_all_game_challenges(games_dict, batched=batched,
+                                                   writer=AirtableBatchWriter(CHALLENGES_TABLE))
+            challenges_generated = sum(len(result['records']) for result in results)
+            no_challenge_count = sum(result['no_challenge_count'] for result in results)
             
-            # Process each game
-            for game_index, (game_id, game_playtests) in enumerate(games_dict.items(), 1):
-                game_name = game_playtests[0]['game_name'][0] if game_playtests[0]['game_name'] else "Unknown"
-                print(f"\n🎮 Game #{game_index}/{len(games_dict)}: {game_name}")
-                print(f"   Playtests for this game: {len(game_playtests)}")
-                print("-" * 50)
-                
-                # Sort playtests by "Created At" field (most recent first) and limit to 5
-                sorted_playtests = sorted(game_playtests, key=lambda x: x.get('created_time', ''), reverse=True)
-                recent_playtests = sorted_playtests[:5]  # Get 5 most recent playtests
-                
-                # Calculate SSS earnable for each recent playtest and sort by earnable SSS (highest first)
-                playtests_with_sss = []
-                for playtest in recent_playtests:
-                    sss_earnable = calculate_sss_earnable(playtest['sss_awarded'])
-                    playtests_with_sss.append({
-                        'playtest': playtest,
-                        'sss_earnable': sss_earnable
-                    })
-                
-                # Sort by SSS earnable (highest first) and take top 3
-                playtests_with_sss.sort(key=lambda x: x['sss_earnable'], reverse=True)
-                limited_playtests = [item['playtest'] for item in playtests_with_sss[:3]]  # Top 3 by SSS earnable
-                
-                print(f"   Processing {len(limited_playtests)} playtests (top 3 by SSS earnable from 5 most recent)")
-                
-                # Initialize challenges list for this game
-                game_challenges[game_id] = []
-                
-                # Process each playtest for this game
-                for playtest_index, playtest in enumerate(limited_playtests, 1):
-                    print(f"\n   📝 Playtest #{playtest_index}/{len(limited_playtests)}")
-                    print(f"   Player: {playtest['player_email'][0] if playtest['player_email'] else 'Unknown'}")
-                    print(f"   Created: {playtest.get('created_time', 'Unknown')}")
-                    
-                    # Calculate SSS earnable for this playtest
-                    sss_earnable = calculate_sss_earnable(playtest['sss_awarded'])
-                    print(f"   SSS Earnable: {sss_earnable} (from {playtest['sss_awarded']} awarded)")
-                    
-                    # Prepare scores for the challenge generation
-                    scores = {
-                        'fun_score': playtest['fun_score'],
-                        'art_score': playtest['art_score'],
-                        'creativity_score': playtest['creativity_score'],
-                        'audio_score': playtest['audio_score'],
-                        'mood_score': playtest['mood_score']
-                    }
-                    
-                    # Calculate SSS earnable
-                    sss_earnable = calculate_sss_earnable(playtest['sss_awarded'])
-                    
-                    # Generate challenge with existing challenges context
-                    challenge = generate_challenge_from_feedback(
-                        playtest['feedback'], 
-                        playtest['game_name'], 
-                        scores,
-                        existing_challenges=game_challenges[game_id]  # Pass existing challenges for this game
-                    )
-                    
-                    print(f"   Challenge: {challenge}")
-                    print(f"   SSS Earnable: {sss_earnable}")
-                    
-                    # Create record in Challenges table (only if challenge was found)
-                    if challenge != "No challenge found":
-                        # Add to game challenges list
-                        game_challenges[game_id].append(challenge)
-                        
-                        challenge_record_data = {
-                            "recipientEmail": playtest['owner_email'][0] if playtest['owner_email'] else "Unknown",
-                            "Challenge": challenge,
-                            "Earnable SSS": sss_earnable,
-                            "AssignedGame": playtest['game_to_test'],  # This is a list of game IDs
-                            "Status": "Not Submitted",
-                            "SSS Earned": 0,
-                            "FromPlaytest": [playtest['record_id']]  # Link to the original PlaytestTicket record
-                        }
-                        
-                        # Create the record in the Challenges table
-                        create_challenge_record(challenge_record_data)
-                        challenges_generated += 1
-                    else:
-                        no_challenge_count += 1
-                    
-                    # Add a small delay to avoid rate limiting
-                    import time
-                    time.sleep(0.5)
-                
-                print(f"   ✅ Completed game: {game_name} ({len(game_challenges[game_id])} challenges generated)")
+            if challenges_generated:
+                print(f"\n📝 Challenge records in '{CHALLENGES_TABLE}' table:")
+                print(f"  ✅ Created: {sum(len(result.get('created', [])) for result in results)}")
+                print(f"  ❌ Failed: {sum(len(result.get('failed', [])) for result in results)}")
+            
+            chat_client.print_stats()
+            feedback_filter.print_stats()
+            challenge_index.print_stats()
             
             print(f"\n🎯 Challenge Generation Summary:")
             print(f"  Total complete playtests: {len(complete_playtests)}")
@@ -422,33 +684,16 @@ def main():
         print(f"  Total complete playtests found: {len(complete_playtests)}")
         
         if complete_playtests:
-            # Analyze feedback content
-            feedback_count = sum(1 for p in complete_playtests if p['feedback'])
-            fun_score_count = sum(1 for p in complete_playtests if p['fun_score'] is not None and p['fun_score'] != '')
-            art_score_count = sum(1 for p in complete_playtests if p['art_score'] is not None and p['art_score'] != '')
-            creativity_score_count = sum(1 for p in complete_playtests if p['creativity_score'] is not None and p['creativity_score'] != '')
-            audio_score_count = sum(1 for p in complete_playtests if p['audio_score'] is not None and p['audio_score'] != '')
-            mood_score_count = sum(1 for p in complete_playtests if p['mood_score'] is not None and p['mood_score'] != '')
+            # Counted on the columnar dataset, restricted to complete playtests
+            complete = dataset.status_mask('Complete')
+            score_counts = dataset.score_counts(mask=complete)
             
-            print(f"  Playtests with feedback: {feedback_count}")
-            print(f"  Playtests with Fun scores: {fun_score_count}")
-            print(f"  Playtests with Art scores: {art_score_count}")
-            print(f"  Playtests with Creativity scores: {creativity_score_count}")
-            print(f"  Playtests with Audio scores: {audio_score_count}")
-            print(f"  Playtests with Mood scores: {mood_score_count}")
+            print(f"  Playtests with feedback: {int((dataset.has_feedback & complete).sum())}")
+            for name in SCORE_FIELDS:
+                print(f"  Playtests with {name.capitalize()} scores: {score_counts[name]}")
             
-            # Show unique games and players
-            unique_games = set()
-            unique_players = set()
-            
-            for playtest in complete_playtests:
-                if playtest['game_to_test']:
-                    unique_games.update(playtest['game_to_test'])
-                if playtest['player']:
-                    unique_players.update(playtest['player'])
-            
-            print(f"  Unique games tested: {len(unique_games)}")
-            print(f"  Unique players: {len(unique_players)}")
+            print(f"  Unique games tested: {dataset.unique_count(dataset.game_codes, mask=complete)}")
+            print(f"  Unique players: {dataset.unique_count(dataset.player_codes, mask=complete)}")
         else:
             print("  No complete playtests found")
             
@@ -456,4 +701,12 @@ def main():
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Analyze complete playtests and generate challenges from their feedback")
+    parser.add_argument('--sequential', action='store_true',
+                        help="One OpenAI request per playtest instead of one per game")
+    parser.add_argument('--prefilter-threshold', type=float,
+                        help="Skip the LLM for feedback predicted actionable below this probability (0 disables)")
+    parser.add_argument('--mode', choices=list(MODES), help="Run this menu option without prompting")
+    args = parser.parse_args()
+    
+    main(batched=not args.sequential, prefilter_threshold=args.prefilter_threshold, mode=args.mode)
@@ -3,7 +3,12 @@ from dotenv import load_dotenv
 import requests
 import openai
 import time
-from collections import defaultdict
+
+from challenge_llm import ChatClient, ResponseCache
+from challenge_counts import ChallengeStatusStore
+from feedback_filter import ActionabilityFilter, is_no_challenge
+from models import PlaytestRecord
+from http_session import get_session
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,13 +22,21 @@ OPENAI_API_KEY = os.getenv("OPENAI")
 openai.api_key = OPENAI_API_KEY
 
 # Airtable configuration
-AIRTABLE_API_BASE = 'https://api.airtable.com/v0'
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
 PLAYTEST_TICKETS_TABLE = 'PlaytestTickets'
 CHALLENGES_TABLE = 'Challenges'
 
 # Configuration
 MAX_NOT_SUBMITTED_CHALLENGES = 3
 
+# Bump when the prompt below changes, so cached replies to the old prompt aren't reused
+PROMPT_VERSION = 1
+
+chat_client = ChatClient(cache=ResponseCache())
+
+# Skips the LLM for feedback that is confidently not actionable
+feedback_filter = ActionabilityFilter()
+
 def airtable_request(path, options=None):
     """Make a request to the Airtable API"""
     if options is None:
@@ -40,7 +53,7 @@ def airtable_request(path, options=None):
     if 'headers' in options:
         headers.update(options['headers'])
     
-    response = requests.request(
+    response = get_session().request(
         method=options.get('method', 'GET'),
         url=url,
         headers=headers,
@@ -53,54 +66,15 @@ def airtable_request(path, options=None):
     
     return response.json()
 
-def fetch_all_challenges():
-    """Fetch all challenges to check current user limits"""
-    print("🔍 Fetching existing challenges to check user limits...")
-    
-    all_challenges = []
-    offset = None
-    
-    while True:
-        params = {'pageSize': 100}
-        if offset:
-            params['offset'] = offset
-        
-        try:
-            page = airtable_request(f"{CHALLENGES_TABLE}?{requests.compat.urlencode(params)}", {
-                'method': 'GET'
-            })
-            
-            page_records = page.get('records', [])
-            all_challenges.extend(page_records)
-            offset = page.get('offset')
-            
-            if not offset:
-                break
-                
-        except Exception as e:
-            print(f"Error fetching challenges: {e}")
-            break
-    
-    return all_challenges
-
 def get_user_challenge_counts():
-    """Get current challenge counts per user"""
-    all_challenges = fetch_all_challenges()
-    user_counts = defaultdict(lambda: defaultdict(int))
-    
-    for challenge in all_challenges:
-        fields = challenge.get('fields', {})
-        recipient_email = fields.get('recipientEmail', 'Unknown')
-        status = fields.get('Status', 'Unknown')
-        
-        user_counts[recipient_email][status] += 1
-    
-    return user_counts
+    """Get current challenge counts per user, refreshing only what changed since the last run"""
+    status_store = ChallengeStatusStore()
+    status_store.refresh()
+    return status_store
 
-def can_user_receive_challenge(user_email, user_counts):
+def can_user_receive_challenge(user_email, status_store):
     """Check if a user can receive a new challenge (not exceeding the limit)"""
-    not_submitted_count = user_counts.get(user_email, {}).get('Not Submitted', 0)
-    return not_submitted_count < MAX_NOT_SUBMITTED_CHALLENGES
+    return status_store.can_receive(user_email, MAX_NOT_SUBMITTED_CHALLENGES)
 
 def fetch_all_playtests():
     """Fetch all records from the PlaytestTickets table"""
@@ -135,6 +109,9 @@ def generate_challenge_from_feedback(feedback, game_name, scores, existing_chall
     if not feedback or not feedback.strip():
         return "No challenge found"
     
+    if feedback_filter.should_skip(feedback):
+        return "No challenge found"
+    
     # Prepare existing challenges context
     existing_context = ""
     if existing_challenges:
@@ -169,23 +146,21 @@ Instructions:
 Challenge:"""
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        challenge = chat_client.complete(
             messages=[
                 {"role": "system", "content": "You are a helpful game development mentor who creates specific, actionable challenges from playtest feedback."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=200,
-            temperature=0.7
+            temperature=0.7,
+            prompt_version=PROMPT_VERSION
         )
         
-        challenge = response.choices[0].message.content.strip()
+        found = not is_no_challenge(challenge)
+        feedback_filter.record(feedback, found)
         
         # If the response is too generic or indicates no challenge, return "No challenge found"
-        if (challenge.lower().startswith("no challenge") or 
-            challenge.lower().startswith("no specific") or
-            len(challenge) < 20 or
-            "no challenge found" in challenge.lower()):
+        if not found:
             return "No challenge found"
             
         return challenge
@@ -239,42 +214,18 @@ def get_complete_playtests(show_details=False):
         status = fields.get('status', '')
         
         if status == 'Complete':
-            # Check if this playtest already has challenges
-            existing_challenges = fields.get('Challenges', [])
-            has_existing_challenges = existing_challenges and len(existing_challenges) > 0
-            
-            complete_playtests.append({
-                'record_id': record.get('id'),
-                'playtest_id': fields.get('PlaytestId', 'Unknown'),
-                'game_to_test': fields.get('GameToTest', []),
-                'player': fields.get('Player', []),
-                'status': status,
-                'feedback': fields.get('Feedback', ''),
-                'fun_score': fields.get('Fun Score', ''),
-                'art_score': fields.get('Art Score', ''),
-                'creativity_score': fields.get('Creativity Score', ''),
-                'audio_score': fields.get('Audio Score', ''),
-                'mood_score': fields.get('Mood Score', ''),
-                'sss_awarded': fields.get('SSSAwarded', ''),
-                'playtime_seconds': fields.get('Playtime Seconds', ''),
-                'created_time': fields.get('Created At', ''),
-                'game_name': fields.get('Game Name', []),
-                'player_email': fields.get('PlayerEmail', []),
-                'owner_email': fields.get('ownerEmail', []),
-                'has_existing_challenges': has_existing_challenges,
-                'all_fields': fields  # Include all fields for comprehensive view
-            })
+            complete_playtests.append(PlaytestRecord.from_airtable(record))
     
     print(f"📊 Found {len(complete_playtests)} complete playtests")
     
     return complete_playtests
 
-def process_playtest_for_challenge(playtest, game_challenges, user_counts, test_number):
+def process_playtest_for_challenge(playtest, game_challenges, status_store, test_number):
     """Process a single playtest to generate a challenge, with special handling for 4th test"""
-    owner_email = playtest['owner_email'][0] if playtest['owner_email'] else "Unknown"
+    owner_email = playtest.owner_email[0] if playtest.owner_email else "Unknown"
     
     # Check if user can receive a new challenge
-    if not can_user_receive_challenge(owner_email, user_counts):
+    if not can_user_receive_challenge(owner_email, status_store):
         print(f"   ⚠️  User {owner_email} already has {MAX_NOT_SUBMITTED_CHALLENGES} 'Not Submitted' challenges - skipping")
         return False, "User at limit"
     
@@ -290,18 +241,12 @@ def process_playtest_for_challenge(playtest, game_challenges, user_counts, test_
             return False, "No 3rd challenge to reuse"
     
     # Regular challenge generation for tests 1-3
-    scores = {
-        'fun_score': playtest['fun_score'],
-        'art_score': playtest['art_score'],
-        'creativity_score': playtest['creativity_score'],
-        'audio_score': playtest['audio_score'],
-        'mood_score': playtest['mood_score']
-    }
+    scores = playtest.scores()
     
     # Generate challenge with existing challenges context
     challenge = generate_challenge_from_feedback(
-        playtest['feedback'], 
-        playtest['game_name'], 
+        playtest.feedback, 
+        playtest.game_name, 
         scores,
         existing_challenges=game_challenges
     )
@@ -313,23 +258,24 @@ def process_playtest_for_challenge(playtest, game_challenges, user_counts, test_
         game_challenges.append(challenge)
         
         # Calculate SSS earnable
-        sss_earnable = calculate_sss_earnable(playtest['sss_awarded'])
+        sss_earnable = calculate_sss_earnable(playtest.sss_awarded)
         
         challenge_record_data = {
             "recipientEmail": owner_email,
             "Challenge": challenge,
             "Earnable SSS": sss_earnable,
-            "AssignedGame": playtest['game_to_test'],
+            "AssignedGame": playtest.game_to_test,
             "Status": "Not Submitted",
             "SSS Earned": 0,
-            "FromPlaytest": [playtest['record_id']]
+            "FromPlaytest": [playtest.record_id]
         }
         
         # Create the record in the Challenges table
-        create_challenge_record(challenge_record_data)
+        record_id = create_challenge_record(challenge_record_data)
         
-        # Update user counts
-        user_counts[owner_email]['Not Submitted'] += 1
+        # Update user counts in place
+        if record_id:
+            status_store.record_created(record_id, owner_email)
         
         return True, "Challenge created"
     else:
@@ -342,11 +288,11 @@ def main():
     
     # Get current user challenge counts
     print("📊 Checking current user challenge limits...")
-    user_counts = get_user_challenge_counts()
+    status_store = get_user_challenge_counts()
     
     # Show current violations
     violations = []
-    for user_email, counts in user_counts.items():
+    for user_email, counts in status_store.user_status_counts().items():
         not_submitted = counts.get('Not Submitted', 0)
         if not_submitted > MAX_NOT_SUBMITTED_CHALLENGES:
             violations.append((user_email, not_submitted))
@@ -371,14 +317,23 @@ def main():
             return
         
         # Filter out playtests that already have challenges
-        playtests_without_challenges = [p for p in complete_playtests if not p['has_existing_challenges']]
+        playtests_without_challenges = [p for p in complete_playtests if not p.has_existing_challenges]
         
         print(f"📊 Playtests needing challenges: {len(playtests_without_challenges)}")
         
+        # Owners already at the limit are dropped before any playtest is selected or sent to the LLM
+        users_at_limit = status_store.users_at_limit(MAX_NOT_SUBMITTED_CHALLENGES)
+        under_limit_playtests = [p for p in playtests_without_challenges
+                                 if (p.owner_email[0] if p.owner_email else "Unknown") not in users_at_limit]
+        at_limit_count = len(playtests_without_challenges) - len(under_limit_playtests)
+        playtests_without_challenges = under_limit_playtests
+        if at_limit_count:
+            print(f"📊 Skipped (owner already at limit): {at_limit_count}")
+        
         # Group playtests by game (only those without challenges)
         games_dict = {}
         for playtest in playtests_without_challenges:
-            game_id = playtest['game_to_test'][0] if playtest['game_to_test'] else 'unknown'
+            game_id = playtest.game_to_test[0] if playtest.game_to_test else 'unknown'
             if game_id not in games_dict:
                 games_dict[game_id] = []
             games_dict[game_id].append(playtest)
@@ -394,19 +349,19 @@ def main():
         
         # Process each game
         for game_index, (game_id, game_playtests) in enumerate(games_dict.items(), 1):
-            game_name = game_playtests[0]['game_name'][0] if game_playtests[0]['game_name'] else "Unknown"
+            game_name = game_playtests[0].game_name[0] if game_playtests[0].game_name else "Unknown"
             print(f"\n🎮 Game #{game_index}/{len(games_dict)}: {game_name}")
             print(f"   Playtests for this game: {len(game_playtests)}")
             print("-" * 50)
             
             # Sort playtests by "Created At" field (most recent first) and limit to 5
-            sorted_playtests = sorted(game_playtests, key=lambda x: x.get('created_time', ''), reverse=True)
+            sorted_playtests = sorted(game_playtests, key=lambda x: x.created_time, reverse=True)
             recent_playtests = sorted_playtests[:5]  # Get 5 most recent playtests
             
             # Calculate SSS earnable for each recent playtest and sort by earnable SSS (highest first)
             playtests_with_sss = []
             for playtest in recent_playtests:
-                sss_earnable = calculate_sss_earnable(playtest['sss_awarded'])
+                sss_earnable = calculate_sss_earnable(playtest.sss_awarded)
                 playtests_with_sss.append({
                     'playtest': playtest,
                     'sss_earnable': sss_earnable
@@ -424,18 +379,18 @@ def main():
             # Process each playtest for this game
             for playtest_index, playtest in enumerate(limited_playtests, 1):
                 print(f"\n   📝 Playtest #{playtest_index}/{len(limited_playtests)}")
-                print(f"   Player: {playtest['player_email'][0] if playtest['player_email'] else 'Unknown'}")
-                print(f"   Created: {playtest.get('created_time', 'Unknown')}")
+                print(f"   Player: {playtest.player_email[0] if playtest.player_email else 'Unknown'}")
+                print(f"   Created: {playtest.created_time or 'Unknown'}")
                 
                 # Calculate SSS earnable for this playtest
-                sss_earnable = calculate_sss_earnable(playtest['sss_awarded'])
-                print(f"   SSS Earnable: {sss_earnable} (from {playtest['sss_awarded']} awarded)")
+                sss_earnable = calculate_sss_earnable(playtest.sss_awarded)
+                print(f"   SSS Earnable: {sss_earnable} (from {playtest.sss_awarded} awarded)")
                 
                 # Process the playtest
                 success, reason = process_playtest_for_challenge(
                     playtest, 
                     game_challenges[game_id], 
-                    user_counts, 
+                    status_store, 
                     playtest_index
                 )
                 
@@ -460,12 +415,13 @@ def main():
         print(f"  Playtests processed for new challenges: {len(playtests_without_challenges)}")
         print(f"  New challenges generated: {challenges_generated}")
         print(f"  4th tests reused (no new record): {reused_4th_test_count}")
-        print(f"  Skipped due to user limit: {skipped_limit_count}")
+        print(f"  Skipped due to user limit: {skipped_limit_count + at_limit_count}")
         print(f"  No challenge found: {no_challenge_count}")
         print(f"  Total processed: {challenges_generated + reused_4th_test_count + skipped_limit_count + no_challenge_count}")
         
         # Show final user counts
         print(f"\n📊 Final User Challenge Counts:")
+        user_counts = status_store.user_status_counts()
         for user_email, counts in user_counts.items():
             not_submitted = counts.get('Not Submitted', 0)
             if not_submitted > 0:
@@ -484,6 +440,9 @@ def main():
                 print(f"   {email}: {count} 'Not Submitted' challenges")
         else:
             print(f"\n✅ All users are now within the {MAX_NOT_SUBMITTED_CHALLENGES} 'Not Submitted' limit")
+        
+        chat_client.print_stats()
+        feedback_filter.print_stats()
             
     except Exception as e:
         print(f"❌ Error: {e}")
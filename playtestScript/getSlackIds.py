@@ -1,9 +1,15 @@
 import os
+import argparse
+import json
+import re
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-import requests
 import time
 from collections import defaultdict
 
+from user_export import UserExporter, EXPORT_FORMATS
+from http_session import get_session
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -12,9 +18,21 @@ AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
 AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
 
 # Airtable configuration
-AIRTABLE_API_BASE = 'https://api.airtable.com/v0'
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
 USERS_TABLE = 'Users'
 
+# Field names the Slack ID may be stored under, in order of preference
+SLACK_ID_FIELDS = ['slack id', 'slack_id', 'Slack ID', 'SlackId', 'slackId']
+
+# Slack IDs seen by the last delta sync (record ID -> Slack ID)
+SLACK_ID_SNAPSHOT_FILE = os.getenv("SLACK_ID_SNAPSHOT_FILE", "slack_id_snapshot.json")
+
+# Delta syncs can't see deleted users, so reload everything this often
+FULL_REFRESH_HOURS = 24
+
+# Overlap between syncs, in case Airtable's clock and ours disagree
+SYNC_OVERLAP_SECONDS = 120
+
 def airtable_request(path, options=None):
     """Make a request to the Airtable API"""
     if options is None:
@@ -31,7 +49,7 @@ def airtable_request(path, options=None):
     if 'headers' in options:
         headers.update(options['headers'])
     
-    response = requests.request(
+    response = get_session().request(
         method=options.get('method', 'GET'),
         url=url,
         headers=headers,
@@ -44,43 +62,41 @@ def airtable_request(path, options=None):
     
     return response.json()
 
+def iter_user_pages(params=None, page_delay=0.1):
+    """Yield the Users table one page (up to 100 records) at a time"""
+    params = dict(params or {}, pageSize=100)
+    offset = None
+    
+    while True:
+        if offset:
+            params['offset'] = offset
+        page = airtable_request(USERS_TABLE, {'method': 'GET', 'params': params})
+        yield page.get('records', [])
+        offset = page.get('offset')
+        if not offset:
+            break
+        
+        # Small delay to avoid rate limiting
+        if page_delay:
+            time.sleep(page_delay)
+
 def fetch_all_users():
     """Fetch all users from the Users table in batches of 100"""
     print("🔍 Fetching all users from Airtable...")
     print("=" * 60)
     
     all_users = []
-    offset = None
     batch_count = 0
     
-    while True:
-        batch_count += 1
-        params = {'pageSize': 100}
-        if offset:
-            params['offset'] = offset
-        
-        try:
-            print(f"📦 Fetching batch {batch_count} (100 records per batch)...")
-            page = airtable_request(f"{USERS_TABLE}?{requests.compat.urlencode(params)}", {
-                'method': 'GET'
-            })
-            
-            page_records = page.get('records', [])
+    try:
+        for page_records in iter_user_pages():
+            batch_count += 1
             all_users.extend(page_records)
-            offset = page.get('offset')
             
             print(f"   ✅ Fetched {len(page_records)} users in batch {batch_count}")
             print(f"   📊 Total users so far: {len(all_users)}")
-            
-            if not offset:
-                break
-                
-            # Small delay to avoid rate limiting
-            time.sleep(0.1)
-                
-        except Exception as e:
-            print(f"❌ Error fetching batch {batch_count}: {e}")
-            break
+    except Exception as e:
+        print(f"❌ Error fetching batch {batch_count + 1}: {e}")
     
     print(f"\n🎯 Fetch Complete:")
     print(f"   Total batches: {batch_count}")
@@ -88,6 +104,23 @@ def fetch_all_users():
     
     return all_users
 
+def extract_user(user):
+    """Slack ID and contact fields of one user record"""
+    fields = user.get('fields', {})
+    
+    # Get various possible Slack ID field names
+    slack_id = next((fields[name] for name in SLACK_ID_FIELDS if fields.get(name)), None)
+    
+    return {
+        'record_id': user.get('id'),
+        'email': fields.get('email', 'No email'),
+        'first_name': fields.get('First Name', 'No first name'),
+        'last_name': fields.get('Last Name', 'No last name'),
+        'github_username': fields.get('github username', 'No GitHub'),
+        'slack_id': slack_id,
+        'has_slack_id': bool(slack_id)
+    }
+
 def extract_slack_ids(users):
     """Extract and analyze Slack IDs from user records"""
     print("\n📊 Slack ID Analysis")
@@ -97,31 +130,8 @@ def extract_slack_ids(users):
     slack_id_counts = defaultdict(int)
     
     for user in users:
-        fields = user.get('fields', {})
-        record_id = user.get('id')
-        
-        # Get various possible Slack ID field names
-        slack_id = (fields.get('slack id') or 
-                   fields.get('slack_id') or 
-                   fields.get('Slack ID') or 
-                   fields.get('SlackId') or
-                   fields.get('slackId'))
-        
-        # Get other user info
-        email = fields.get('email', 'No email')
-        first_name = fields.get('First Name', 'No first name')
-        last_name = fields.get('Last Name', 'No last name')
-        github_username = fields.get('github username', 'No GitHub')
-        
-        user_data = {
-            'record_id': record_id,
-            'email': email,
-            'first_name': first_name,
-            'last_name': last_name,
-            'github_username': github_username,
-            'slack_id': slack_id,
-            'has_slack_id': bool(slack_id)
-        }
+        user_data = extract_user(user)
+        slack_id = user_data['slack_id']
         
         slack_data.append(user_data)
         
@@ -208,36 +218,179 @@ def display_users_without_slack(users_without_slack, limit=20):
     if len(users_without_slack) > limit:
         print(f"    ... and {len(users_without_slack) - limit} more users without Slack IDs")
 
-def save_to_file(slack_data, users_with_slack, users_without_slack):
+def save_to_file(slack_data, users_with_slack, users_without_slack, formats=('json',), compress=False):
     """Save the data to files for easy access"""
-    import json
-    from datetime import datetime
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Save all user data
-    all_data_file = f"shiba_users_data_{timestamp}.json"
-    with open(all_data_file, 'w') as f:
-        json.dump(slack_data, f, indent=2)
-    print(f"\n💾 Saved complete user data to: {all_data_file}")
-    
-    # Save just Slack IDs
-    slack_ids_file = f"shiba_slack_ids_{timestamp}.txt"
-    with open(slack_ids_file, 'w') as f:
-        for user in users_with_slack:
-            f.write(f"{user['slack_id']}\n")
-    print(f"💾 Saved Slack IDs list to: {slack_ids_file}")
-    
-    # Save Slack IDs as CSV
-    slack_csv_file = f"shiba_slack_ids_{timestamp}.csv"
-    with open(slack_csv_file, 'w') as f:
-        f.write("slack_id,email,first_name,last_name,github_username,record_id\n")
-        for user in users_with_slack:
-            f.write(f"{user['slack_id']},{user['email']},{user['first_name']},{user['last_name']},{user['github_username']},{user['record_id']}\n")
-    print(f"💾 Saved Slack IDs CSV to: {slack_csv_file}")
+    with UserExporter(formats=formats, compress=compress) as exporter:
+        for user in slack_data:
+            exporter.write(user)
+    
+    for path in exporter.paths:
+        print(f"💾 Saved: {path}")
+
+def export_users(formats=('csv',), compress=False):
+    """Stream every user straight into the export files, without keeping the table in memory
+    
+    Returns:
+        dict: 'users', 'with_slack_id' and 'duplicate_slack_ids' (slack_id -> user count)
+    """
+    print("🔍 Exporting all users from Airtable...")
+    print("=" * 60)
+    
+    slack_id_counts = defaultdict(int)
+    with UserExporter(formats=formats, compress=compress) as exporter:
+        for batch_count, page_records in enumerate(iter_user_pages(), 1):
+            for record in page_records:
+                user = extract_user(record)
+                exporter.write(user)
+                if user['slack_id']:
+                    slack_id_counts[user['slack_id']] += 1
+            print(f"   ✅ Batch {batch_count}: {exporter.counts['users']} users exported")
+    
+    duplicates = {slack_id: count for slack_id, count in slack_id_counts.items() if count > 1}
+    print(f"\n🎯 Export Complete:")
+    print(f"   Total users: {exporter.counts['users']}")
+    print(f"   Users with Slack ID: {exporter.counts['with_slack_id']}")
+    if duplicates:
+        print(f"   ⚠️  Duplicate Slack IDs: {len(duplicates)}")
+    for path in exporter.paths:
+        print(f"💾 Saved: {path}")
+    
+    return dict(exporter.counts, duplicate_slack_ids=duplicates)
+
+class SlackIdSnapshot:
+    """Slack IDs by user record, kept current by fetching only users modified since the last sync
+    
+    Only the Slack ID fields are requested. Field names the Users table doesn't have are
+    dropped on the first sync (Airtable rejects unknown names) and remembered.
+    """
+    
+    def __init__(self, path=SLACK_ID_SNAPSHOT_FILE):
+        self.path = path
+        self.slack_ids = {}  # record_id -> Slack ID (users without one are left out)
+        self.fields = list(SLACK_ID_FIELDS)
+        self.last_sync = None
+        self.last_full_sync = None
+        
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                self.slack_ids = data.get('slack_ids', {})
+                self.fields = data.get('fields', self.fields)
+                self.last_sync = data.get('last_sync')
+                self.last_full_sync = data.get('last_full_sync')
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"  Warning: could not read Slack ID snapshot from {path}: {e}")
+    
+    def _needs_full_refresh(self):
+        if not self.last_sync or not self.last_full_sync:
+            return True
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(self.last_full_sync)
+        return age > timedelta(hours=FULL_REFRESH_HOURS)
+    
+    def _fetch(self, params):
+        """All matching user records, dropping projected fields Airtable says don't exist"""
+        while True:
+            try:
+                records = []
+                for page_records in iter_user_pages(dict(params, **{'fields[]': self.fields}), page_delay=0):
+                    records.extend(page_records)
+                return records
+            except Exception as e:
+                unknown = re.search(r'Unknown field name: \\?"([^"\\]+)', str(e))
+                if not unknown or unknown.group(1) not in self.fields or len(self.fields) == 1:
+                    raise
+                self.fields.remove(unknown.group(1))
+    
+    def sync(self, full=False):
+        """Fetch users changed since the last sync (or all of them when due) and diff their Slack IDs
+        
+        Returns:
+            dict: 'added' and 'removed' ([{record_id, slack_id}]), 'changed' ([{record_id, old, new}]),
+                  'full' and 'fetched'
+        """
+        full = full or self._needs_full_refresh()
+        sync_started = datetime.now(timezone.utc)
+        
+        params = {}
+        if not full:
+            since = datetime.fromisoformat(self.last_sync) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            params['filterByFormula'] = (
+                f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since.strftime('%Y-%m-%dT%H:%M:%S.000Z')}'))"
+            )
+        
+        records = self._fetch(params)
+        current = dict(self.slack_ids)
+        if full:
+            current = {}
+        for record in records:
+            slack_id = extract_user(record)['slack_id']
+            if slack_id:
+                current[record['id']] = slack_id
+            else:
+                current.pop(record['id'], None)
+        
+        delta = {
+            'added': [{'record_id': record_id, 'slack_id': slack_id}
+                      for record_id, slack_id in current.items() if record_id not in self.slack_ids],
+            'changed': [{'record_id': record_id, 'old': self.slack_ids[record_id], 'new': slack_id}
+                        for record_id, slack_id in current.items()
+                        if record_id in self.slack_ids and self.slack_ids[record_id] != slack_id],
+            'removed': [{'record_id': record_id, 'slack_id': slack_id}
+                        for record_id, slack_id in self.slack_ids.items() if record_id not in current],
+            'full': full,
+            'fetched': len(records)
+        }
+        
+        self.slack_ids = current
+        if full:
+            self.last_full_sync = sync_started.isoformat()
+        self.last_sync = sync_started.isoformat()
+        self.save()
+        return delta
+    
+    def save(self):
+        """Write the snapshot atomically"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_sync': self.last_sync,
+                'last_full_sync': self.last_full_sync,
+                'fields': self.fields,
+                'slack_ids': self.slack_ids
+            }, f)
+        os.replace(tmp_path, self.path)
 
-def main():
-    """Main function to fetch and display all Slack IDs"""
+def export_delta(full_refresh=False):
+    """Sync the Slack ID snapshot and save what was added, changed or removed since the last run"""
+    print("🔄 Syncing Slack IDs since the last run...")
+    print("=" * 60)
+    
+    snapshot = SlackIdSnapshot()
+    previous_sync = snapshot.last_sync
+    delta = snapshot.sync(full=full_refresh)
+    
+    kind = "full" if delta['full'] else "delta"
+    print(f"   Users fetched ({kind}): {delta['fetched']}")
+    print(f"   Slack IDs tracked: {len(snapshot.slack_ids)}")
+    print(f"   Added: {len(delta['added'])}  Changed: {len(delta['changed'])}  Removed: {len(delta['removed'])}")
+    
+    if delta['added'] or delta['changed'] or delta['removed']:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        delta_file = f"shiba_slack_ids_delta_{timestamp}.json"
+        with open(delta_file, 'w') as f:
+            json.dump(dict(delta, since=previous_sync), f, indent=2)
+        print(f"💾 Saved Slack ID changes to: {delta_file}")
+    else:
+        print("✅ No Slack ID changes since the last run")
+    
+    return delta
+
+# Display choices by name, for running without the prompt
+DISPLAY_OPTIONS = {'list': '1', 'missing': '2', 'details': '3'}
+
+def main(display=None):
+    """Main function to fetch and display all Slack IDs (display: one of DISPLAY_OPTIONS skips the prompt)"""
     print("🚀 Shiba Slack ID Fetcher")
     print("=" * 60)
     
@@ -261,11 +414,14 @@ def main():
         print("2. Simple list + users without Slack IDs")
         print("3. Detailed information + save to files")
         
-        try:
-            choice = input("Enter your choice (1, 2, or 3): ").strip()
-        except KeyboardInterrupt:
-            print("\n❌ Operation cancelled by user")
-            return
+        if display:
+            choice = DISPLAY_OPTIONS[display]
+        else:
+            try:
+                choice = input("Enter your choice (1, 2, or 3): ").strip()
+            except KeyboardInterrupt:
+                print("\n❌ Operation cancelled by user")
+                return
         
         # Display based on choice
         if choice == "1":
@@ -291,4 +447,20 @@ def main():
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Fetch Slack IDs from the Users table")
+    parser.add_argument('--export', nargs='+', choices=EXPORT_FORMATS, metavar='FORMAT',
+                        help=f"Stream every user to files in these formats ({', '.join(EXPORT_FORMATS)}) "
+                             "without the interactive menu")
+    parser.add_argument('--gzip', action='store_true', help="Gzip the exported files")
+    parser.add_argument('--delta', action='store_true',
+                        help="Fetch only users modified since the last --delta run and save the Slack ID changes")
+    parser.add_argument('--full-refresh', action='store_true', help="With --delta, refetch every user")
+    parser.add_argument('--display', choices=list(DISPLAY_OPTIONS), help="Show this display option without prompting")
+    args = parser.parse_args()
+    
+    if args.delta:
+        export_delta(full_refresh=args.full_refresh)
+    elif args.export:
+        export_users(formats=args.export, compress=args.gzip)
+    else:
+        main(display=args.display)
@@ -0,0 +1,16 @@
+"""
+Keep-alive HTTP sessions shared by the playtest scripts
+Every script's airtable_request goes through the calling thread's session, so tools
+run one after another in the same process (see playtestCli.py) reuse warm connections
+"""
+
+import threading
+import requests
+
+_local = threading.local()
+
+def get_session():
+    """The calling thread's requests session (requests sessions aren't thread-safe)"""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
@@ -1,10 +1,15 @@
 import os
 from dotenv import load_dotenv
 import requests
-import random
+import argparse
+import json
 import time
 import uuid
-from collections import defaultdict
+from datetime import datetime
+
+from assignment import get_eligible_records, solve_assignment, SOLVERS
+from airtable_batch import AirtableBatchWriter
+from http_session import get_session
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,9 +19,12 @@ AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
 AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
 
 # Airtable configuration
-AIRTABLE_API_BASE = 'https://api.airtable.com/v0'
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
 PLAYTEST_TICKETS_TABLE = 'PlaytestTickets'
 
+# Namespace for deterministic PlaytestIds (see playtest_idempotency_key)
+PLAYTEST_ID_NAMESPACE = uuid.UUID('6f1c0c52-3d1e-4c8e-9a57-5b0f3f0e2a61')
+
 def airtable_request(path, options=None):
     """Make a request to the Airtable API"""
     if options is None:
@@ -33,7 +41,7 @@ def airtable_request(path, options=None):
     if 'headers' in options:
         headers.update(options['headers'])
     
-    response = requests.request(
+    response = get_session().request(
         method=options.get('method', 'GET'),
         url=url,
         headers=headers,
@@ -46,50 +54,78 @@ def airtable_request(path, options=None):
     
     return response.json()
 
-def createPlaytest(gameToTest, userToPlayGame):
+def playtest_idempotency_key(player_user_id, game_id):
+    """Deterministic PlaytestId for a (player, game) pair, the same on every run"""
+    return str(uuid.uuid5(PLAYTEST_ID_NAMESPACE, f"{player_user_id}:{game_id}"))
+
+def fetch_existing_playtest_pairs():
+    """Load the (Player, GameToTest) pairs that already have a ticket
+    
+    Only the two linked fields are requested, so pages stay small.
+    """
+    existing_pairs = set()
+    offset = None
+    
+    while True:
+        params = {'pageSize': 100, 'fields[]': ['Player', 'GameToTest']}
+        if offset:
+            params['offset'] = offset
+        
+        page = airtable_request(PLAYTEST_TICKETS_TABLE, {
+            'method': 'GET',
+            'params': params
+        })
+        
+        for record in page.get('records', []):
+            fields = record.get('fields', {})
+            if fields.get('Player') and fields.get('GameToTest'):
+                existing_pairs.add((fields['Player'][0], fields['GameToTest'][0]))
+        
+        offset = page.get('offset')
+        if not offset:
+            break
+    
+    return existing_pairs
+
+def create_playtests_bulk(assignments, max_workers=3):
     """
-    Create a new playtest ticket record
+    Create playtest tickets for a finished assignment in 10-record batches
+    
+    Each ticket's PlaytestId is derived from its (player, game) pair and written with
+    an upsert on PlaytestId, so a rerun never creates a second ticket for a pair.
     
     Args:
-        gameToTest (str): The record ID of the game to test
-        userToPlayGame (str): The record ID of the user who will play the game
+        assignments (list): Assignment records (models.Assignment)
+        max_workers (int): Batches in flight at once (requests stay under the rate limit)
     
     Returns:
-        dict: The created record
+        dict: Batch report with 'created', 'failed' and 'requests'
     """
-    # Generate a unique PlaytestId
-    playtest_id = str(uuid.uuid4())
-    
-    # Prepare the record data
-    record_data = {
-        "fields": {
-            "PlaytestId": playtest_id,
-            "GameToTest": [gameToTest],  # Linked record to Game
-            "Player": [userToPlayGame]   # Linked record to User
-        }
-    }
+    field_sets = [{
+        "PlaytestId": playtest_idempotency_key(assignment.player_user_id, assignment.game_id),
+        "GameToTest": [assignment.game_id],  # Linked record to Game
+        "Player": [assignment.player_user_id]   # Linked record to User
+    } for assignment in assignments]
+    
+    print(f"  🎫 Creating {len(field_sets)} playtest tickets in batches of 10...")
+    start = time.time()
+    report = AirtableBatchWriter(PLAYTEST_TICKETS_TABLE, max_workers=max_workers).upsert(
+        field_sets, merge_on=['PlaytestId']
+    )
     
-    print(f"  🎫 Creating playtest ticket...")
-    print(f"    PlaytestId: {playtest_id}")
-    print(f"    GameToTest: {gameToTest}")
-    print(f"    Player: {userToPlayGame}")
+    print(f"    ✅ Created: {len(report['created'])}")
+    print(f"    ♻️  Already existed: {len(report['updated'])}")
+    print(f"    ❌ Failed: {len(report['failed'])}")
+    print(f"    📨 Requests: {report['requests']} in {time.time() - start:.1f}s")
     
-    try:
-        # Create the record
-        response = airtable_request(PLAYTEST_TICKETS_TABLE, {
-            'method': 'POST',
-            'json': record_data
-        })
-        
-        created_record = response.get('records', [{}])[0]
-        print(f"    ✅ Playtest ticket created successfully!")
-        print(f"    Record ID: {created_record.get('id')}")
-        
-        return created_record
-        
-    except Exception as e:
-        print(f"    ❌ Error creating playtest ticket: {e}")
-        raise
+    if report['failed']:
+        # Keep the failures so they can be inspected and re-created later
+        report_file = f"failed_playtests_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_file, 'w') as f:
+            json.dump(report['failed'], f, indent=2)
+        print(f"    💾 Saved failed tickets to: {report_file}")
+    
+    return report
 
 def fetch_all_ysws_records():
     """Fetch all records from the Active YSWS Record table"""
@@ -119,192 +155,50 @@ def fetch_all_ysws_records():
     
     return all_records
 
-def visualize_circular_assignment(simulation_mode=False):
-    """Visualize the circular assignment algorithm step by step"""
+def visualize_circular_assignment(simulation_mode=False, solver='matching', seed=None):
+    """Compute playtest assignments with the chosen solver, then create the tickets
+    
+    Args:
+        simulation_mode (bool): Only show what would be created
+        solver (str): Assignment solver name from assignment.SOLVERS
+        seed (int): Seed for reproducible assignments (random when None)
+    """
     mode_text = "SIMULATION" if simulation_mode else "LIVE"
-    print(f"🎯 Circular Assignment Algorithm Visualization ({mode_text})")
+    print(f"🎯 Playtest Assignment ({mode_text}, {solver} solver)")
     print("=" * 60)
     
     # Fetch data
     records = fetch_all_ysws_records()
+    eligible_records = get_eligible_records(records)
+    total_slots = sum(record.tickets_needed for record in eligible_records)
     
-    # Filter records with TicketsNeeded > 0
-    eligible_records = []
-    for record in records:
-        fields = record.get('fields', {})
-        tickets_needed = fields.get('TicketsNeeded', 0)
-        if tickets_needed > 0:
-            eligible_records.append({
-                'record_id': record.get('id'),
-                'user_id': fields.get('User', [None])[0] if fields.get('User') else None,
-                'game_id': fields.get('Game', [None])[0] if fields.get('Game') else None,
-                'game_name': fields.get('Game Name', ['Unknown'])[0] if fields.get('Game Name') else 'Unknown',
-                'email': fields.get('Email', 'Unknown'),
-                'tickets_needed': tickets_needed
-            })
-    
-    # Create circular lists
-    games_needing_playtests = []
-    players_available = []
-    
-    for record in eligible_records:
-        # Add games to the pool
-        for _ in range(record['tickets_needed']):
-            games_needing_playtests.append({
-                'game_id': record['game_id'],
-                'game_name': record['game_name'],
-                'owner_user_id': record['user_id'],
-                'owner_email': record['email']
-            })
-        
-        # Add players to the pool (each person should play tickets_needed games)
-        for _ in range(record['tickets_needed']):
-            players_available.append({
-                'user_id': record['user_id'],
-                'email': record['email']
-            })
+    # Pairs from earlier runs are excluded up front, so reruns never duplicate tickets
+    existing_pairs = fetch_existing_playtest_pairs()
     
     print(f"📊 Setup:")
-    print(f"  Games needing playtests: {len(games_needing_playtests)}")
-    print(f"  Players available: {len(players_available)}")
+    print(f"  Games needing playtests: {total_slots}")
+    print(f"  Players available: {total_slots}")
+    print(f"  Existing player-game pairs: {len(existing_pairs)}")
     if simulation_mode:
         print(f"  🎭 Running in SIMULATION mode - no tickets will be created")
     print()
     
-    # Shuffle both lists
-    random.shuffle(games_needing_playtests)
-    random.shuffle(players_available)
-    
-    # Create circular assignment visualization
-    assignments = []
-    game_index = 0
-    player_index = 0
-    attempts = 0
-    max_attempts = len(players_available) * 2  # Prevent infinite loops
-    
-    print("🔄 Circular Assignment Process:")
+    print("🔄 Assignment Process:")
     print("=" * 60)
     
-    while game_index < len(games_needing_playtests) and attempts < max_attempts:
-        current_game = games_needing_playtests[game_index]
-        attempts += 1
-        
-        # Find next available player in circular fashion
-        original_player_index = player_index
-        found_player = False
-        
-        print(f"\n🎮 Game {game_index + 1}: {current_game['game_name']} (by {current_game['owner_email']})")
-        print(f"   Looking for player...")
-        
-        # Try to find a suitable player by moving through the circle
-        while player_index < len(players_available) and not found_player:
-            current_player = players_available[player_index]
-            
-            # Check if this player is suitable
-            if (current_player['user_id'] != current_game['owner_user_id'] and 
-                current_player['user_id'] is not None):
-                
-                # Check if this player already has this game assigned
-                already_assigned = any(
-                    a['player_user_id'] == current_player['user_id'] and 
-                    a['game_id'] == current_game['game_id'] 
-                    for a in assignments
-                )
-                
-                if not already_assigned:
-                    # Found a suitable player!
-                    assignments.append({
-                        'game_id': current_game['game_id'],
-                        'game_name': current_game['game_name'],
-                        'owner_email': current_game['owner_email'],
-                        'player_email': current_player['email'],
-                        'player_user_id': current_player['user_id']
-                    })
-                    
-                    print(f"   ✅ Found: {current_player['email']}")
-                    print(f"   📍 Player index: {player_index}")
-                    
-                    # Actually create the playtest ticket (only if not in simulation mode)
-                    if not simulation_mode:
-                        try:
-                            created_ticket = createPlaytest(current_game['game_id'], current_player['user_id'])
-                            print(f"   🎫 Created ticket: {created_ticket.get('id')}")
-                        except Exception as e:
-                            print(f"   ❌ Failed to create ticket: {e}")
-                    else:
-                        print(f"   🎫 [SIMULATION] Would create ticket for {current_player['email']} → {current_game['game_name']}")
-                    
-                    found_player = True
-                    game_index += 1
-                    player_index += 1  # Move to next player for next game
-                else:
-                    print(f"   ⚠️  {current_player['email']} already has this game")
-                    player_index += 1
-            else:
-                if current_player['user_id'] == current_game['owner_user_id']:
-                    print(f"   ❌ {current_player['email']} is the owner (skip)")
-                else:
-                    print(f"   ❌ {current_player['email']} has no user_id (skip)")
-                player_index += 1
-        
-        # If we went through all players and didn't find one, wrap around
-        if not found_player:
-            if player_index >= len(players_available):
-                print(f"   🔄 Wrapping around to start of player list")
-                player_index = 0
-                
-                # Try one more time through the list
-                while player_index < original_player_index and not found_player:
-                    current_player = players_available[player_index]
-                    
-                    if (current_player['user_id'] != current_game['owner_user_id'] and 
-                        current_player['user_id'] is not None):
-                        
-                        already_assigned = any(
-                            a['player_user_id'] == current_player['user_id'] and 
-                            a['game_id'] == current_game['game_id'] 
-                            for a in assignments
-                        )
-                        
-                        if not already_assigned:
-                            assignments.append({
-                                'game_id': current_game['game_id'],
-                                'game_name': current_game['game_name'],
-                                'owner_email': current_game['owner_email'],
-                                'player_email': current_player['email'],
-                                'player_user_id': current_player['user_id']
-                            })
-                            
-                            print(f"   ✅ Found on wrap-around: {current_player['email']}")
-                            print(f"   📍 Player index: {player_index}")
-                            
-                            # Actually create the playtest ticket (only if not in simulation mode)
-                            if not simulation_mode:
-                                try:
-                                    created_ticket = createPlaytest(current_game['game_id'], current_player['user_id'])
-                                    print(f"   🎫 Created ticket: {created_ticket.get('id')}")
-                                except Exception as e:
-                                    print(f"   ❌ Failed to create ticket: {e}")
-                            else:
-                                print(f"   🎫 [SIMULATION] Would create ticket for {current_player['email']} → {current_game['game_name']}")
-                            
-                            found_player = True
-                            game_index += 1
-                            player_index += 1
-                        else:
-                            player_index += 1
-                    else:
-                        player_index += 1
-                
-                if not found_player:
-                    print(f"   ❌ Could not find suitable player after full circle")
-                    game_index += 1  # Skip this game
-                    player_index = original_player_index + 1  # Try next player for next game
+    state = solve_assignment(eligible_records, solver=solver, seed=seed, existing_pairs=existing_pairs)
+    assignments = state.assignments
+    
+    # Create the tickets once the whole assignment is known (only if not in simulation mode)
+    if not simulation_mode:
+        create_playtests_bulk(assignments)
+    else:
+        for assignment in assignments:
+            print(f"   🎫 [SIMULATION] Would create ticket for {assignment.player_email} → {assignment.game_name}")
     
     print(f"\n🎯 Assignment Results:")
     print(f"  Successful assignments: {len(assignments)}")
-    print(f"  Games processed: {game_index}")
-    print(f"  Total attempts: {attempts}")
+    print(f"  Unfilled slots: {sum(state.unfilled.values())} across {len(state.unfilled)} games")
     if simulation_mode:
         print(f"  🎭 SIMULATION MODE - No actual tickets were created")
     
@@ -312,45 +206,55 @@ def visualize_circular_assignment(simulation_mode=False):
     print(f"\n📋 Assignments Made:")
     print("-" * 60)
     for i, assignment in enumerate(assignments[:20]):  # Show first 20
-        print(f"{i+1:2d}. {assignment['player_email'][:25]:<25} → {assignment['game_name']}")
+        print(f"{i+1:2d}. {assignment.player_email[:25]:<25} → {assignment.game_name}")
     
     if len(assignments) > 20:
         print(f"    ... and {len(assignments) - 20} more assignments")
     
-    # Analyze distribution
-    print(f"\n⚖️  Distribution Analysis:")
-    player_counts = defaultdict(int)
-    game_counts = defaultdict(int)
+    print_distribution(state)
     
-    for assignment in assignments:
-        player_counts[assignment['player_email']] += 1
-        game_counts[assignment['game_name']] += 1
+    return assignments
+
+def print_distribution(state):
+    """Print the per-player and per-game load from the assignment counters"""
+    print(f"\n⚖️  Distribution Analysis:")
+    player_emails = {}
+    game_names = {}
+    for assignment in state.assignments:
+        player_emails[assignment.player_user_id] = assignment.player_email
+        game_names[assignment.game_id] = assignment.game_name
     
     print(f"  Top 10 players by assignments:")
-    for email, count in sorted(player_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
-        print(f"    {email[:30]:<30}: {count} assignments")
+    for user_id, count in sorted(state.player_load.items(), key=lambda x: x[1], reverse=True)[:10]:
+        print(f"    {player_emails[user_id][:30]:<30}: {count} assignments")
     
     print(f"\n  Games and their playtest counts:")
-    for game_name, count in sorted(game_counts.items(), key=lambda x: x[1], reverse=True):
-        print(f"    {game_name[:30]:<30}: {count} playtests")
-    
-    return assignments
+    for game_id, count in sorted(state.game_load.items(), key=lambda x: x[1], reverse=True):
+        print(f"    {game_names[game_id][:30]:<30}: {count} playtests")
 
-def main():
-    """Main function to run the visualization and create tickets"""
-    print("🚀 Starting Circular Assignment with Real Ticket Creation")
+def main(solver='matching', seed=None, simulate=False, live=False):
+    """Main function to run the visualization and create tickets
+    
+    With simulate=True no confirmation is asked for and nothing is created; with
+    live=True tickets are created without asking. For offline runs on synthetic
+    pools, use benchmarkAssignment.py instead.
+    """
+    print("🚀 Starting Playtest Assignment with Real Ticket Creation")
     print("=" * 60)
     
     # Ask for confirmation before creating tickets
-    response = input("Do you want to create actual playtest tickets? (yes/no): ")
-    simulation_mode = response.lower() != 'yes'
+    if simulate or live:
+        simulation_mode = not live
+    else:
+        response = input("Do you want to create actual playtest tickets? (yes/no): ")
+        simulation_mode = response.lower() != 'yes'
     
     if simulation_mode:
         print("🎭 Running in SIMULATION mode - no tickets will be created")
     else:
         print("✅ Running in LIVE mode - tickets will be created")
     
-    assignments = visualize_circular_assignment(simulation_mode=simulation_mode)
+    assignments = visualize_circular_assignment(simulation_mode=simulation_mode, solver=solver, seed=seed)
     
     print(f"\n🎯 Summary:")
     print(f"  Total assignments processed: {len(assignments)}")
@@ -372,4 +276,13 @@ def main():
         print(f"  🎭 SIMULATION MODE - Skipping ticket count check")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Assign playtest tickets")
+    parser.add_argument('--solver', choices=list(SOLVERS), default='matching',
+                        help="Assignment algorithm (default: matching)")
+    parser.add_argument('--seed', type=int, help="Seed for reproducible assignments")
+    parser.add_argument('--simulate', action='store_true',
+                        help="Run in simulation mode without prompting (no tickets are created)")
+    parser.add_argument('--live', action='store_true', help="Create tickets without prompting")
+    args = parser.parse_args()
+    
+    main(solver=args.solver, seed=args.seed, simulate=args.simulate, live=args.live and not args.simulate)
@@ -0,0 +1,137 @@
+"""
+Compact records for the Airtable rows the playtest scripts keep in memory
+Classes use __slots__ (no per-instance dict) and Airtable IDs are interned, so
+large pools hold one small object per row and share every repeated ID string
+"""
+
+import sys
+
+def intern_id(value):
+    """Interned copy of an Airtable ID (None and non-strings pass through)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def intern_ids(values):
+    """Linked-record field as a list of interned IDs"""
+    return [intern_id(value) for value in values or ()]
+
+class EligibleRecord:
+    """Active YSWS record that still needs tickets"""
+
+    __slots__ = ('record_id', 'user_id', 'game_id', 'game_name', 'email', 'tickets_needed')
+
+    def __init__(self, record_id, user_id, game_id, game_name, email, tickets_needed):
+        self.record_id = intern_id(record_id)
+        self.user_id = intern_id(user_id)
+        self.game_id = intern_id(game_id)
+        self.game_name = game_name
+        self.email = email
+        self.tickets_needed = tickets_needed
+
+    @classmethod
+    def from_airtable(cls, record):
+        """Build from a raw YSWS Airtable record"""
+        fields = record.get('fields', {})
+        return cls(
+            record_id=record.get('id'),
+            user_id=fields.get('User', [None])[0] if fields.get('User') else None,
+            game_id=fields.get('Game', [None])[0] if fields.get('Game') else None,
+            game_name=fields.get('Game Name', ['Unknown'])[0] if fields.get('Game Name') else 'Unknown',
+            email=fields.get('Email', 'Unknown'),
+            tickets_needed=fields.get('TicketsNeeded', 0)
+        )
+
+    def __repr__(self):
+        return f"EligibleRecord({self.record_id!r}, game={self.game_id!r}, tickets_needed={self.tickets_needed})"
+
+class GameSlots:
+    """A game's ticket slots; count is how many playtests it still needs"""
+
+    __slots__ = ('game_id', 'game_name', 'owner_user_id', 'owner_email', 'count')
+
+    def __init__(self, game_id, game_name, owner_user_id, owner_email, count=1):
+        self.game_id = intern_id(game_id)
+        self.game_name = game_name
+        self.owner_user_id = intern_id(owner_user_id)
+        self.owner_email = owner_email
+        self.count = count
+
+    def __repr__(self):
+        return f"GameSlots({self.game_id!r}, {self.game_name!r}, count={self.count})"
+
+class PlayerSlots:
+    """A player's ticket slots; count is how many games they should play"""
+
+    __slots__ = ('user_id', 'email', 'count')
+
+    def __init__(self, user_id, email, count=1):
+        self.user_id = intern_id(user_id)
+        self.email = email
+        self.count = count
+
+    def __repr__(self):
+        return f"PlayerSlots({self.user_id!r}, {self.email!r}, count={self.count})"
+
+class Assignment:
+    """One player assigned to playtest one game"""
+
+    __slots__ = ('game_id', 'game_name', 'owner_email', 'player_email', 'player_user_id')
+
+    def __init__(self, game_id, game_name, owner_email, player_email, player_user_id):
+        self.game_id = game_id
+        self.game_name = game_name
+        self.owner_email = owner_email
+        self.player_email = player_email
+        self.player_user_id = player_user_id
+
+    def __repr__(self):
+        return f"Assignment({self.player_email!r} -> {self.game_name!r})"
+
+class PlaytestRecord:
+    """PlaytestTickets row as used for challenge generation
+
+    Linked-record and lookup fields (game_to_test, player, game_name, player_email,
+    owner_email) stay lists, as Airtable returns them and the prompts show them.
+    """
+
+    __slots__ = ('record_id', 'playtest_id', 'game_to_test', 'player', 'status', 'feedback',
+                 'fun_score', 'art_score', 'creativity_score', 'audio_score', 'mood_score',
+                 'sss_awarded', 'playtime_seconds', 'created_time', 'game_name', 'player_email',
+                 'owner_email', 'has_existing_challenges')
+
+    def __init__(self, record_id, fields):
+        self.record_id = intern_id(record_id)
+        self.playtest_id = fields.get('PlaytestId', 'Unknown')
+        self.game_to_test = intern_ids(fields.get('GameToTest'))
+        self.player = intern_ids(fields.get('Player'))
+        self.status = intern_id(fields.get('status', ''))
+        self.feedback = fields.get('Feedback', '')
+        self.fun_score = fields.get('Fun Score', '')
+        self.art_score = fields.get('Art Score', '')
+        self.creativity_score = fields.get('Creativity Score', '')
+        self.audio_score = fields.get('Audio Score', '')
+        self.mood_score = fields.get('Mood Score', '')
+        self.sss_awarded = fields.get('SSSAwarded', '')
+        self.playtime_seconds = fields.get('Playtime Seconds', '')
+        self.created_time = fields.get('Created At', '')
+        self.game_name = fields.get('Game Name', [])
+        self.player_email = fields.get('PlayerEmail', [])
+        self.owner_email = fields.get('ownerEmail', [])
+        self.has_existing_challenges = bool(fields.get('Challenges'))
+
+    @classmethod
+    def from_airtable(cls, record):
+        """Build from a raw PlaytestTickets Airtable record"""
+        return cls(record.get('id'), record.get('fields', {}))
+
+    def scores(self):
+        """Score fields as passed to the challenge prompts"""
+        return {
+            'fun_score': self.fun_score,
+            'art_score': self.art_score,
+            'creativity_score': self.creativity_score,
+            'audio_score': self.audio_score,
+            'mood_score': self.mood_score
+        }
+
+    def __repr__(self):
+        return f"PlaytestRecord({self.record_id!r}, status={self.status!r})"
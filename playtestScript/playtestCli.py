@@ -0,0 +1,184 @@
+"""
+Non-interactive entry point for the playtest tools
+One subcommand per tool with flags for what its prompts used to ask, plus `run`,
+which runs the pipeline stages back to back on a schedule in a single process so
+the HTTP sessions, LLM response cache and similarity index stay warm between cycles
+
+Examples:
+    python playtestCli.py assign --live
+    python playtestCli.py challenges --mode generate
+    python playtestCli.py slack-ids --export csv ndjson --gzip
+    python playtestCli.py run --interval 3600 --live
+"""
+
+import argparse
+import importlib
+import time
+from datetime import datetime
+
+from assignment import SOLVERS
+from user_export import EXPORT_FORMATS
+
+# Pipeline stages in the order `run` executes them
+STAGES = ('dedupe', 'assign', 'challenges', 'audit', 'slack-ids')
+
+def tool(name):
+    """Import a tool module on first use (so e.g. slack-ids doesn't need openai installed)"""
+    return importlib.import_module(name)
+
+def run_assign(args):
+    tool('main').main(solver=args.solver, seed=args.seed, simulate=not args.live, live=args.live)
+
+def run_challenges(args):
+    tool('generateChallenges').main(batched=not args.sequential, prefilter_threshold=args.prefilter_threshold,
+                                    mode=args.mode)
+
+def run_dedupe(args):
+    remove_duplicates = tool('remove_duplicates')
+    if args.apply:
+        remove_duplicates.apply_delete_plan(args.apply, confirm=not args.yes)
+    else:
+        remove_duplicates.main(simulate=not args.live)
+
+def run_audit(args):
+    tool('fetchChallenges').main(max_not_submitted=args.max_not_submitted, full_audit=args.full,
+                                 json_path=args.json, csv_path=args.csv)
+
+def run_slack_ids(args):
+    get_slack_ids = tool('getSlackIds')
+    if args.delta:
+        get_slack_ids.export_delta(full_refresh=args.full_refresh)
+    elif args.export:
+        get_slack_ids.export_users(formats=args.export, compress=args.gzip)
+    else:
+        get_slack_ids.main(display=args.display)
+
+def stage_args(stage, live):
+    """Arguments for one stage of a scheduled run
+
+    Simulated runs only analyze; live runs delete duplicates, create tickets and
+    generate challenges. Slack IDs are always synced as a delta.
+    """
+    return {
+        'dedupe': argparse.Namespace(apply=None, yes=False, live=live),
+        'assign': argparse.Namespace(solver='matching', seed=None, live=live),
+        'challenges': argparse.Namespace(sequential=False, prefilter_threshold=None,
+                                         mode='generate' if live else 'summary'),
+        'audit': argparse.Namespace(max_not_submitted=3, full=False, json=None, csv=None),
+        'slack-ids': argparse.Namespace(delta=True, full_refresh=False, export=None, gzip=False, display=None),
+    }[stage]
+
+COMMANDS = {
+    'assign': run_assign,
+    'challenges': run_challenges,
+    'dedupe': run_dedupe,
+    'audit': run_audit,
+    'slack-ids': run_slack_ids,
+}
+
+def run_pipeline(stages=STAGES, live=False, interval=None, cycles=1):
+    """Run the stages back to back, then again every `interval` seconds
+
+    Args:
+        stages (list): Stage names from STAGES, run in this order
+        live (bool): Make changes in Airtable (otherwise stages only simulate or analyze)
+        interval (float): Seconds from the start of one cycle to the next (None runs once)
+        cycles (int): Cycles to run, 0 for no limit
+
+    Returns:
+        list: One dict per stage run with 'cycle', 'stage', 'seconds' and 'error'
+    """
+    history = []
+    cycle = 0
+
+    try:
+        while True:
+            cycle += 1
+            cycle_started = time.time()
+            print(f"\n⏱️  Pipeline cycle {cycle} started at {datetime.now().isoformat(timespec='seconds')}")
+            print("=" * 60)
+
+            for stage in stages:
+                print(f"\n▶️  Stage: {stage}")
+                stage_started = time.time()
+                error = None
+                try:
+                    COMMANDS[stage](stage_args(stage, live))
+                except Exception as e:
+                    # One failing stage shouldn't stop the rest of the pipeline
+                    error = str(e)
+                    print(f"❌ Stage {stage} failed: {e}")
+                history.append({'cycle': cycle, 'stage': stage, 'seconds': time.time() - stage_started,
+                                'error': error})
+
+            print(f"\n⏱️  Cycle {cycle} finished in {time.time() - cycle_started:.1f}s")
+            for entry in history[-len(stages):]:
+                status = f"❌ {entry['error']}" if entry['error'] else "✅"
+                print(f"  {entry['stage']:<12} {entry['seconds']:>7.1f}s  {status}")
+
+            if interval is None or (cycles and cycle >= cycles):
+                break
+            wait = max(0.0, interval - (time.time() - cycle_started))
+            print(f"\n💤 Next cycle in {wait:.0f}s")
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        print("\n🛑 Pipeline stopped")
+
+    return history
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the playtest tools without interactive prompts")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    assign = subparsers.add_parser('assign', help="Assign playtest tickets (main.py)")
+    assign.add_argument('--solver', choices=list(SOLVERS), default='matching',
+                        help="Assignment algorithm (default: matching)")
+    assign.add_argument('--seed', type=int, help="Seed for reproducible assignments")
+    assign.add_argument('--live', action='store_true', help="Create tickets (default: simulate)")
+
+    challenges = subparsers.add_parser('challenges', help="Analyze playtests and generate challenges (generateChallenges.py)")
+    challenges.add_argument('--mode', choices=['summary', 'details', 'generate', 'analytics'], default='summary',
+                            help="What to run (default: summary)")
+    challenges.add_argument('--sequential', action='store_true',
+                            help="One OpenAI request per playtest instead of one per game")
+    challenges.add_argument('--prefilter-threshold', type=float,
+                            help="Skip the LLM for feedback predicted actionable below this probability (0 disables)")
+
+    dedupe = subparsers.add_parser('dedupe', help="Find and remove duplicate tickets (remove_duplicates.py)")
+    dedupe.add_argument('--live', action='store_true', help="Delete duplicates (default: simulate and save a plan)")
+    dedupe.add_argument('--apply', metavar='PLAN_FILE', help="Delete the tickets in a saved plan file")
+    dedupe.add_argument('--yes', action='store_true', help="With --apply, don't ask for confirmation")
+
+    audit = subparsers.add_parser('audit', help="Check per-user challenge limits (fetchChallenges.py)")
+    audit.add_argument('--max-not-submitted', type=int, default=3,
+                       help="'Not Submitted' challenges allowed per user (default 3)")
+    audit.add_argument('--full', action='store_true', help="Stream the whole Challenges table in one pass")
+    audit.add_argument('--json', metavar='FILE', help="Write the audit report as JSON")
+    audit.add_argument('--csv', metavar='FILE', help="Write every violator's challenges as CSV")
+
+    slack_ids = subparsers.add_parser('slack-ids', help="Fetch or export Slack IDs (getSlackIds.py)")
+    slack_ids.add_argument('--display', choices=['list', 'missing', 'details'], default='list',
+                           help="What to show (default: list)")
+    slack_ids.add_argument('--export', nargs='+', choices=EXPORT_FORMATS, metavar='FORMAT',
+                           help="Stream every user to files in these formats")
+    slack_ids.add_argument('--gzip', action='store_true', help="Gzip the exported files")
+    slack_ids.add_argument('--delta', action='store_true', help="Fetch only users modified since the last delta run")
+    slack_ids.add_argument('--full-refresh', action='store_true', help="With --delta, refetch every user")
+
+    run = subparsers.add_parser('run', help="Run the pipeline stages back to back, optionally on a schedule")
+    run.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                     help=f"Stages to run, in order (default: {' '.join(STAGES)})")
+    run.add_argument('--live', action='store_true',
+                     help="Delete duplicates, create tickets and generate challenges (default: simulate/analyze only)")
+    run.add_argument('--interval', type=float, metavar='SECONDS',
+                     help="Repeat every SECONDS in this process (default: run once)")
+    run.add_argument('--cycles', type=int, default=0, help="With --interval, stop after this many cycles (0 = forever)")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_pipeline(stages=args.stages, live=args.live, interval=args.interval, cycles=args.cycles)
+    else:
+        COMMANDS[args.command](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Columnar view of the PlaytestTickets table
+One NumPy array per field, with games, players and statuses stored as integer
+codes into category lists, so season-wide analytics run as vectorized aggregates
+"""
+
+import numpy as np
+
+# Score columns: dataset attribute -> PlaytestTickets field
+SCORE_FIELDS = {
+    'fun': 'Fun Score',
+    'art': 'Art Score',
+    'creativity': 'Creativity Score',
+    'audio': 'Audio Score',
+    'mood': 'Mood Score',
+}
+
+def _number(value):
+    """Airtable number (or numeric string) as float, NaN when empty"""
+    if value is None or value == '':
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _first(value):
+    """First ID of a linked-record field, None when empty"""
+    return value[0] if value else None
+
+def _encode(values):
+    """Integer codes and the category list for a column of hashable values (None -> -1)"""
+    categories = []
+    index = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = -1
+            continue
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(categories)
+            categories.append(value)
+        codes[i] = code
+    return codes, categories
+
+def grouped_percentiles(codes, values, group_count, percentiles):
+    """Per-group percentiles (linear interpolation) of values, ignoring NaN, without a loop over groups
+
+    Returns:
+        ndarray: (group_count, len(percentiles)), NaN for groups without values
+    """
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes = codes[valid]
+    values = values[valid]
+    result = np.full((group_count, len(percentiles)), np.nan)
+    if not len(values):
+        return result
+
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+
+    for column, percentile in enumerate(percentiles):
+        position = starts[present] + (counts[present] - 1) * percentile / 100.0
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        result[present, column] = sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+    return result
+
+class PlaytestDataset:
+    """PlaytestTickets rows as parallel arrays
+
+    Attributes:
+        record_ids (list): Airtable record ID per row
+        game_codes, player_codes, status_codes (ndarray): Codes into games, players, statuses (-1 = missing)
+        games, players, statuses (list): Category values
+        game_names (list): Display name per entry in games
+        fun, art, creativity, audio, mood (ndarray): Scores as float, NaN when missing
+        playtime_seconds, sss_awarded (ndarray): Floats, NaN when missing
+        has_feedback, has_challenges (ndarray): Booleans
+    """
+
+    def __init__(self, records):
+        fields = [record.get('fields', {}) for record in records]
+        self.record_ids = [record.get('id') for record in records]
+
+        self.game_codes, self.games = _encode([_first(f.get('GameToTest')) for f in fields])
+        self.game_names = list(self.games)
+        for code, f in zip(self.game_codes, fields):
+            if code >= 0 and f.get('Game Name') and self.game_names[code] == self.games[code]:
+                self.game_names[code] = f['Game Name'][0]
+        self.player_codes, self.players = _encode([_first(f.get('Player')) for f in fields])
+        self.status_codes, self.statuses = _encode([f.get('status') or None for f in fields])
+
+        for name, field in SCORE_FIELDS.items():
+            setattr(self, name, np.array([_number(f.get(field)) for f in fields], dtype=np.float64))
+        self.playtime_seconds = np.array([_number(f.get('Playtime Seconds')) for f in fields], dtype=np.float64)
+        self.sss_awarded = np.array([_number(f.get('SSSAwarded')) for f in fields], dtype=np.float64)
+
+        self.has_feedback = np.array([bool((f.get('Feedback') or '').strip()) for f in fields], dtype=bool)
+        self.has_challenges = np.array([bool(f.get('Challenges')) for f in fields], dtype=bool)
+
+    def __len__(self):
+        return len(self.record_ids)
+
+    def status_mask(self, status):
+        """Boolean mask of rows with this status"""
+        if status not in self.statuses:
+            return np.zeros(len(self), dtype=bool)
+        return self.status_codes == self.statuses.index(status)
+
+    def score_counts(self, mask=None):
+        """Rows with a value per score column (optionally within a mask)"""
+        counts = {}
+        for name in SCORE_FIELDS:
+            present = ~np.isnan(getattr(self, name))
+            counts[name] = int(np.count_nonzero(present if mask is None else present & mask))
+        return counts
+
+    def per_game_score_stats(self, score, percentiles=(25, 50, 75), mask=None):
+        """Mean, count and percentiles of one score per game
+
+        Returns:
+            dict: 'games' (IDs), 'count', 'mean' and 'percentiles' ((games, len(percentiles)) array)
+        """
+        values = getattr(self, score)
+        codes = self.game_codes if mask is None else np.where(mask, self.game_codes, -1)
+        valid = (codes >= 0) & ~np.isnan(values)
+
+        counts = np.bincount(codes[valid], minlength=len(self.games))
+        sums = np.bincount(codes[valid], weights=values[valid], minlength=len(self.games))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+
+        return {
+            'games': self.games,
+            'count': counts,
+            'mean': means,
+            'percentiles': grouped_percentiles(codes, values, len(self.games), percentiles)
+        }
+
+    def completion_rates(self, status='Complete'):
+        """Per game: tickets, tickets with this status, and the rate"""
+        has_game = self.game_codes >= 0
+        totals = np.bincount(self.game_codes[has_game], minlength=len(self.games))
+        completed = np.bincount(self.game_codes[has_game & self.status_mask(status)], minlength=len(self.games))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rates = completed / totals
+        return {'games': self.games, 'total': totals, 'completed': completed, 'rate': rates}
+
+    def playtime_distribution(self, bins=(0, 60, 300, 600, 1800, 3600, np.inf), percentiles=(25, 50, 75, 90),
+                              mask=None):
+        """Histogram and percentiles of playtime in seconds (rows with a playtime only)"""
+        present = ~np.isnan(self.playtime_seconds)
+        if mask is not None:
+            present &= mask
+        values = self.playtime_seconds[present]
+        histogram, edges = np.histogram(values, bins=np.asarray(bins, dtype=np.float64))
+        return {
+            'count': int(len(values)),
+            'histogram': histogram,
+            'edges': edges,
+            'percentiles': dict(zip(percentiles, np.percentile(values, percentiles))) if len(values) else {}
+        }
+
+    def unique_count(self, codes, mask=None):
+        """Distinct non-missing categories among rows (e.g. games tested)"""
+        if mask is not None:
+            codes = codes[mask]
+        return int(len(np.unique(codes[codes >= 0])))
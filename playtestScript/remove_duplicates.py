@@ -1,7 +1,13 @@
 import os
+import sys
 from dotenv import load_dotenv
-import requests
-from collections import defaultdict
+import argparse
+import json
+import time
+from datetime import datetime
+
+from airtable_batch import AirtableBatchWriter
+from http_session import get_session
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,7 +17,7 @@ AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
 AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
 
 # Airtable configuration
-AIRTABLE_API_BASE = 'https://api.airtable.com/v0'
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", 'https://api.airtable.com/v0')
 PLAYTEST_TICKETS_TABLE = 'PlaytestTickets'
 
 def airtable_request(path, options=None):
@@ -30,7 +36,7 @@ def airtable_request(path, options=None):
     if 'headers' in options:
         headers.update(options['headers'])
     
-    response = requests.request(
+    response = get_session().request(
         method=options.get('method', 'GET'),
         url=url,
         headers=headers,
@@ -43,83 +49,91 @@ def airtable_request(path, options=None):
     
     return response.json()
 
-def fetch_all_playtest_tickets():
-    """Fetch all records from the PlaytestTickets table with pagination"""
-    all_records = []
+def iter_playtest_ticket_pages(fields=None):
+    """Yield PlaytestTickets records one page at a time, as the pages arrive
+    
+    Args:
+        fields (list): Only request these fields (all fields when None)
+    """
     offset = None
     page_count = 0
+    total = 0
     
     print("📄 Fetching all playtest tickets...")
     
     while True:
         page_count += 1
         params = {'pageSize': 100}
+        if fields:
+            params['fields[]'] = fields
         if offset:
             params['offset'] = offset
         
         try:
             print(f"  Fetching page {page_count}...")
-            page = airtable_request(f"{PLAYTEST_TICKETS_TABLE}?{requests.compat.urlencode(params)}", {
-                'method': 'GET'
+            page = airtable_request(PLAYTEST_TICKETS_TABLE, {
+                'method': 'GET',
+                'params': params
             })
-            
-            page_records = page.get('records', [])
-            all_records.extend(page_records)
-            offset = page.get('offset')
-            
-            print(f"    Got {len(page_records)} records (total so far: {len(all_records)})")
-            
-            if not offset:
-                print(f"  ✅ Reached end of data after {page_count} pages")
-                break
-                
         except Exception as e:
             print(f"❌ Error fetching page {page_count}: {e}")
             break
+        
+        page_records = page.get('records', [])
+        total += len(page_records)
+        print(f"    Got {len(page_records)} records (total so far: {total})")
+        yield page_records
+        
+        offset = page.get('offset')
+        if not offset:
+            print(f"  ✅ Reached end of data after {page_count} pages")
+            break
     
-    print(f"📊 Total records fetched: {len(all_records)}")
-    return all_records
+    print(f"📊 Total records fetched: {total}")
 
 def analyze_duplicates():
-    """Analyze playtest tickets for duplicates"""
+    """Analyze playtest tickets for duplicates
+    
+    Pages are consumed as they arrive. Each (player, game) pair keeps one compact
+    tuple for its first ticket; full ticket details are only built once a second
+    ticket for the same pair shows up, so memory grows with unique pairs, not tickets.
+    """
     print("🔍 Analyzing PlaytestTickets for duplicates...")
     print("=" * 60)
     
-    # Fetch all playtest tickets
-    records = fetch_all_playtest_tickets()
-    print(f"Found {len(records)} playtest tickets")
+    first_seen = {}  # (player, game) -> (record_id, playtest_id, created_time)
+    groups = {}  # (player, game) -> ticket dicts, only for pairs seen more than once
+    ticket_count = 0
     
-    # Group by player and game to find duplicates
-    assignments = defaultdict(list)
-    duplicates = []
+    for page_records in iter_playtest_ticket_pages(fields=['Player', 'GameToTest', 'PlaytestId']):
+        for record in page_records:
+            ticket_count += 1
+            fields = record.get('fields', {})
+            if not fields.get('Player') or not fields.get('GameToTest'):
+                continue
+            
+            # Interned IDs make every key for the same pair share its strings
+            key = (sys.intern(fields['Player'][0]), sys.intern(fields['GameToTest'][0]))
+            ticket = (record.get('id'), fields.get('PlaytestId', 'Unknown'), record.get('createdTime', 'Unknown'))
+            
+            first = first_seen.setdefault(key, ticket)
+            if first is ticket:
+                continue
+            
+            if key not in groups:
+                groups[key] = [duplicate_ticket_details(key, first)]
+            groups[key].append(duplicate_ticket_details(key, ticket))
     
-    for record in records:
-        fields = record.get('fields', {})
-        player = fields.get('Player', [None])[0] if fields.get('Player') else None
-        game = fields.get('GameToTest', [None])[0] if fields.get('GameToTest') else None
-        playtest_id = fields.get('PlaytestId', 'Unknown')
-        
-        if player and game:
-            key = f"{player}_{game}"
-            assignments[key].append({
-                'record_id': record.get('id'),
-                'playtest_id': playtest_id,
-                'player': player,
-                'game': game,
-                'created_time': record.get('createdTime', 'Unknown')
-            })
+    print(f"Found {ticket_count} playtest tickets")
     
-    # Find duplicates
-    for key, ticket_list in assignments.items():
-        if len(ticket_list) > 1:
-            duplicates.append({
-                'key': key,
-                'tickets': ticket_list,
-                'count': len(ticket_list)
-            })
+    duplicates = [{
+        'key': f"{player}_{game}",
+        'tickets': ticket_list,
+        'count': len(ticket_list)
+    } for (player, game), ticket_list in groups.items()]
     
     print(f"\n📊 Duplicate Analysis:")
-    print(f"  Total unique assignments: {len(assignments)}")
+    print(f"  Total unique assignments: {len(first_seen)}")
     print(f"  Duplicate groups found: {len(duplicates)}")
     
     if duplicates:
@@ -138,8 +152,23 @@ def analyze_duplicates():
     
     return duplicates
 
-def remove_duplicates(simulation_mode=True):
-    """Remove duplicate playtest tickets"""
+def duplicate_ticket_details(key, ticket):
+    """Expand a compact (record_id, playtest_id, created_time) tuple into a ticket dict"""
+    record_id, playtest_id, created_time = ticket
+    return {
+        'record_id': record_id,
+        'playtest_id': playtest_id,
+        'player': key[0],
+        'game': key[1],
+        'created_time': created_time
+    }
+
+def remove_duplicates(simulation_mode=True, confirm=True):
+    """Remove duplicate playtest tickets (confirm=False deletes in live mode without asking)
+    
+    Returns:
+        list: The tickets deleted in live mode, or the tickets that would be deleted in simulation mode
+    """
     print("🧹 Removing Duplicate Playtest Tickets")
     print("=" * 60)
     
@@ -148,14 +177,14 @@ def remove_duplicates(simulation_mode=True):
     
     if not duplicates:
         print("✅ No duplicates to remove!")
-        return
+        return []
     
     # Ask for confirmation
-    if not simulation_mode:
+    if not simulation_mode and confirm:
         response = input(f"\nDo you want to remove {len(duplicates)} duplicate groups? (yes/no): ")
         if response.lower() != 'yes':
             print("❌ Duplicate removal cancelled.")
-            return
+            return []
     
     tickets_to_delete = []
     
@@ -166,16 +195,17 @@ def remove_duplicates(simulation_mode=True):
         
         # Keep the first (oldest) ticket
         keep_ticket = sorted_tickets[0]
-        delete_tickets = sorted_tickets[1:]
+        extra_tickets = sorted_tickets[1:]
         
         print(f"\n📋 Duplicate Group: {dup['key']}")
         print(f"   Keeping: {keep_ticket['playtest_id']} (oldest)")
-        print(f"   Deleting: {len(delete_tickets)} duplicates")
+        print(f"   Deleting: {len(extra_tickets)} duplicates")
         
-        for ticket in delete_tickets:
+        for ticket in extra_tickets:
             tickets_to_delete.append({
                 'record_id': ticket['record_id'],
                 'playtest_id': ticket['playtest_id'],
+                'kept_record_id': keep_ticket['record_id'],
                 'reason': f"Duplicate of {keep_ticket['playtest_id']}"
             })
     
@@ -187,39 +217,135 @@ def remove_duplicates(simulation_mode=True):
         print(f"\n📋 Would delete these tickets:")
         for i, ticket in enumerate(tickets_to_delete, 1):
             print(f"  {i}. {ticket['playtest_id']} - {ticket['reason']}")
+        
+        plan_file = save_delete_plan(tickets_to_delete)
+        print(f"\n💾 Saved deletion plan to: {plan_file}")
+        print(f"   Apply it later with: python remove_duplicates.py --apply {plan_file}")
     else:
         print(f"  ✅ LIVE MODE - Tickets will be deleted")
-        
-        # Actually delete the tickets
-        deleted_count = 0
-        failed_count = 0
-        
-        for ticket in tickets_to_delete:
-            try:
-                print(f"  🗑️  Deleting {ticket['playtest_id']}...")
-                response = airtable_request(f"{PLAYTEST_TICKETS_TABLE}/{ticket['record_id']}", {
-                    'method': 'DELETE'
-                })
-                print(f"    ✅ Deleted successfully")
-                deleted_count += 1
-            except Exception as e:
-                print(f"    ❌ Failed to delete: {e}")
-                failed_count += 1
-        
-        print(f"\n🎯 Deletion Results:")
-        print(f"  Successfully deleted: {deleted_count}")
-        print(f"  Failed to delete: {failed_count}")
+        report = delete_tickets(tickets_to_delete)
+        # Only count what Airtable actually deleted, not what was planned
+        deleted_ids = set(report['deleted'])
+        tickets_to_delete = [ticket for ticket in tickets_to_delete if ticket['record_id'] in deleted_ids]
     
     return tickets_to_delete
 
-def main():
-    """Main function to remove duplicates"""
+def delete_tickets(tickets_to_delete, max_workers=3):
+    """Delete tickets in 10-record batches with a few requests in flight under the rate limit"""
+    print(f"  🗑️  Deleting {len(tickets_to_delete)} tickets in batches of 10...")
+    start = time.time()
+    report = AirtableBatchWriter(PLAYTEST_TICKETS_TABLE, max_workers=max_workers).delete(
+        [ticket['record_id'] for ticket in tickets_to_delete]
+    )
+    
+    print(f"\n🎯 Deletion Results:")
+    print(f"  Successfully deleted: {len(report['deleted'])}")
+    print(f"  Failed to delete: {len(report['failed'])}")
+    print(f"  Requests: {report['requests']} in {time.time() - start:.1f}s")
+    for failure in report['failed']:
+        print(f"    ❌ {failure['record_id']}: {failure['error']}")
+    
+    return report
+
+def save_delete_plan(tickets_to_delete):
+    """Write the tickets a dry run would delete to a plan file that can be applied later"""
+    plan_file = f"duplicate_delete_plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(plan_file, 'w') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'table': PLAYTEST_TICKETS_TABLE,
+            'tickets': tickets_to_delete
+        }, f, indent=2)
+    return plan_file
+
+def validate_delete_plan(tickets_to_delete):
+    """Drop planned tickets that are no longer duplicates of a surviving ticket
+    
+    A plan can be applied long after it was saved, so the table is fetched again. A
+    planned ticket is only kept if it still exists and the ticket it duplicates still
+    exists for the same (player, game) pair. Plans saved before 'kept_record_id' was
+    recorded instead need some unplanned ticket left for the pair.
+    
+    Returns:
+        tuple: (tickets still safe to delete, skipped tickets with a 'skip_reason')
+    """
+    pairs = {}  # record_id -> (player, game)
+    pair_tickets = {}  # (player, game) -> record_ids
+    for page_records in iter_playtest_ticket_pages(fields=['Player', 'GameToTest', 'PlaytestId']):
+        for record in page_records:
+            fields = record.get('fields', {})
+            if not fields.get('Player') or not fields.get('GameToTest'):
+                continue
+            key = (fields['Player'][0], fields['GameToTest'][0])
+            pairs[record['id']] = key
+            pair_tickets.setdefault(key, set()).add(record['id'])
+    
+    planned_ids = {ticket['record_id'] for ticket in tickets_to_delete}
+    valid, skipped = [], []
+    for ticket in tickets_to_delete:
+        key = pairs.get(ticket['record_id'])
+        kept_record_id = ticket.get('kept_record_id')
+        if key is None:
+            skip_reason = "no longer exists"
+        elif kept_record_id and pairs.get(kept_record_id) != key:
+            skip_reason = f"kept ticket {kept_record_id} is gone or no longer for the same pair"
+        elif not kept_record_id and not pair_tickets[key] - planned_ids:
+            skip_reason = "no other ticket would be left for its player and game"
+        else:
+            valid.append(ticket)
+            continue
+        skipped.append({**ticket, 'skip_reason': skip_reason})
+    
+    return valid, skipped
+
+def apply_delete_plan(plan_file, confirm=True):
+    """Delete the tickets listed in a plan file saved by a simulation run (confirm=False skips the prompt)
+    
+    Returns:
+        list: The planned tickets that were actually deleted
+    """
+    print(f"📋 Applying deletion plan: {plan_file}")
+    print("=" * 60)
+    
+    with open(plan_file) as f:
+        plan = json.load(f)
+    
+    tickets_to_delete = plan.get('tickets', [])
+    print(f"  Planned at: {plan.get('created_at', 'Unknown')}")
+    print(f"  Tickets in plan: {len(tickets_to_delete)}")
+    
+    if not tickets_to_delete:
+        return []
+    
+    tickets_to_delete, skipped = validate_delete_plan(tickets_to_delete)
+    print(f"  Still duplicates: {len(tickets_to_delete)}")
+    if skipped:
+        print(f"  ⚠️  Skipping {len(skipped)} tickets that changed since the plan was saved:")
+        for ticket in skipped:
+            print(f"    {ticket['playtest_id']} ({ticket['record_id']}): {ticket['skip_reason']}")
+    
+    if not tickets_to_delete:
+        return []
+    
+    if confirm and input(f"\nDo you want to delete {len(tickets_to_delete)} tickets? (yes/no): ").lower() != 'yes':
+        print("❌ Plan not applied.")
+        return []
+    
+    report = delete_tickets(tickets_to_delete)
+    deleted_ids = set(report['deleted'])
+    return [ticket for ticket in tickets_to_delete if ticket['record_id'] in deleted_ids]
+
+def main(simulate=None):
+    """Main function to remove duplicates (simulate=True/False skips the mode prompt)"""
     print("🚀 Starting Duplicate Removal Process")
     print("=" * 60)
     
     # Ask for mode
-    response = input("Do you want to run in simulation mode? (yes/no): ")
-    simulation_mode = response.lower() != 'no'
+    if simulate is None:
+        response = input("Do you want to run in simulation mode? (yes/no): ")
+        simulation_mode = response.lower() != 'no'
+    else:
+        simulation_mode = simulate
     
     if simulation_mode:
         print("🎭 Running in SIMULATION mode - no tickets will be deleted")
@@ -227,7 +353,7 @@ def main():
         print("✅ Running in LIVE mode - duplicates will be deleted")
     
     # Remove duplicates
-    deleted_tickets = remove_duplicates(simulation_mode=simulation_mode)
+    deleted_tickets = remove_duplicates(simulation_mode=simulation_mode, confirm=simulate is None)
     
     print(f"\n🎯 Summary:")
     if simulation_mode:
@@ -246,4 +372,15 @@ def main():
         print(f"  Could not fetch final ticket count: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Find and remove duplicate playtest tickets")
+    parser.add_argument('--apply', metavar='PLAN_FILE',
+                        help="Delete the tickets in a plan file saved by a simulation run")
+    parser.add_argument('--simulate', action='store_true', help="Run in simulation mode without prompting")
+    parser.add_argument('--live', action='store_true', help="Delete duplicates without prompting")
+    parser.add_argument('--yes', action='store_true', help="With --apply, don't ask for confirmation")
+    args = parser.parse_args()
+    
+    if args.apply:
+        apply_delete_plan(args.apply, confirm=not args.yes)
+    else:
+        main(simulate=True if args.simulate else (False if args.live else None))
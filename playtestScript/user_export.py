@@ -0,0 +1,187 @@
+"""
+Streaming export of Slack ID user data
+Users are written to every requested file as they are fetched (CSV through a real
+csv writer, NDJSON, a JSON array, or Parquet when pyarrow is installed), optionally
+gzipped, so exporting the whole Users table takes one pass and flat memory
+"""
+
+import csv
+import gzip
+import json
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv', 'parquet')
+
+# Columns of the all-users exports, in order
+USER_COLUMNS = ['record_id', 'email', 'first_name', 'last_name', 'github_username', 'slack_id', 'has_slack_id']
+
+# Columns of the Slack ID CSV (users with a Slack ID only)
+SLACK_CSV_COLUMNS = ['slack_id', 'email', 'first_name', 'last_name', 'github_username', 'record_id']
+
+# Rows per Parquet row group; only this many are held in memory at once
+PARQUET_BATCH_ROWS = 10000
+
+def open_text(path, compress=False):
+    """Open a text file for writing, gzipped when compress is set"""
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+class CsvExport:
+    """Rows written by csv.writer, so commas, quotes and newlines in names are escaped"""
+
+    def __init__(self, path, columns, compress=False):
+        self.file = open_text(path, compress)
+        self.columns = columns
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, user):
+        self.writer.writerow([user.get(column) for column in self.columns])
+
+    def close(self):
+        self.file.close()
+
+class NdjsonExport:
+    """One JSON object per line"""
+
+    def __init__(self, path, compress=False):
+        self.file = open_text(path, compress)
+
+    def write(self, user):
+        self.file.write(json.dumps(user) + "\n")
+
+    def close(self):
+        self.file.close()
+
+class JsonArrayExport:
+    """A JSON array written element by element"""
+
+    def __init__(self, path, compress=False):
+        self.file = open_text(path, compress)
+        self.file.write("[")
+        self.first = True
+
+    def write(self, user):
+        self.file.write(("\n" if self.first else ",\n") + json.dumps(user))
+        self.first = False
+
+    def close(self):
+        self.file.write("\n]\n")
+        self.file.close()
+
+class ParquetExport:
+    """Columnar export in row groups of PARQUET_BATCH_ROWS (needs pyarrow)"""
+
+    def __init__(self, path, compress=False):
+        if pa is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        fields = [pa.field(column, pa.string()) for column in USER_COLUMNS if column != 'has_slack_id']
+        self.schema = pa.schema(fields + [pa.field('has_slack_id', pa.bool_())])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='gzip' if compress else 'snappy')
+        self.rows = []
+
+    def write(self, user):
+        row = {column: None if user.get(column) is None else str(user[column])
+               for column in USER_COLUMNS if column != 'has_slack_id'}
+        row['has_slack_id'] = bool(user.get('has_slack_id'))
+        self.rows.append(row)
+        if len(self.rows) >= PARQUET_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+class SlackIdListExport:
+    """Plain list of Slack IDs, one per line"""
+
+    def __init__(self, path, compress=False):
+        self.file = open_text(path, compress)
+
+    def write(self, user):
+        self.file.write(f"{user['slack_id']}\n")
+
+    def close(self):
+        self.file.close()
+
+class UserExporter:
+    """Writes each user to every export file as it arrives
+
+    All users go to shiba_users_data_<timestamp>.<format> for each requested format;
+    users with a Slack ID also go to the shiba_slack_ids_<timestamp>.txt list and .csv.
+    Text files get a .gz suffix when compress is set (Parquet uses gzip internally instead).
+    """
+
+    def __init__(self, formats=('json',), compress=False, timestamp=None, directory='.'):
+        unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown export format(s) {', '.join(unknown)} (choose from {', '.join(EXPORT_FORMATS)})")
+
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = ".gz" if compress else ""
+        self.paths = []
+        self.all_users = []
+        self.slack_users = []
+        self.counts = {'users': 0, 'with_slack_id': 0}
+
+        def path(name):
+            full_path = f"{directory}/{name}"
+            self.paths.append(full_path)
+            return full_path
+
+        try:
+            for fmt in formats:
+                if fmt == 'parquet':
+                    self.all_users.append(ParquetExport(path(f"shiba_users_data_{timestamp}.parquet"), compress))
+                elif fmt == 'csv':
+                    self.all_users.append(CsvExport(path(f"shiba_users_data_{timestamp}.csv{suffix}"), USER_COLUMNS,
+                                                    compress))
+                elif fmt == 'ndjson':
+                    self.all_users.append(NdjsonExport(path(f"shiba_users_data_{timestamp}.ndjson{suffix}"), compress))
+                else:
+                    self.all_users.append(JsonArrayExport(path(f"shiba_users_data_{timestamp}.json{suffix}"), compress))
+
+            self.slack_users.append(SlackIdListExport(path(f"shiba_slack_ids_{timestamp}.txt{suffix}"), compress))
+            self.slack_users.append(CsvExport(path(f"shiba_slack_ids_{timestamp}.csv{suffix}"), SLACK_CSV_COLUMNS,
+                                              compress))
+        except Exception:
+            self.close()
+            raise
+
+    def write(self, user):
+        """Write one user (as from getSlackIds.extract_user) to every export"""
+        self.counts['users'] += 1
+        for export in self.all_users:
+            export.write(user)
+        if user.get('slack_id'):
+            self.counts['with_slack_id'] += 1
+            for export in self.slack_users:
+                export.write(user)
+
+    def close(self):
+        """Finish every file and get their paths"""
+        for export in self.all_users + self.slack_users:
+            export.close()
+        self.all_users = []
+        self.slack_users = []
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False